@@ -1,5 +1,4 @@
 import connexion
-from dataclasses import asdict
 
 from src.app_manager.app_manager import AppManager
 from src.app_manager.schedule_facade import SolutionSchedule
@@ -133,6 +132,27 @@ def edit_ea_population_size(body, problem_id):
     return problem.to_dict_format()
 
 
+def edit_engine_settings(body, problem_id, key):
+    """set an engine setting for specific problem, for its next run
+    :param body: the setting's value
+    :type body: dict | bytes
+    :param problem_id: Numeric ID to get problem
+    :type problem_id: int
+    :param key: the setting's key in the engine data
+    :type key: str
+
+    :rtype: object
+    """
+    if connexion.request.is_json:
+        body = connexion.request.get_json()
+
+    params = body['params']
+
+    am = AppManager()
+    problem = am.set_engine_settings(problem_id, key, params)
+    return problem.to_dict_format()
+
+
 def edit_mutation_method(body, problem_id, mutation_id):
     """change mutation for specific problem
 
@@ -185,8 +205,11 @@ def set_stopping_condition(body, problem_id, cond_id):
     if connexion.request.is_json:
         body = connexion.request.get_json()
 
+    # the stagnation condition's parameters
+    params = {key: body[key] for key in ('epsilon', 'restarts') if key in body}
+
     am = AppManager()
-    stop_cond = am.set_stopping_condition(problem_id, cond_id, body['bound'], body['applied'])
+    stop_cond = am.set_stopping_condition(problem_id, cond_id, body['bound'], body['applied'], **params)
     return {"stopping_condition": stop_cond}
 
 
@@ -273,19 +296,41 @@ def remove_mutation(problem_id, mutation_id):
     raise NotImplementedError("For now supporting only single mutation")
 
 
-def start_ea(problem_id):
+def start_ea(problem_id, body=None):
     """start ea for this problem
     :param problem_id: Numeric ID to get problem
     :type problem_id: int
+    :param body: optional seeding - saved solutions warm starting the run
+    :type body: dict | bytes
 
     :rtype: object
     """
+    if connexion.request.is_json:
+        body = connexion.request.get_json()
 
     am = AppManager()
-    am.start_running(problem_id)
+    am.start_running(problem_id, seeding=body or None)
     return "Started"
 
 
+def replan_ea(body, problem_id):
+    """re-plan the remaining hours of this problem's schedule, keeping the first hours (and frozen lines) fixed
+    :param body: re-planning configuration
+    :type body: dict | bytes
+    :param problem_id: Numeric ID to get problem
+    :type problem_id: int
+
+    :rtype: object
+    """
+    if connexion.request.is_json:
+        body = connexion.request.get_json()
+
+    am = AppManager()
+    problem = am.replan_problem(problem_id, first_free_hour=body['first_free_hour'],
+                                frozen_lines=body.get('frozen_lines', []), solution_id=body.get('solution_id'))
+    return problem.to_dict_format()
+
+
 def stop_ea(problem_id):
     """stop ea for this problem, and clean all results accumulated so far.
     :param problem_id: Numeric ID to get problem
@@ -1,18 +1,22 @@
+import os
 from copy import deepcopy
+from dataclasses import asdict
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import numpy as np
 from werkzeug.datastructures import FileStorage
 
 import src.utils.file_utils as file_utils
 from src.app_manager.consts import STOPPING_CONDITIONS, STATUS_FINISHED
+from src.app_manager.engine_facade import ENGINE_SETTINGS
 from src.app_manager.problem import Problem
 from src.app_manager.schedule_facade import SolutionSchedule
-from src.app_manager.solution_analysis import SolutionAnalysis
 from src.database.exceptions import ItemNotFoundInDB
+from src.exceptions.engine_exceptions import EngineIsRunning
 from src.genetic_engine.ea_engine import EAEngine
-from src.site_data_parser.data_classes import SiteData
+from src.genetic_engine.replanning import FrozenSchedule
+from src.genetic_engine.site_model import forget_site_model
 from src.site_data_parser.site_data_parser import SiteDataParser
 from src.utils.singleton import SingletonMeta
 from src.database.database import db
@@ -44,14 +48,25 @@ class AppManager(metaclass=SingletonMeta):
         if db is not None:
             db_problems = DBProblem.query.all()
             for db_problem in db_problems:
+                problem = self._create_problem_from_db(db_problem)
+                # a checkpointed run is resumed from its checkpoint, see resume_problem()
+                status = STATUS_PAUSED if problem.engine.has_checkpoint() else STATUS_IDLE
                 with db.auto_commit():
-                    db_problem.status = STATUS_IDLE
-                self._create_problem_from_db(db_problem)
+                    db_problem.status = status
+                    problem.status = status
 
-    def _create_problem_from_db(self, db_problem: DBProblem):
+    def _create_problem_from_db(self, db_problem: DBProblem) -> Problem:
         ea_engine = EAEngine(site_data=self.get_site_data_by_id(db_problem.site_data_id))
+        if db_problem.engine_data:
+            ea_engine.configure(deepcopy(db_problem.engine_data))
+        ea_engine.checkpoint_dir = self._get_checkpoint_dir(db_problem.id)
         problem = Problem(id=db_problem.id, site_data_id=db_problem.site_data_id, engine=ea_engine, title=db_problem.title)
         self.problems[problem.id] = problem
+        return problem
+
+    @staticmethod
+    def _get_checkpoint_dir(problem_id) -> str:
+        return os.path.join(file_utils.ROOT, "checkpoints", f"problem_{problem_id}")
 
     def create_problem(self, site_data_id, title, is_full_title=False):
         full_title = title if is_full_title else self._build_full_title(title)
@@ -62,6 +77,7 @@ class AppManager(metaclass=SingletonMeta):
 
         # init engine in both db and memory
         ea_engine = EAEngine(site_data=self.get_site_data_by_id(site_data_id))
+        ea_engine.checkpoint_dir = self._get_checkpoint_dir(db_problem.id)
         with db.auto_commit():
             db_problem.engine_data = ea_engine.to_dict()
 
@@ -121,6 +137,7 @@ class AppManager(metaclass=SingletonMeta):
             db_problem, _ = self.get_problem_by_id(problem_id)
             db.session.delete(db_problem)
 
+        self.problems[problem_id].engine.delete_checkpoint()
         del self.problems[problem_id]
         return [problem.to_dict_format() for problem in self.problems.values()]
 
@@ -135,6 +152,7 @@ class AppManager(metaclass=SingletonMeta):
                 if site_data is None:
                     raise ItemNotFoundInDB(f"item site_data with id {site_data_id} was not found in DB")
                 db.session.delete(site_data)
+            forget_site_model(site_data_id)
 
         return [site_data.as_dict() for site_data in DBSiteData.query.all()]
 
@@ -164,6 +182,29 @@ class AppManager(metaclass=SingletonMeta):
 
         return problem
 
+    def set_engine_settings(self, problem_id, key, params):
+        """
+        the settings are applied to the engine of the problem's next run, so they can't change while a run is alive -
+        running or paused.
+        :param key: the engine json key of the setting, one of ENGINE_SETTINGS
+        :param params: the setting's value in the engine json (see EAEngineFacade)
+        """
+        if key not in ENGINE_SETTINGS:
+            raise ValueError(f"unknown engine setting {key}, expected one of {ENGINE_SETTINGS}")
+
+        db_problem, problem = self.get_problem_by_id(problem_id)
+        if problem.engine.is_alive():
+            raise EngineIsRunning(f"problem {problem_id} is running, stop it before setting its {key}")
+        problem.engine.configure({key: params})
+
+        with db.auto_commit():
+            tmp_data = deepcopy(db_problem.engine_data)
+            tmp_data[key] = problem.engine.to_dict()[key]
+
+            db_problem.engine_data = tmp_data
+
+        return problem
+
     def set_crossover_method(self, problem_id, crossover_id, crossover_params):
         problem: Problem = self.problems[problem_id]
         problem.engine.set_crossover_method(crossover_id, crossover_params)
@@ -193,17 +234,53 @@ class AppManager(metaclass=SingletonMeta):
 
         return problem
 
-    def start_running(self, problem_id):
+    def start_running(self, problem_id, seeding=None):
         # fixme: BUG - when calling 'start run' immediately after app init, the app crashes over ORM session.
         # the hotfix would be to always call get_problem_by_id endpoint before start running.
 
         db_problem, problem = self.get_problem_by_id(problem_id)
+        if seeding is not None:
+            self.set_engine_settings(problem_id, "seeding", seeding)
+        problem.engine.seeds = self._get_seeds(problem)
         problem.engine.start()
 
         with db.auto_commit():
             db_problem.status = STATUS_RUNNING
             problem.status = STATUS_RUNNING
 
+    def _get_seeds(self, problem: Problem) -> Optional[np.ndarray]:
+        """:return: genomes block of the problem's seeding solutions, converted to its site data's horizon"""
+        solution_ids = problem.engine.seeding["solution_ids"]
+        if not solution_ids:
+            return None
+
+        site_data = self.get_site_data_by_id(problem.site_data_id)
+        return np.stack([SolutionSchedule.convert_to_seed(self.get_solution_from_db_by_id(solution_id).solution,
+                                                          site_data, problem.engine.genome_encoding,
+                                                          problem.engine.seeding["hour_offset"])
+                         for solution_id in solution_ids])
+
+    def replan_problem(self, problem_id, first_free_hour, frozen_lines=(), solution_id=None):
+        """
+        re-optimizes the hours from first_free_hour on, of the problem's current best or of a saved solution.
+        the current run is stopped, and the re-plan runs until the next stop.
+        """
+        db_problem, problem = self.get_problem_by_id(problem_id)
+        if solution_id is None:
+            base = problem.get_current_best_solution()
+            if len(base) == 0:
+                raise ValueError(f"problem {problem_id} has no solution to re-plan yet")
+        else:
+            site_data = self.get_site_data_by_id(problem.site_data_id)
+            base = SolutionSchedule.convert_to_seed(self.get_solution_from_db_by_id(solution_id).solution, site_data,
+                                                    problem.engine.genome_encoding)
+        frozen_schedule = FrozenSchedule(np.asarray(base), first_free_hour, frozen_lines)
+
+        self.cleanup_problem(problem_id)
+        problem.engine.set_frozen_schedule(frozen_schedule)
+        self.start_running(problem_id)
+        return problem
+
     def pause_problem(self, problem_id):
         db_problem, problem = self.get_problem_by_id(problem_id)
         problem.engine.pause()
@@ -214,7 +291,10 @@ class AppManager(metaclass=SingletonMeta):
 
     def resume_problem(self, problem_id):
         db_problem, problem = self.get_problem_by_id(problem_id)
-        problem.engine.resume()
+        if problem.engine.ident is None:  # paused by a server restart, the run continues from its checkpoint
+            problem.engine.start()
+        else:
+            problem.engine.resume()
 
         with db.auto_commit():
             db_problem.status = STATUS_RUNNING
@@ -223,26 +303,29 @@ class AppManager(metaclass=SingletonMeta):
     def cleanup_problem(self, problem_id):
         db_problem, problem = self.get_problem_by_id(problem_id)
         problem.perform_engine_cleanup()
+        problem.engine.delete_checkpoint()
 
         with db.auto_commit():
             db_problem.engine_data = problem.engine.to_dict()
             db_problem.status = STATUS_IDLE
             problem.status = STATUS_IDLE
 
-    def set_stopping_condition(self, problem_id, cond_id, bound, applied):
+    def set_stopping_condition(self, problem_id, cond_id, bound, applied, **params):
+        """:param params: epsilon and restarts of the stagnation condition"""
         problem: Problem = self.problems[problem_id]
         cond_str_id = STOPPING_CONDITIONS.get(cond_id)
         if cond_str_id == "TIME_STOPPING_CONDITION":
             # minutes to seconds
             bound = bound * 60
-        problem.engine.set_stopping_condition(cond_str_id, bound, applied)
+        problem.engine.set_stopping_condition(cond_str_id, bound, applied, **params)
 
         with db.auto_commit():
             db_problem, _ = self.get_problem_by_id(problem_id)
 
             tmp_data = deepcopy(db_problem.engine_data)
-            tmp_data["stopping_conditions_configuration"][cond_str_id]["applied"] = applied
-            tmp_data["stopping_conditions_configuration"][cond_str_id]["bound"] = bound
+            # problems created before the stagnation condition don't have it
+            tmp_data["stopping_conditions_configuration"][cond_str_id] = \
+                asdict(problem.engine.stopping_conditions_configuration[cond_str_id])
 
             db_problem.engine_data = tmp_data
 
@@ -255,8 +338,8 @@ class AppManager(metaclass=SingletonMeta):
 
         with db.auto_commit():
             tmp_data = deepcopy(db_problem.engine_data)
-            tmp_data["stopping_conditions_configuration"][cond_str_id]["applied"] = False
-            tmp_data["stopping_conditions_configuration"][cond_str_id]["bound"] = 0
+            tmp_data["stopping_conditions_configuration"][cond_str_id] = \
+                asdict(problem.engine.stopping_conditions_configuration[cond_str_id])
 
             db_problem.engine_data = tmp_data
 
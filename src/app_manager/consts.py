@@ -2,7 +2,8 @@
 STOPPING_CONDITIONS = {
     "time": "TIME_STOPPING_CONDITION",
     "fitness": "FITNESS_STOPPING_CONDITION",
-    "generations": "GENERATIONS_STOPPING_CONDITION"
+    "generations": "GENERATIONS_STOPPING_CONDITION",
+    "stagnation": "STAGNATION_STOPPING_CONDITION"
 }
 
 STATUS_PAUSED = 'paused'
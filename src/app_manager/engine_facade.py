@@ -1,6 +1,21 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from typing import List, Dict
 
+from src.genetic_engine.array_engine import DEAP_ENGINE_MODE
+from src.genetic_engine.ea_conf import FITNESS_CACHE_SIZE, DEFAULT_NUM_ISLANDS, DEFAULT_MIGRATION_INTERVAL, \
+    DEFAULT_NUM_MIGRANTS, DEFAULT_CHECKPOINT_GENERATIONS, DEFAULT_CHECKPOINT_SECONDS, DEFAULT_SEED_FRACTION, \
+    DEFAULT_WINDOW_HOURS, DEFAULT_OVERLAP_HOURS, DEFAULT_CONTEXT_INTERVAL, DEFAULT_LEVEL_GENERATIONS, \
+    DEFAULT_LOCAL_SEARCH_INTERVAL, DEFAULT_LOCAL_SEARCH_INDIVIDUALS, DEFAULT_LOCAL_SEARCH_TIME_BUDGET, RANDOM_SEED
+from src.genetic_engine.engine_process import THREAD_EXECUTOR
+from src.genetic_engine.genome_encoding import ONE_HOT_ENCODING
+from src.genetic_engine.island_model import RING_TOPOLOGY
+from src.genetic_engine.tools.repair import REPAIR_OFF
+
+# engine json keys updated with AppManager.set_engine_settings, the others have dedicated updates
+ENGINE_SETTINGS = ("fitness_cache_size", "parallel_evaluation", "genome_encoding", "random_seed", "initialization",
+                   "repair", "engine_mode", "island_model", "executor", "checkpoint", "seeding", "rolling_horizon",
+                   "coevolution", "multi_resolution", "local_search")
+
 
 @dataclass
 class EAEngineFacade:
@@ -11,12 +26,30 @@ class EAEngineFacade:
         "stopping_conditions_configuration": {
             "TIME_STOPPING_CONDITION": {"applied": False, "bound": 0},
             "FITNESS_STOPPING_CONDITION": {"applied": False, "bound": 0},
-            "GENERATIONS_STOPPING_CONDITION": {"applied": True, "bound": DEFAULT_GENERATIONS}
+            "GENERATIONS_STOPPING_CONDITION": {"applied": True, "bound": DEFAULT_GENERATIONS},
+            "STAGNATION_STOPPING_CONDITION": {"applied": False, "bound": 0, "epsilon": 0.0, "restarts": 0}
         },
         "selection_method": {"method_id": 1, "params": {"a": "a", "b": "b"}},
         "crossover_method": {"method_id": 1, "params": {"a": "a", "b": "b"}},
         "mutations": [{"mutation_id": 0, "params": {"a": "a", "b": "b"}},
-                      {"mutation_id": 1, "params": {"c": "a"}}]
+                      {"mutation_id": 1, "params": {"c": "a"}}],
+        "fitness_cache_size": int,
+        "parallel_evaluation": {"applied": False, "num_workers": 0},
+        "genome_encoding": "one_hot" | "product_index",
+        "initialization": {"respect_allowed_products": False, "greedy_fraction": 0.0},
+        "repair": "off" | "zero_out" | "reassign",
+        "engine_mode": "deap" | "array",
+        "island_model": {"applied": False, "num_islands": 4, "migration_interval": 10, "num_migrants": 5,
+                         "topology": "ring" | "all_to_all",
+                         "islands": [{"selection_method": {"method_id": 0, "params": {"tournsize": 3}}}]},
+        "executor": "thread" | "process",
+        "checkpoint": {"applied": False, "every_generations": 50, "every_seconds": 300},
+        "seeding": {"solution_ids": [int], "fraction": 0.25, "hour_offset": 0},
+        "rolling_horizon": {"applied": False, "window_hours": 120, "overlap_hours": 24},
+        "coevolution": {"applied": False, "num_workers": 0, "context_interval": 5},
+        "multi_resolution": {"applied": False, "levels": [{"bucket_hours": int | None, "generations": 50}]},
+        "local_search": {"applied": False, "interval": 10, "num_individuals": 5, "time_budget": 0.5},
+        "random_seed": 42
     }
     """
 
@@ -26,6 +59,32 @@ class EAEngineFacade:
     selection_method: Dict
     crossover_method: Dict
     mutations: List[Dict]
+    fitness_cache_size: int = FITNESS_CACHE_SIZE
+    parallel_evaluation: Dict = field(default_factory=lambda: {"applied": False, "num_workers": 0})
+    genome_encoding: str = ONE_HOT_ENCODING
+    initialization: Dict = field(default_factory=lambda: {"respect_allowed_products": False, "greedy_fraction": 0.0})
+    repair: str = REPAIR_OFF
+    engine_mode: str = DEAP_ENGINE_MODE
+    island_model: Dict = field(default_factory=lambda: {"applied": False, "num_islands": DEFAULT_NUM_ISLANDS,
+                                                        "migration_interval": DEFAULT_MIGRATION_INTERVAL,
+                                                        "num_migrants": DEFAULT_NUM_MIGRANTS,
+                                                        "topology": RING_TOPOLOGY, "islands": []})
+    executor: str = THREAD_EXECUTOR
+    checkpoint: Dict = field(default_factory=lambda: {"applied": False,
+                                                      "every_generations": DEFAULT_CHECKPOINT_GENERATIONS,
+                                                      "every_seconds": DEFAULT_CHECKPOINT_SECONDS})
+    seeding: Dict = field(default_factory=lambda: {"solution_ids": [], "fraction": DEFAULT_SEED_FRACTION,
+                                                   "hour_offset": 0})
+    rolling_horizon: Dict = field(default_factory=lambda: {"applied": False, "window_hours": DEFAULT_WINDOW_HOURS,
+                                                           "overlap_hours": DEFAULT_OVERLAP_HOURS})
+    coevolution: Dict = field(default_factory=lambda: {"applied": False, "num_workers": 0,
+                                                       "context_interval": DEFAULT_CONTEXT_INTERVAL})
+    multi_resolution: Dict = field(default_factory=lambda: {"applied": False, "levels": [
+        {"bucket_hours": None, "generations": DEFAULT_LEVEL_GENERATIONS}]})
+    local_search: Dict = field(default_factory=lambda: {"applied": False, "interval": DEFAULT_LOCAL_SEARCH_INTERVAL,
+                                                        "num_individuals": DEFAULT_LOCAL_SEARCH_INDIVIDUALS,
+                                                        "time_budget": DEFAULT_LOCAL_SEARCH_TIME_BUDGET})
+    random_seed: int = RANDOM_SEED
 
     def to_dict(self):
         return asdict(self)
\ No newline at end of file
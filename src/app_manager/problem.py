@@ -49,12 +49,10 @@ class Problem:
         }
 
     def get_current_best_solution(self):
-        # here we only read from HOF, so no need to worry about thread-safety
-        try:
-            current_best_solution = self.engine.hall_of_fame.items[0]
-            return current_best_solution
-        except IndexError:  # no current solution exist
+        current_best_solution = self.engine.get_best_schedule()
+        if current_best_solution is None:  # no current solution exist
             return []
+        return current_best_solution
 
     def get_fitness_logbook(self):
         # here we only read from logbook, so no need to worry about thread-safety
@@ -84,7 +82,8 @@ class Problem:
     def perform_engine_cleanup(self):
         old_engine = self.engine
         old_engine.notify_run_termination()
-        old_engine.join()
+        if old_engine.ident is not None:  # not started yet after a server restart
+            old_engine.join()
 
         new_engine = self.engine.new_engine_from_existing()
         self.engine = new_engine
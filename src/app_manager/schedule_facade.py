@@ -6,6 +6,7 @@ from deepdiff import DeepDiff
 
 from src.database.models import SiteData
 from src.app_manager.solution_analysis import SolutionAnalysis
+from src.genetic_engine.genome_encoding import IDLE, PRODUCT_INDEX_ENCODING, product_index_dtype, to_one_hot
 
 
 @dataclass
@@ -57,17 +58,63 @@ class SolutionSchedule:
             raise ValueError("solution conversion didn't match.")
 
     @staticmethod
-    def convert_to_raw(solution_data: Dict, site_data: SiteData) -> np.ndarray:
+    def convert_to_raw(solution_data: Dict, site_data: SiteData, hour_shift: int = 0) -> np.ndarray:
+        """:param hour_shift: working hours the events are moved back by, see convert_to_seed"""
         raw = np.zeros(shape=(site_data.num_production_lines, site_data.num_products, site_data.total_working_hours),
                        dtype=int)
-        for prd_line in range(site_data.num_production_lines):
-            for event in solution_data[str(prd_line)]:
-                raw[prd_line, event['product_id'], event['key']] = 1
+        lines, products, hours = SolutionSchedule._get_events(solution_data, site_data, hour_shift)
+        raw[lines, products, hours] = 1
+
+        return raw
+
+    @staticmethod
+    def convert_to_product_index(solution_data: Dict, site_data: SiteData, hour_shift: int = 0) -> np.ndarray:
+        """:param hour_shift: working hours the events are moved back by, see convert_to_seed"""
+        raw = np.full(shape=(site_data.num_production_lines, site_data.total_working_hours), fill_value=IDLE,
+                      dtype=product_index_dtype(site_data.num_products))
+        lines, products, hours = SolutionSchedule._get_events(solution_data, site_data, hour_shift)
+        raw[lines, hours] = products
 
         return raw
 
+    @staticmethod
+    def convert_to_seed(solution: Dict, site_data: SiteData, genome_encoding: str, hour_offset: int = 0) -> np.ndarray:
+        """
+        converts a saved solution to a genome of the site data's horizon, e.g. last week's plan of the same site.
+        the solution's working hours are laid on the horizon from its own start, whatever the calendar dates of the
+        two plans - events past the horizon's end, or on lines / products the site data doesn't have, are dropped.
+        :param solution: saved solution, see to_dict()
+        :param hour_offset: working hours at the solution's start which are skipped, so the solution's hour
+                            hour_offset is the first hour of the horizon
+        :raises ValueError: when none of the solution's events is left
+        """
+        if genome_encoding == PRODUCT_INDEX_ENCODING:
+            seed = SolutionSchedule.convert_to_product_index(solution["data"], site_data, hour_offset)
+            is_empty = (seed == IDLE).all()
+        else:
+            seed = SolutionSchedule.convert_to_raw(solution["data"], site_data, hour_offset)
+            is_empty = not seed.any()
+
+        if is_empty:
+            raise ValueError(f"no event of the solution falls within the site data's horizon, "
+                             f"skipping {hour_offset} hours")
+        return seed
+
+    @staticmethod
+    def _get_events(solution_data: Dict, site_data: SiteData, hour_shift: int) -> (np.ndarray, np.ndarray, np.ndarray):
+        """:return: line, product and hour of every event of the solution within the site data's schedule"""
+        events = np.array([(prd_line, event['product_id'], event['key'] - hour_shift)
+                           for prd_line in range(site_data.num_production_lines)
+                           for event in solution_data.get(str(prd_line), [])], dtype=int).reshape(-1, 3)
+        lines, products, hours = events.T
+        valid = (products >= 0) & (products < site_data.num_products) & \
+                (hours >= 0) & (hours < site_data.total_working_hours)
+        return lines[valid], products[valid], hours[valid]
+
     @classmethod
     def create_from_raw(cls, raw: np.ndarray, site_data: SiteData, fitness):
+        if np.ndim(raw) == 2:  # product_index genome
+            raw = to_one_hot(raw, site_data.num_products)
         start_date = cls._get_start_date(site_data)
         data = cls._create_schedule(raw, start_date, site_data)
         return cls(start_date=start_date, data=data,
@@ -1,58 +1,39 @@
-from copy import copy, deepcopy
 from typing import Dict
 
 import numpy as np
 
 from src.database.models import SiteData
+from src.genetic_engine.site_model import get_site_model
 
 
 class SolutionAnalysis:
     @staticmethod
     def get_product_lines_utilization(raw_solution: np.ndarray, site_data: SiteData) -> Dict[int, float]:
-        result = {}
-        for prd_line in site_data.json_data['production_lines']:
-            total_line_schedule = np.zeros(shape=(site_data.total_working_hours,), dtype=int)
-            for product in site_data.json_data['products']:
-                total_line_schedule = total_line_schedule | raw_solution[prd_line['id'], product['id'], :]
-            result[prd_line['id']] = round((int(total_line_schedule.sum()) / site_data.total_working_hours) * 100, 3)
+        site_model = get_site_model(site_data)
+        total_lines_schedule = np.asarray(raw_solution).any(axis=1)
+        utilization = (total_lines_schedule.sum(axis=-1) / site_model.total_working_hours) * 100
 
-        return result
+        return {line_id: round(float(utilization[i]), 3) for i, line_id in enumerate(site_model.line_ids)}
 
     @staticmethod
     def get_achieved_forecast(raw_solution: np.ndarray, site_data: SiteData) -> Dict[int, float]:
-        result = {}
-        products_forecast = {p['id']: p['forecast'] - p['stock'] for p in site_data.json_data['products']}
-        products_weight_kg = {p['id']: (p['weight'] / 1000) for p in site_data.json_data['products']}
-        lines_prod_rate = {l['id']: l['production_rate'] for l in site_data.json_data['production_lines']}
+        site_model = get_site_model(site_data)
+        actual_kg_produced = SolutionAnalysis._get_actual_kg_produced(raw_solution, site_model)
+        actual_units_produced = np.rint(actual_kg_produced / (site_model.weights / 1000))
 
-        for pid, forecast in products_forecast.items():
-            actual_units_produced, _ = SolutionAnalysis._get_actual_units_and_kg_produced(pid, lines_prod_rate,
-                                                                                       products_weight_kg[pid], raw_solution)
-            result[pid] = round((actual_units_produced / forecast) * 100, 3)
-        return result
+        achieved_forecast = (actual_units_produced / site_model.forecast_units) * 100
+        return {pid: round(float(achieved_forecast[j]), 3) for j, pid in enumerate(site_model.product_ids)}
 
     @staticmethod
     def get_raw_materials_usage(raw_solution: np.ndarray, site_data: SiteData) -> Dict[str, float]:
-        raw_materials_stock = copy(site_data.json_data['raw_materials_stock'])
+        site_model = get_site_model(site_data)
+        actual_kg_produced = SolutionAnalysis._get_actual_kg_produced(raw_solution, site_model)
 
-        result = {material_id: 0 for material_id in raw_materials_stock.keys()}
-
-        bulk_products_recipe = deepcopy(site_data.json_data['recipes'])
-        lines_prod_rate = {l['id']: l['production_rate'] for l in site_data.json_data['production_lines']}
-
-        for prd in site_data.json_data['products']:
-            _, kg_produced = SolutionAnalysis._get_actual_units_and_kg_produced(prd['id'], lines_prod_rate,
-                                                                                prd['weight'], raw_solution)
-            prd_recipe = bulk_products_recipe[str(prd['bulk_id'])]
-            for material_id, needed_amount_per_kg in prd_recipe.items():
-                result[material_id] += ((needed_amount_per_kg * kg_produced) / raw_materials_stock[material_id]) * 100
-                result[material_id] = round(result[material_id], 3)
-        return result
+        usage = ((actual_kg_produced @ site_model.recipes) / site_model.raw_materials_stock) * 100
+        return {material_id: round(float(usage[m]), 3) for m, material_id in enumerate(site_model.raw_material_ids)}
 
     @staticmethod
-    def _get_actual_units_and_kg_produced(product_id, lines_prod_rate, product_unit_weight, raw_solution) -> (int, float):
-        actual_kg_produced = 0
-        for line_id in lines_prod_rate.keys():
-            actual_kg_produced += int(raw_solution[line_id, product_id, :].sum()) * lines_prod_rate[line_id]
-        actual_units_produced = round(actual_kg_produced / product_unit_weight)
-        return actual_units_produced, actual_kg_produced
+    def _get_actual_kg_produced(raw_solution, site_model) -> np.ndarray:
+        """:return: kgs produced per product, using the overall production rate of each line"""
+        hours_per_line_product = np.asarray(raw_solution).sum(axis=-1)
+        return site_model.line_production_rates @ hours_per_line_product
@@ -30,22 +30,7 @@ class Problem(db.Model):
     engine_data = db.Column(MutableDict.as_mutable(db.JSON))
 
     status = db.Column(db.Text, default='idle')
-    """
-    engine json:
-    {
-        "site_data_id": int,
-        "population_size": int,
-        "stopping_conditions_configuration": {
-            "TIME_STOPPING_CONDITION": {"applied": False, "bound": 0},
-            "FITNESS_STOPPING_CONDITION": {"applied": False, "bound": 0},
-            "GENERATIONS_STOPPING_CONDITION": {"applied": True, "bound": DEFAULT_GENERATIONS}
-        },
-        "selection_method": {"method_id": 1, "params": {"a": "a", "b": "b"}},
-        "crossover_method": {"method_id": 1, "params": {"a": "a", "b": "b"}},
-        "mutations": [{"mutation_id": 0, "params": {"a": "a", "b": "b"}},
-                      {"mutation_id": 1, "params": {"c": "a"}}]
-    }
-    """
+    """engine_data holds the engine json, see EAEngineFacade"""
 
 
 class Solution(db.Model):
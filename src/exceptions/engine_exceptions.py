@@ -1,3 +1,6 @@
-
 class EngineCleanupFailed(Exception):
-    pass
\ No newline at end of file
+    pass
+
+
+class EngineIsRunning(Exception):
+    pass
@@ -0,0 +1,159 @@
+"""
+array-native generation loop.
+
+the engine can run in one of two modes:
+
+deap - every generation stage iterates python lists of creator.Individual objects (see EAEngine.run).
+array - the population is a single (population size, ...) genomes block and a fitness vector, and the whole
+        select -> crossover -> mutate -> repair -> evaluate -> elitism -> statistics pipeline runs on them in bulk.
+        individuals are created only at the API boundary - the hall of fame (EliteArchive) items.
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+from deap import tools
+
+from src.genetic_engine.tools.crossover import cxTwoPoint, cxOnePoint, cxTwoPointBatch, cxOnePointBatch, \
+    cxUniformLineBlockBatch
+from src.genetic_engine.tools.mutation import mutFlipBit, mutFlipProduct, mutShuffleIndexes, mutFlipBitVectorized, \
+    mutShuffleIndexesVectorized, mutFlipBitBlock, mutShuffleIndexesBlock
+from src.genetic_engine.tools.repair import REPAIR_OFF, repair_block
+from src.genetic_engine.tools.selection import selTournament, selRoulette, selTournamentVectorized, \
+    selRouletteVectorized
+
+DEAP_ENGINE_MODE = "deap"
+ARRAY_ENGINE_MODE = "array"
+ENGINE_MODES = (DEAP_ENGINE_MODE, ARRAY_ENGINE_MODE)
+
+# array-native counterparts of the engine's genetic operators
+ARRAY_SELECTIONS = {
+    selTournament: selTournamentVectorized,
+    selRoulette: selRouletteVectorized,
+    selTournamentVectorized: selTournamentVectorized,
+    selRouletteVectorized: selRouletteVectorized
+}
+ARRAY_CROSSOVERS = {
+    cxTwoPoint: cxTwoPointBatch,
+    cxOnePoint: cxOnePointBatch,
+    cxTwoPointBatch: cxTwoPointBatch,
+    cxOnePointBatch: cxOnePointBatch,
+    cxUniformLineBlockBatch: cxUniformLineBlockBatch
+}
+ARRAY_MUTATIONS = {
+    mutFlipBit: mutFlipBitBlock,
+    mutFlipProduct: mutFlipBitBlock,
+    mutFlipBitVectorized: mutFlipBitBlock,
+    mutShuffleIndexes: mutShuffleIndexesBlock,
+    mutShuffleIndexesVectorized: mutShuffleIndexesBlock
+}
+
+
+class ArrayEvolution:
+    """
+    runs the generations of an EAEngine in the array engine mode, with the engine's configured operators mapped to
+    their array-native counterparts (ARRAY_SELECTIONS, ARRAY_CROSSOVERS, ARRAY_MUTATIONS).
+    the population lives in a double buffered genomes block, like in PopulationArena.
+    all the random numbers are drawn from the engine's generator.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        toolbox = engine.toolbox
+
+        self.select = ARRAY_SELECTIONS[toolbox.select.func]
+        self.select_params = dict(toolbox.select.keywords)
+        self.mate = ARRAY_CROSSOVERS[toolbox.mate.func]
+        self.mate_params = {k: v for k, v in toolbox.mate.keywords.items() if k != "probability"}
+        self.mutate = ARRAY_MUTATIONS[toolbox.mutate.func]
+        self.mutate_params = engine._get_mutation_params()
+        if self.mutate is mutFlipBitBlock:
+            self.mutate_params["num_products"] = engine.site_data.num_products
+
+        self._genomes: Optional[np.ndarray] = None
+        self.fitness: Optional[np.ndarray] = None
+        self._current = 0
+        self.hof_size = 0
+
+    @property
+    def genomes(self) -> np.ndarray:
+        return self._genomes[self._current]
+
+    def start(self) -> Tuple[int, int]:
+        """
+        creates and evaluates the initial population.
+        :return: number of evaluations performed and number of evaluations saved by the fitness cache
+        """
+        engine = self.engine
+        genomes = engine._create_genomes(engine.population_size, seeded=True)
+        self._genomes = np.empty(shape=(2,) + genomes.shape, dtype=genomes.dtype)
+        self._genomes[self._current] = genomes
+
+        self.fitness, nevals, cache_hits = engine._evaluate_block(self.genomes, np.arange(genomes.shape[0]))
+        engine.hall_of_fame.update_block(self.genomes, self.fitness)
+        self.hof_size = len(engine.hall_of_fame)
+        return nevals, cache_hits
+
+    def restore(self, genomes: np.ndarray, fitness: np.ndarray, hof_size: int):
+        """continues from an evaluated population instead, e.g. a checkpointed one"""
+        self._genomes = np.empty(shape=(2,) + genomes.shape, dtype=genomes.dtype)
+        self._genomes[self._current] = genomes
+        self.fitness = np.array(fitness, dtype=float)
+        self.hof_size = hof_size
+
+    def perform_single_generation(self) -> Tuple[int, int, int]:
+        """:return: number of evaluations, number of fitness cache hits and number of repaired line-hours"""
+        engine, hall_of_fame = self.engine, self.engine.hall_of_fame
+        size = self.fitness.shape[0]
+        num_parents = size - self.hof_size
+
+        # Select the next generation individuals, and copy them and the best into the back buffer
+        parents = self.select(self.fitness, num_parents, rng=engine.rng, **self.select_params)
+        back = 1 - self._current
+        np.take(self.genomes, parents, axis=0, out=self._genomes[back, :num_parents])
+        self._genomes[back, num_parents:] = hall_of_fame.genomes[:self.hof_size]
+        self.fitness = np.concatenate((self.fitness[parents], hall_of_fame.fitness[:self.hof_size]))
+        self._current = back
+        offspring = self.genomes[:num_parents]
+
+        # Vary the pool of individuals
+        changed = np.zeros(shape=(size,), dtype=bool)
+        pairs_b = np.arange(1, num_parents, 2)
+        pairs_b = pairs_b[engine.rng.random(size=pairs_b.shape[0]) < engine.crossover_probability]
+        if pairs_b.shape[0] > 0:
+            self.mate(offspring, pairs_b - 1, pairs_b, rng=engine.rng, **self.mate_params)
+            changed[pairs_b - 1] = changed[pairs_b] = True
+
+        mutants = np.flatnonzero(engine.rng.random(size=num_parents) < engine.mutation_probability)
+        if mutants.shape[0] > 0:
+            self.mutate(offspring, mutants, rng=engine.rng, **self.mutate_params)
+            changed[mutants] = True
+
+        # fix the line / product compatibility of the offspring
+        repairs = 0
+        if engine.repair != REPAIR_OFF:
+            num_repaired, _ = repair_block(offspring, engine.get_allowed_products(), engine.repair, engine.rng)
+            changed[:num_parents] |= num_repaired > 0
+            repairs = int(num_repaired.sum())
+
+        # Evaluate the changed individuals, the others kept their parents' fitness
+        invalid = np.flatnonzero(changed)
+        self.fitness[invalid], nevals, cache_hits = engine._evaluate_block(self.genomes, invalid)
+
+        hall_of_fame.update_block(self.genomes, self.fitness)
+        return nevals, cache_hits, repairs
+
+    def immigrate(self, genomes: np.ndarray, fitness: np.ndarray):
+        """replaces the worst individuals of the current generation with the given evaluated genomes"""
+        worst = np.argsort(self.fitness, kind="stable")[::-1][:fitness.shape[0]]
+        self.genomes[worst] = genomes[:worst.shape[0]]
+        self.fitness[worst] = fitness[:worst.shape[0]]
+
+    def set_fitness(self, fitness: np.ndarray):
+        """assigns re-evaluated fitness values to the current generation"""
+        self.fitness[:] = fitness
+
+    def compile_statistics(self, stats: Optional[tools.Statistics]) -> dict:
+        """same as stats.compile() of the population, the fitness vector is the one fitness value per individual"""
+        if not stats:
+            return {}
+        return {name: func(self.fitness[:, None]) for name, func in stats.functions.items()}
@@ -0,0 +1,170 @@
+"""
+run checkpoints.
+
+a checkpoint is a directory holding:
+
+population_<generation>.npz - genomes and fitness of the current population and of the hall of fame.
+manifest.json - the rest of the run state: generation, elapsed time, logbook and the engine's generator state.
+
+the population file is written first and the manifest, naming it, replaces the previous one atomically - so a crash
+while checkpointing leaves the previous checkpoint intact.
+
+a checkpointed run (see run_checkpointed) continues from the last checkpoint of its engine's directory, if there is
+one.
+"""
+import json
+import logging
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger()
+
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass
+class RunState:
+    generation: int
+    elapsed_time: float  # seconds, pauses excluded
+    genome_encoding: str
+    num_elites: int  # hall of fame individuals injected into every generation
+    population_genomes: np.ndarray
+    population_fitness: np.ndarray
+    hall_of_fame_genomes: np.ndarray
+    hall_of_fame_fitness: np.ndarray
+    logbook: List[Dict]
+    rng_state: Dict  # bit generator state of the engine's generator
+
+
+class CheckpointTimer:
+    """
+    decides when the next checkpoint is due, 0 disables a criterion.
+    :param every_generations: generations between checkpoints
+    :param every_seconds: seconds between checkpoints
+    """
+
+    def __init__(self, every_generations: int, every_seconds: float, generation: int):
+        self.every_generations = every_generations
+        self.every_seconds = every_seconds
+        self._last_generation = generation
+        self._last_time = time.time()
+
+    def is_due(self, generation) -> bool:
+        due = (self.every_generations > 0 and generation - self._last_generation >= self.every_generations) or \
+              (self.every_seconds > 0 and time.time() - self._last_time >= self.every_seconds)
+        if due:
+            self._last_generation, self._last_time = generation, time.time()
+        return due
+
+
+def save_checkpoint(directory: str, state: RunState):
+    os.makedirs(directory, exist_ok=True)
+    population_file = f"population_{state.generation}.npz"
+    population_path = os.path.join(directory, population_file)
+    with open(population_path + ".tmp", "wb") as file:
+        np.savez(file, population_genomes=state.population_genomes, population_fitness=state.population_fitness,
+                 hall_of_fame_genomes=state.hall_of_fame_genomes, hall_of_fame_fitness=state.hall_of_fame_fitness)
+    os.replace(population_path + ".tmp", population_path)
+
+    manifest = {"population_file": population_file, "generation": state.generation,
+                "elapsed_time": state.elapsed_time, "genome_encoding": state.genome_encoding,
+                "num_elites": state.num_elites, "logbook": state.logbook, "rng_state": state.rng_state}
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(manifest_path + ".tmp", "w") as file:
+        json.dump(manifest, file, default=_to_json)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # older populations are not referenced anymore
+    for file_name in os.listdir(directory):
+        if file_name.startswith("population_") and file_name != population_file:
+            os.remove(os.path.join(directory, file_name))
+    logger.info(f"checkpoint of generation {state.generation} saved to {directory}")
+
+
+def load_checkpoint(directory: str) -> Optional[RunState]:
+    """:return: the run state of the last checkpoint, None if there is none"""
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.isfile(manifest_path):
+        return None
+
+    with open(manifest_path) as file:
+        manifest = json.load(file)
+    with np.load(os.path.join(directory, manifest["population_file"])) as population:
+        return RunState(generation=manifest["generation"], elapsed_time=manifest["elapsed_time"],
+                        genome_encoding=manifest["genome_encoding"], num_elites=manifest["num_elites"],
+                        population_genomes=population["population_genomes"],
+                        population_fitness=population["population_fitness"],
+                        hall_of_fame_genomes=population["hall_of_fame_genomes"],
+                        hall_of_fame_fitness=population["hall_of_fame_fitness"],
+                        logbook=manifest["logbook"], rng_state=manifest["rng_state"])
+
+
+def has_checkpoint(directory: str) -> bool:
+    return os.path.isfile(os.path.join(directory, MANIFEST_FILE))
+
+
+def delete_checkpoint(directory: str):
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def run_checkpointed(engine, verbose):
+    """
+    evolves the engine's population until the engine's stopping conditions are met, checkpointing it to the engine's
+    checkpoint directory - from its last checkpoint, if there is one.
+    """
+    state = _resume(engine)
+    generation = state.generation + 1 if state else 1
+    timer = CheckpointTimer(engine.checkpoint["every_generations"], engine.checkpoint["every_seconds"],
+                            generation=generation - 1)
+
+    def checkpoint_if_due(gen, elapsed_time):
+        if timer.is_due(gen):
+            _checkpoint(engine, gen, elapsed_time)
+
+    engine._evolve(engine.start_evolution(verbose, state), generation=generation,
+                   elapsed_time=state.elapsed_time if state else 0, after_generation=checkpoint_if_due)
+
+
+def _resume(engine) -> Optional[RunState]:
+    """
+    restores the engine's hall of fame, logbook and generator of the last checkpoint, if there is one.
+    :return: the checkpointed run state, to continue the run from
+    """
+    state = load_checkpoint(engine.checkpoint_dir)
+    if state is None:
+        return None
+    if state.genome_encoding != engine.genome_encoding:
+        logger.warning(f"checkpoint of {engine.checkpoint_dir} ignored, its genome encoding changed")
+        return None
+
+    engine.rng.bit_generator.state = state.rng_state
+    # oldest first, so equally fit entries keep their order
+    engine.hall_of_fame.update_block(state.hall_of_fame_genomes[::-1], state.hall_of_fame_fitness[::-1])
+    for record in state.logbook:
+        engine.logbook.record(**record)
+    logger.info(f"run resumed from the checkpoint of generation {state.generation}")
+    return state
+
+
+def _checkpoint(engine, generation, elapsed_time):
+    state = RunState(generation=generation, elapsed_time=elapsed_time, genome_encoding=engine.genome_encoding,
+                     num_elites=engine.num_elites, population_genomes=engine.population.genomes,
+                     population_fitness=engine.population.fitness,
+                     hall_of_fame_genomes=engine.hall_of_fame.genomes,
+                     hall_of_fame_fitness=engine.hall_of_fame.fitness,
+                     logbook=[dict(record) for record in engine.logbook], rng_state=engine.rng.bit_generator.state)
+    try:
+        save_checkpoint(engine.checkpoint_dir, state)
+    except OSError as e:  # the run goes on, with the previous checkpoint
+        logger.error(f"checkpoint of generation {generation} failed: {e}")
+
+
+def _to_json(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value)} is not json serializable")
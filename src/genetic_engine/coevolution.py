@@ -0,0 +1,225 @@
+"""
+per line cooperative coevolution.
+
+the fitness is made of per (line, product) schedule counts, which add up over the lines (see replanning): the halb
+compliance and the transitions of a line depend on its own schedule only, the lines share the produced forecast
+totals. in the cooperative coevolution mode every production line evolves a sub-population of its own
+(1, [products,] hours) slabs, with an EAEngine of its own. the other lines are frozen at the context - the best
+schedule assembled so far - so a slab is evaluated along with the counts of the context's other lines, counted once
+(see FrozenSchedule.evaluate).
+
+the lines are split between worker processes, each evolving its lines one generation at a time. every
+context_interval generations, the best slabs of the lines replace their line in the context - one line at a time, the
+most improving first, as long as they improve it. the replaced lines are sent to all the lines, which recount these
+lines only and re-evaluate their populations against the new context. the lines report their generations to the
+problem's engine (see run_coevolution).
+"""
+import logging
+import multiprocessing
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.models import SiteData as SiteDataDB
+from src.genetic_engine.constraints_manager import ConstraintsManager
+from src.genetic_engine.island_model import merge_records
+from src.genetic_engine.parallel_evaluation import site_data_columns
+from src.genetic_engine.replanning import FrozenSchedule
+
+logger = logging.getLogger()
+
+# (logbook record, best slabs, best fitness) reported by a line after every generation, see island_model.IslandReport.
+# the Coevolution expands the best slabs into full schedules, in the context they were evaluated in
+LineReport = Tuple[Dict, np.ndarray, np.ndarray]
+
+
+def _lines_main(connection, site_columns: Dict, engine_settings: Dict, lines: List[int], random_seeds: List[int],
+                context: np.ndarray, seeds: Optional[np.ndarray]):
+    """evolves the sub-populations of the given lines, a generation per message received from the Coevolution"""
+    from src.genetic_engine.ea_engine import EAEngine  # the engine module imports this one
+
+    site_data = SiteDataDB(**site_columns)
+    engines, steps = [], []
+    for line, random_seed in zip(lines, random_seeds):
+        engine = EAEngine(site_data=site_data)
+        engine.configure({**engine_settings, "random_seed": random_seed})
+        engine.seeds = seeds
+        other_lines = [other for other in range(context.shape[0]) if other != line]
+        engine.set_frozen_schedule(FrozenSchedule(context, first_free_hour=0, frozen_lines=other_lines))
+        steps.append(engine.start_evolution(verbose=False))
+        engines.append(engine)
+    connection.send([_report(engine) for engine in engines])
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        generation, replaced = message
+        reports = []
+        for line, engine, perform_single_generation in zip(lines, engines, steps):
+            nevals = 0
+            if replaced is not None:
+                replaced_lines, schedules = replaced
+                others = replaced_lines != line
+                if others.any():
+                    engine.frozen_schedule.replace_frozen_lines(replaced_lines[others].tolist(), schedules[others])
+                    nevals = engine.reevaluate()
+            perform_single_generation(generation)
+            record, best_genomes, best_fitness = _report(engine)
+            reports.append(({**record, "nevals": record["nevals"] + nevals}, best_genomes, best_fitness))
+        connection.send(reports)
+
+    connection.close()
+
+
+def _report(engine) -> LineReport:
+    return dict(engine.logbook[-1]), engine.hall_of_fame.genomes[:1], engine.hall_of_fame.fitness[:1]
+
+
+class Coevolution:
+    """
+    :param engine_settings: engine json (see EAEngineFacade) of the lines' engines
+    :param context: initial full schedule genome the lines evolve against
+    :param context_fitness: fitness of the initial context
+    :param num_workers: worker processes the lines are split between
+    :param context_interval: generations between context updates
+    :param random_seeds: seed of every line's engine generator
+    :param seeds: genomes block warm starting every line with its slabs, see EAEngine.seeds
+    """
+
+    def __init__(self, site_data: SiteDataDB, constraints_manager: ConstraintsManager, engine_settings: Dict,
+                 context: np.ndarray, context_fitness: float, num_workers: int, context_interval: int,
+                 random_seeds: List[int], seeds: Optional[np.ndarray] = None):
+        self.constraints_manager = constraints_manager
+        self.context_interval = context_interval
+        self.context = np.array(context)
+        self.context_fitness = context_fitness
+        # (lines, products) schedule counts of the context
+        self._context_counts = tuple(counts[0] for counts in constraints_manager.get_schedule_counts(context[None]))
+        self._replaced = None
+
+        # spawn, since forking the multi-threaded server process is unsafe
+        mp_context = multiprocessing.get_context("spawn")
+        self._lines = [lines.tolist() for lines in
+                       np.array_split(np.arange(self.context.shape[0]), min(num_workers, self.context.shape[0]))]
+        self._connections = []
+        self._processes = []
+        for lines in self._lines:
+            connection, lines_connection = mp_context.Pipe()
+            process = mp_context.Process(target=_lines_main,
+                                         args=(lines_connection, site_data_columns(site_data), engine_settings,
+                                               lines, [random_seeds[line] for line in lines], self.context,
+                                               seeds),
+                                         daemon=True)
+            process.start()
+            lines_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        logger.info(f"coevolution started with {self.context.shape[0]} lines on {len(self._lines)} workers")
+
+    def start(self) -> List[LineReport]:
+        """:return: the reports of the lines' initial populations, by line, with full schedules"""
+        return self._receive()
+
+    def perform_single_generation(self, generation) -> List[LineReport]:
+        """evolves all the lines by one generation, in parallel. the lines replaced by the last update arrive first"""
+        for connection in self._connections:
+            connection.send((generation, self._replaced))
+        reports = self._receive()
+
+        self._replaced = self._update_context(reports) if generation % self.context_interval == 0 else None
+        return reports
+
+    def _receive(self) -> List[LineReport]:
+        reports = [report for connection in self._connections for report in connection.recv()]
+        return [(record, self._expand(line, best_genomes), best_fitness)
+                for line, (record, best_genomes, best_fitness) in enumerate(reports)]
+
+    def _expand(self, line, slabs: np.ndarray) -> np.ndarray:
+        full = np.repeat(self.context[None], slabs.shape[0], axis=0)
+        full[:, line] = slabs[:, 0]
+        return full
+
+    def _update_context(self, reports: List[LineReport]) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        greedily replaces lines of the context with their best slabs, the lines sharing the forecast totals.
+        :return: the replaced lines and their new schedules, None if the context didn't improve
+        """
+        occupied_hours, num_runs = self._context_counts
+        # the best slabs were evaluated against the previous context
+        previous_fitness = self.context_fitness
+        replaced = []
+        for line in np.argsort([best_fitness[0] for _, _, best_fitness in reports], kind="stable"):
+            _, best_genomes, best_fitness = reports[line]
+            if best_fitness[0] >= previous_fitness:
+                break
+
+            slab = best_genomes[0, line]
+            line_occupied_hours, line_num_runs = self.constraints_manager.get_schedule_counts(slab[None, None])
+            candidate_occupied_hours, candidate_num_runs = occupied_hours.copy(), num_runs.copy()
+            candidate_occupied_hours[line], candidate_num_runs[line] = line_occupied_hours[0, 0], line_num_runs[0, 0]
+            fitness = self.constraints_manager.evaluate_counts(candidate_occupied_hours[None],
+                                                               candidate_num_runs[None])[0]
+            if fitness < self.context_fitness:
+                occupied_hours, num_runs = candidate_occupied_hours, candidate_num_runs
+                self.context[line] = slab
+                self.context_fitness = fitness
+                replaced.append(line)
+
+        if not replaced:
+            return None
+        self._context_counts = (occupied_hours, num_runs)
+        replaced = np.array(sorted(replaced))
+        return replaced, self.context[replaced]
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):  # the worker is already gone
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        logger.info("coevolution stopped")
+
+
+def run_coevolution(engine, verbose):
+    """
+    evolves the engine's schedule line by line until the engine's stopping conditions are met. the lines report their
+    generations to the engine.
+    """
+    # the lines' workers already take a core each
+    settings = {**engine.to_dict(), "parallel_evaluation": {"applied": False, "num_workers": 0}}
+    del settings["coevolution"]
+
+    # the initial context is the best of a random population, seeded like the lines are
+    genomes = engine._create_genomes(engine.population_size, seeded=True)
+    fitness = engine._evaluate_genomes(genomes)
+    engine.hall_of_fame.update_block(genomes, fitness)
+    best = int(np.argmin(fitness))
+
+    lines = Coevolution(site_data=engine.site_data, constraints_manager=engine.constraints_manager,
+                        engine_settings=settings, context=genomes[best], context_fitness=fitness[best],
+                        num_workers=engine.coevolution["num_workers"] or os.cpu_count(),
+                        context_interval=engine.coevolution["context_interval"], seeds=engine.seeds,
+                        random_seeds=engine._spawn_random_seeds(genomes.shape[1]))
+
+    def record_generation(reports: List[LineReport]):
+        for _, best_genomes, best_fitness in reports:
+            engine.hall_of_fame.update_block(best_genomes, best_fitness)
+        engine.hall_of_fame.update_block(lines.context[None], np.array([lines.context_fitness]))
+        engine.logbook.record(**merge_records([record for record, _, _ in reports]))
+        if verbose:
+            logger.info(engine.logbook.stream)
+
+    try:
+        record_generation(lines.start())
+        engine._evolve(lambda gen: record_generation(lines.perform_single_generation(gen)))
+    finally:
+        lines.close()
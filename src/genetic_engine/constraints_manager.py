@@ -1,9 +1,9 @@
 import logging
-import math
-from typing import List
+from typing import List, Optional, Tuple
 
 import numpy as np
 
+from src.genetic_engine.site_model import get_site_model
 from src.site_data_parser.data_classes import SiteData
 from src.database.models import SiteData as SiteDataDB
 
@@ -21,6 +21,104 @@ class ConstraintsManager:
         self.num_working_hours = db_site_data.total_working_hours
         self.num_products = db_site_data.num_products
 
+        # numeric tables shared by all engines running against this site
+        self.site_model = get_site_model(db_site_data)
+
+    def evaluate_population(self, population: np.ndarray) -> np.ndarray:
+        """
+        batched counterpart of EAEngine._calculate_fitness.
+        :param population: stacked schedules of shape (pop, lines, products, hours)
+        :return: fitness vector of shape (pop,)
+        """
+        occupied_hours, num_runs = self._get_schedule_counts_batch(np.asarray(population))
+        return self.evaluate_counts(occupied_hours, num_runs)
+
+    def evaluate_product_index_population(self, population: np.ndarray) -> np.ndarray:
+        """
+        evaluate_population counterpart for the product_index genome encoding.
+        :param population: stacked product index schedules of shape (pop, lines, hours), -1 is idle
+        :return: fitness vector of shape (pop,)
+        """
+        occupied_hours, num_runs = self._get_product_index_counts_batch(np.asarray(population))
+        return self.evaluate_counts(occupied_hours, num_runs)
+
+    def get_schedule_counts(self, population: np.ndarray,
+                            hour_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param population: stacked one_hot (pop, lines, products, hours) or product_index (pop, lines, hours) schedules
+        :param hour_weights: optional (hours,) number of hours every slot stands for, see multi_resolution
+        :return: number of scheduled hours and number of production runs, both of shape (pop, lines, products)
+        """
+        population = np.asarray(population)
+        if population.ndim == 3:
+            return self._get_product_index_counts_batch(population, hour_weights)
+        return self._get_schedule_counts_batch(population, hour_weights)
+
+    def evaluate_counts(self, occupied_hours: np.ndarray, num_runs: np.ndarray) -> np.ndarray:
+        """
+        fitness from precomputed schedule counts, see tools.delta_evaluation.
+        :param occupied_hours: number of scheduled hours, of shape (pop, lines, products)
+        :param num_runs: number of production runs, of shape (pop, lines, products)
+        :return: fitness vector of shape (pop,)
+        """
+        invalid_scheduling_violations = self._production_line_halb_compliance_batch(occupied_hours)
+        hard_constraints_violations = self._overall_forecast_compliance_violations_batch(occupied_hours, num_runs)
+        soft_constraints_violations = 0
+
+        return self.invalid_scheduling_penalty * invalid_scheduling_violations + \
+               self.hard_constraints_penalty * hard_constraints_violations + \
+               self.soft_constraints_penalty * soft_constraints_violations
+
+    @staticmethod
+    def _get_schedule_counts_batch(population: np.ndarray,
+                                   hour_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param population: stacked schedules of shape (pop, lines, products, hours)
+        :return: number of scheduled hours and number of production runs (sequences of 1's),
+                 both of shape (pop, lines, products)
+        """
+        occupied = population.astype(bool, copy=False)
+        occupied_hours = occupied.sum(axis=-1) if hour_weights is None else occupied @ hour_weights
+        num_runs = occupied[..., 0] + (occupied[..., 1:] & ~occupied[..., :-1]).sum(axis=-1)
+        return occupied_hours, num_runs
+
+    def _get_product_index_counts_batch(self, population: np.ndarray,
+                                        hour_weights: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        :param population: stacked product index schedules of shape (pop, lines, hours), -1 is idle
+        :return: number of scheduled hours and number of production runs, both of shape (pop, lines, products)
+        """
+        num_line_schedules = population.shape[0] * population.shape[1]
+        line_schedules = population.reshape(num_line_schedules, -1)
+
+        occupied = line_schedules >= 0
+        run_starts = occupied.copy()
+        run_starts[:, 1:] &= line_schedules[:, 1:] != line_schedules[:, :-1]
+
+        # count per (line schedule, product) pair in a single bincount
+        bins = np.arange(num_line_schedules)[:, None] * self.num_products + line_schedules
+        counts_shape = population.shape[:2] + (self.num_products,)
+        weights = None if hour_weights is None else np.broadcast_to(hour_weights, line_schedules.shape)[occupied]
+        occupied_hours = np.bincount(bins[occupied], weights=weights,
+                                     minlength=num_line_schedules * self.num_products).astype(np.int64, copy=False)
+        num_runs = np.bincount(bins[run_starts], minlength=num_line_schedules * self.num_products)
+        return occupied_hours.reshape(counts_shape), num_runs.reshape(counts_shape)
+
+    def _get_produced_amount_per_product_batch(self, occupied_hours, num_runs) -> np.ndarray:
+        """:return: produced kgs per product, of shape (pop, products)"""
+        # every run of a product costs its bulk transition time
+        num_production_hours = occupied_hours - num_runs * self.site_model.transition_times
+        return (self.site_model.production_rates * num_production_hours).sum(axis=1)
+
+    def _production_line_halb_compliance_batch(self, occupied_hours) -> np.ndarray:
+        """:return: number of hours scheduled on lines that do not accept the product, of shape (pop,)"""
+        return (occupied_hours * ~self.site_model.allowed_products).sum(axis=(1, 2))
+
+    def _overall_forecast_compliance_violations_batch(self, occupied_hours, num_runs) -> np.ndarray:
+        """:return: sum of missing/overflow forecast percentages, of shape (pop,)"""
+        current_amount = self._get_produced_amount_per_product_batch(occupied_hours, num_runs)
+        return np.abs(100 - (current_amount / self.site_model.expected_amounts) * 100).sum(axis=-1)
+
     def count_regular_hours_exceeded_violations(self, schedule) -> int:
         # fixme: finish
         line_schedules = self._get_production_line_schedules(schedule)
@@ -51,29 +149,20 @@ class ConstraintsManager:
 
     def sufficient_packaging_material(self, schedule):
         # fixme: DivisionByZero exception
-        current_amounts = self._get_produced_amount_per_product(schedule)
-        unit_package_weights = [prod.weight for prod in self.site_data.products]
-        requested_unit_packages = [math.ceil(current_amounts[i] / unit_package_weights[i]) for i in range(self.num_products)]
-
-        amount_units_per_retailer_package = [self.site_data.retailer_packaging_unit[i][1] for i in self.site_data.retailer_packaging_unit.keys()]
-
-        requested_retailer_packages = [math.ceil(requested_unit_packages[i] / amount_units_per_retailer_package[i]) for i in range(len(requested_unit_packages))]
-
-        unit_package_ids = [prod.unit_package_id for prod in self.site_data.products]
-        retailer_package_ids = [prod.retailer_package_id for prod in self.site_data.products]
-
-        unit_package_amounts = [self.site_data.product_packaging_unit[i] for i in unit_package_ids]
-        retailer_package_amounts = [self.site_data.retailer_packaging_unit[i][0] for i in retailer_package_ids]
-
-        missing_unit_amounts_percentage = [((requested_unit_packages[i] / unit_package_amounts[i])*100) - 100
-                                      for i in range(len(requested_unit_packages))]
+        current_amounts = np.array(self._get_produced_amount_per_product(schedule))
+        requested_unit_packages = np.ceil(current_amounts / self.site_model.weights)
+        requested_retailer_packages = np.ceil(requested_unit_packages / self.site_model.units_per_retailer_package)
 
-        missing_retailer_amounts_percentage = [((requested_retailer_packages[i] / retailer_package_amounts[i])*100) - 100
-                                      for i in range(len(retailer_package_amounts))]
+        # packages may be shared between products, so compare the total requested amount per package
+        missing_unit_amounts_percentage = \
+            ((requested_unit_packages @ self.site_model.unit_packaging) / self.site_model.unit_packaging_stock) * 100 - 100
+        missing_retailer_amounts_percentage = \
+            ((requested_retailer_packages @ self.site_model.retailer_packaging) /
+             self.site_model.retailer_packaging_stock) * 100 - 100
 
-        missing_amount_violation = sum(i for i in missing_unit_amounts_percentage if i > 0) + \
-                                   sum(i for i in missing_retailer_amounts_percentage if i > 0)
-        return missing_amount_violation
+        missing_amount_violation = missing_unit_amounts_percentage[missing_unit_amounts_percentage > 0].sum() + \
+                                   missing_retailer_amounts_percentage[missing_retailer_amounts_percentage > 0].sum()
+        return float(missing_amount_violation)
 
     def count_total_down_time(self, schedule) -> int:
         # schedule = schedule.view(dtype=np.ndarray)
@@ -87,17 +176,11 @@ class ConstraintsManager:
         :return: number of violations
         """
         # fixme: test
-        current_amounts = self._get_produced_amount_per_product(schedule)
-        expected_amounts = [prod.get_amount_to_produce() for prod in self.site_data.products]
-        # fixme: assuming product id is a running number
-        forecast_percentage_achieved = [(current_amounts[i] / expected_amounts[i])*100 for i in range(len(expected_amounts))]
+        current_amounts = np.array(self._get_produced_amount_per_product(schedule))
+        forecast_percentage_achieved = (current_amounts / self.site_model.expected_amounts) * 100
 
-        violation_score = 0
-        for forecast in forecast_percentage_achieved:
-            if forecast > 100:
-                violation_score += (forecast - 100)  # to get the overflow diff
-
-        return violation_score
+        # to get the overflow diff
+        return float((forecast_percentage_achieved[forecast_percentage_achieved > 100] - 100).sum())
 
     def count_forecast_goal_violations(self, schedule) -> int:
         """
@@ -106,19 +189,12 @@ class ConstraintsManager:
         the violation is calculated as sum of each product missing forecast percentage * priority
         """
         # fixme: test
-        current_amounts = self._get_produced_amount_per_product(schedule)
-        expected_amounts = [prod.get_amount_to_produce() for prod in self.site_data.products]
-        # fixme: assuming product id is a running number
-        missing_forecast_percentage = [(i, 100 - (current_amounts[i] / expected_amounts[i])*100) for i in range(len(expected_amounts))]
-
-        violation_score = 0
-        for tup in missing_forecast_percentage:
-            product_priority = self.site_data.products[tup[0]].priority
-            missing_amount = tup[1]
-            if missing_amount < 100:  # we dont cover forecast for this product
-                violation_score += (missing_amount * product_priority)
+        current_amounts = np.array(self._get_produced_amount_per_product(schedule))
+        missing_forecast_percentage = 100 - (current_amounts / self.site_model.expected_amounts) * 100
 
-        return violation_score
+        # we dont cover forecast for these products
+        not_covered = missing_forecast_percentage < 100
+        return float((missing_forecast_percentage[not_covered] * self.site_model.priorities[not_covered]).sum())
 
     def ensure_minimal_transition_time(self, schedule) -> int:
         """
@@ -130,42 +206,18 @@ class ConstraintsManager:
     def overall_forecast_compliance_violations(self, schedule):
         # fixme: need to take setup time and cleaning time into account
         # schedule = schedule.view(dtype=np.ndarray)
-        expected_amount = [prod.get_amount_to_produce() for prod in self.site_data.products]
-        current_amount = self._get_produced_amount_per_product(schedule)
-
         # calculates the missing/overflow share of % in production, each percentage is a violation point
-        num_violations = sum([abs(100 - (current_amount[i] / expected_amount[i])*100) for i in range(len(expected_amount))])
-        return float(num_violations)
+        occupied_hours, num_runs = self._get_schedule_counts_batch(np.asarray(schedule)[None])
+        return float(self._overall_forecast_compliance_violations_batch(occupied_hours, num_runs)[0])
 
     def _get_produced_amount_per_product(self, schedule) -> List[float]:
-        current_amount = [0 for _ in self.site_data.products]
-        for i, j in np.ndindex(self.num_production_lines, self.num_products):
-            _sched = schedule[i, j, :]
-
-            # count all 1's sequences * cleaning time and reduce from num_production_hours
-            num_transitions = len(np.diff(np.where(np.concatenate(([_sched[0]], _sched[:-1] != _sched[1:], [1])))[0])[::2])
-            bulk_id = self.site_data.products[j].bulk_id
-            bulk_transition_time = self.site_data.bulk_products[bulk_id].transition_time
-            num_production_hours = _sched.sum() - (num_transitions * bulk_transition_time)
-
-            prod_line = self.site_data.production_lines[i]
-            amount_kg = prod_line.product_ids.get(str(j), 0) * num_production_hours
-            current_amount[j] += amount_kg
-        return current_amount
+        # count all 1's sequences * cleaning time and reduce from num_production_hours
+        occupied_hours, num_runs = self._get_schedule_counts_batch(np.asarray(schedule)[None])
+        return self._get_produced_amount_per_product_batch(occupied_hours, num_runs)[0].tolist()
 
     def production_line_halb_compliance(self, schedule):
-        # schedule: np.ndarray = schedule.view(dtype=np.ndarray)
-
-        accepted_products_per_line = [0 for _ in range(self.num_production_lines)]
-        for i, line in enumerate(self.site_data.production_lines):
-            accepted_products_per_line[i] = list(line.product_ids.keys())
-
-        num_violations = 0
-        for i, j in np.ndindex(self.num_production_lines, self.num_products):
-            if j not in accepted_products_per_line[i]:
-                num_violations += schedule[i, j, :].sum()
-
-        return num_violations
+        occupied_hours, _ = self._get_schedule_counts_batch(np.asarray(schedule)[None])
+        return int(self._production_line_halb_compliance_batch(occupied_hours)[0])
 
     def count_overlaying_manufacturing(self, schedule) -> int:
         """
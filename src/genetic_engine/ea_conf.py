@@ -1,13 +1,3 @@
-from deap import base
-from deap import creator
-from deap import tools
-
-import random
-import numpy as np
-
-import matplotlib.pyplot as plt
-import seaborn as sns
-
 # problem constants:
 SOFT_CONSTRAINT_PENALTY = 1
 HARD_CONSTRAINT_PENALTY = 10  # the penalty factor for a hard-constraint violation
@@ -20,5 +10,47 @@ P_MUTATION = 0.1   # probability for mutating an individual
 DEFAULT_GENERATIONS = 200
 HALL_OF_FAME_SIZE = 30
 
+# incremental fitness evaluation (see tools.delta_evaluation):
+DELTA_EVALUATION_BLOCK_SIZE = 24  # hours per block of the schedule counts cache
+DELTA_EVALUATION_MIN_HOURS = 4 * DELTA_EVALUATION_BLOCK_SIZE  # shorter horizons are cheaper to recount in full
+
+# max number of genomes whose fitness is memoized (LRU), 0 disables the cache
+FITNESS_CACHE_SIZE = 10000
+
+# smaller batches are evaluated in process, dispatching them to the workers costs more than it saves
+PARALLEL_EVALUATION_MIN_BATCH = 32
+
+# island model (see island_model):
+DEFAULT_NUM_ISLANDS = 4
+DEFAULT_MIGRATION_INTERVAL = 10  # generations between migrations
+DEFAULT_NUM_MIGRANTS = 5  # best individuals sent by every island on each migration
+
+# seconds between the snapshots an engine running in a worker process publishes (see engine_process)
+ENGINE_SNAPSHOT_INTERVAL = 1.0
+
+# run checkpoints (see checkpoint), 0 disables a criterion:
+DEFAULT_CHECKPOINT_GENERATIONS = 50
+DEFAULT_CHECKPOINT_SECONDS = 300
+
+# warm start seeding (see tools.initialization.seed_population):
+DEFAULT_SEED_FRACTION = 0.25  # fraction of the initial population taken by the seeds and their variants
+SEED_VARIANT_INDPB = 0.01  # flip probability of every attribute of a seed's mutated variant
+
+# rolling horizon (see rolling_horizon):
+DEFAULT_WINDOW_HOURS = 120
+DEFAULT_OVERLAP_HOURS = 24  # hours of a window re-optimized by the next one
+
+# per line cooperative coevolution (see coevolution):
+DEFAULT_CONTEXT_INTERVAL = 5  # generations between updates of the context the lines evolve against
+
+# multi-resolution (see multi_resolution):
+DEFAULT_LEVEL_GENERATIONS = 50  # generations of a coarse level, before switching to the next level
+LEVEL_SEED_FRACTION = 0.5  # fraction of a level's initial population taken by the previous level's best genomes
+
+# memetic local search (see tools.local_search):
+DEFAULT_LOCAL_SEARCH_INTERVAL = 10  # generations between local search stages
+DEFAULT_LOCAL_SEARCH_INDIVIDUALS = 5  # best hall of fame individuals improved by every stage
+DEFAULT_LOCAL_SEARCH_TIME_BUDGET = 0.5  # seconds of every stage
+
 # set the random seed:
 RANDOM_SEED = 42
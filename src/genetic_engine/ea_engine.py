@@ -1,23 +1,50 @@
 import logging
-import random
 import threading
 import time
+from copy import deepcopy
 from dataclasses import asdict
-from typing import Tuple, Union, Any, Dict
+from functools import partial
+from typing import Tuple, Union, Any, Dict, List, Callable, Optional
 
 import numpy as np
-from deap import tools, algorithms, creator, base
+from deap import tools, creator, base
 
 from src.app_manager.engine_facade import EAEngineFacade
 from src.database.exceptions import ItemNotFoundInDB
-from src.exceptions.engine_exceptions import EngineCleanupFailed
+from src.genetic_engine.array_engine import ArrayEvolution, DEAP_ENGINE_MODE, ARRAY_ENGINE_MODE, ENGINE_MODES
+from src.genetic_engine.coevolution import run_coevolution
+from src.genetic_engine.checkpoint import RunState, delete_checkpoint, has_checkpoint, run_checkpointed
+from src.genetic_engine.elite_archive import EliteArchive
+from src.genetic_engine.engine_process import EngineProcess, ENGINE_EXECUTORS, PROCESS_EXECUTOR, \
+    THREAD_EXECUTOR
+from src.genetic_engine.island_model import ISLAND_TOPOLOGIES, ISLAND_SETTINGS, RING_TOPOLOGY, run_island_model
 from src.genetic_engine.constraints_manager import ConstraintsManager
+from src.genetic_engine.fitness_cache import FitnessCache
+from src.genetic_engine.multi_resolution import TimeBuckets, convert_resolution, run_multi_resolution
+from src.genetic_engine.parallel_evaluation import ParallelEvaluator
+from src.genetic_engine.population_arena import PopulationArena
+from src.genetic_engine.replanning import FrozenSchedule
+from src.genetic_engine.rolling_horizon import run_rolling_horizon
 from src.genetic_engine.ea_conf import RANDOM_SEED, HALL_OF_FAME_SIZE, INVALID_SCHEDULING_PENALTY, \
-    HARD_CONSTRAINT_PENALTY, SOFT_CONSTRAINT_PENALTY, POPULATION_SIZE, DEFAULT_GENERATIONS, P_CROSSOVER, P_MUTATION
-from src.genetic_engine.stopping_condition import StoppingCondition
+    HARD_CONSTRAINT_PENALTY, SOFT_CONSTRAINT_PENALTY, POPULATION_SIZE, DEFAULT_GENERATIONS, P_CROSSOVER, P_MUTATION, \
+    DELTA_EVALUATION_BLOCK_SIZE, DELTA_EVALUATION_MIN_HOURS, FITNESS_CACHE_SIZE, PARALLEL_EVALUATION_MIN_BATCH, \
+    DEFAULT_NUM_ISLANDS, DEFAULT_MIGRATION_INTERVAL, DEFAULT_NUM_MIGRANTS, DEFAULT_CHECKPOINT_GENERATIONS, \
+    DEFAULT_CHECKPOINT_SECONDS, DEFAULT_SEED_FRACTION, SEED_VARIANT_INDPB, DEFAULT_WINDOW_HOURS, DEFAULT_OVERLAP_HOURS, \
+    DEFAULT_CONTEXT_INTERVAL, DEFAULT_LEVEL_GENERATIONS, LEVEL_SEED_FRACTION, DEFAULT_LOCAL_SEARCH_INTERVAL, \
+    DEFAULT_LOCAL_SEARCH_INDIVIDUALS, DEFAULT_LOCAL_SEARCH_TIME_BUDGET
+from src.genetic_engine.stopping_condition import StoppingCondition, StagnationCondition, Stagnation
 from src.database.models import SiteData
-from src.genetic_engine.tools.crossover import cxTwoPoint, cxOnePoint
-from src.genetic_engine.tools.mutation import mutFlipBit, mutShuffleIndexes
+from src.genetic_engine.tools.crossover import cxTwoPoint, cxOnePoint, cxTwoPointBatch, cxOnePointBatch, \
+    cxUniformLineBlockBatch
+from src.genetic_engine.tools.delta_evaluation import update_schedule_counts, mark_dirty
+from src.genetic_engine.tools.mutation import mutFlipBit, mutShuffleIndexes, mutFlipProduct, mutFlipBitVectorized, \
+    mutShuffleIndexesVectorized
+from src.genetic_engine.genome_encoding import ONE_HOT_ENCODING, PRODUCT_INDEX_ENCODING, GENOME_ENCODINGS, to_one_hot
+from src.genetic_engine.tools.initialization import init_random_population, init_greedy_population, seed_population
+from src.genetic_engine.tools.local_search import improve_best
+from src.genetic_engine.tools.selection import selTournament, selRoulette, selTournamentVectorized, \
+    selRouletteVectorized
+from src.genetic_engine.tools.repair import REPAIR_OFF, REPAIR_MODES, repair_block
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger()
@@ -25,24 +52,50 @@ logger = logging.getLogger()
 
 class EAEngine(threading.Thread):
     SELECTION_METHODS = {
-        0: tools.selTournament,
-        tools.selTournament.__name__: 0,
-        1: tools.selRoulette,
-        tools.selRoulette.__name__: 1
+        0: selTournament,
+        selTournament.__name__: 0,
+        1: selRoulette,
+        selRoulette.__name__: 1,
+        2: selTournamentVectorized,
+        selTournamentVectorized.__name__: 2,
+        3: selRouletteVectorized,
+        selRouletteVectorized.__name__: 3
     }
+    # selections working on the fitness vector of the population, returning the indices of the chosen individuals
+    INDEX_SELECTIONS = {selTournamentVectorized, selRouletteVectorized}
     CROSSOVER_METHODS = {
         0: cxTwoPoint,
         cxTwoPoint.__name__: 0,
         1: cxOnePoint,
-        cxOnePoint.__name__: 1
+        cxOnePoint.__name__: 1,
+        2: cxTwoPointBatch,
+        cxTwoPointBatch.__name__: 2,
+        3: cxOnePointBatch,
+        cxOnePointBatch.__name__: 3,
+        4: cxUniformLineBlockBatch,
+        cxUniformLineBlockBatch.__name__: 4
     }
+    # crossovers applied to all the mating pairs of a generation in a single call, on the offspring genomes block
+    BATCH_CROSSOVERS = {cxTwoPointBatch, cxOnePointBatch, cxUniformLineBlockBatch}
 
     MUTATIONS = {
         0: mutFlipBit,
         mutFlipBit.__name__: 0,
         1: mutShuffleIndexes,
-        mutShuffleIndexes.__name__: 1
+        mutShuffleIndexes.__name__: 1,
+        mutFlipProduct.__name__: 0,
+        2: mutFlipBitVectorized,
+        mutFlipBitVectorized.__name__: 2,
+        3: mutShuffleIndexesVectorized,
+        mutShuffleIndexesVectorized.__name__: 3
     }
+    # mutations replaced by their counterpart when using the product_index genome encoding
+    PRODUCT_INDEX_MUTATIONS = {
+        mutFlipBit: mutFlipProduct,
+        mutFlipBitVectorized: mutFlipBitVectorized
+    }
+    # mutations applied to all the mutants of a generation in a single call
+    BATCH_MUTATIONS = {mutFlipBitVectorized, mutShuffleIndexesVectorized}
     DEFAULT_SELECTION_METHOD_INDEX = 0
     DEFAULT_CROSSOVER_METHOD_INDEX = 0
     DEFAULT_MUTATION_INDEX = 0
@@ -55,13 +108,15 @@ class EAEngine(threading.Thread):
         self.pause_cond = threading.Condition(threading.Lock())
 
         # ~~~~~~ EA related members (order of initialization matters)
-        np.random.seed(RANDOM_SEED)
+        # all the random draws of a run are made from the engine's own generator
+        self.random_seed = RANDOM_SEED
+        self.rng = np.random.default_rng(RANDOM_SEED)
 
         self.site_data = site_data
 
         self.logbook = tools.Logbook()
 
-        self.hall_of_fame = tools.HallOfFame(HALL_OF_FAME_SIZE, similar=np.array_equal)
+        self.hall_of_fame = EliteArchive(HALL_OF_FAME_SIZE)
 
         self.toolbox = base.Toolbox()
 
@@ -70,6 +125,61 @@ class EAEngine(threading.Thread):
         # define a single objective, maximizing fitness strategy:
         creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
 
+        self.genome_encoding = ONE_HOT_ENCODING
+
+        self.initialization = {"respect_allowed_products": False, "greedy_fraction": 0.0}
+
+        self.repair = REPAIR_OFF
+
+        self.engine_mode = DEAP_ENGINE_MODE
+
+        # island model (see island_model), the islands live for the duration of a run
+        self.island_model = {"applied": False, "num_islands": DEFAULT_NUM_ISLANDS,
+                             "migration_interval": DEFAULT_MIGRATION_INTERVAL, "num_migrants": DEFAULT_NUM_MIGRANTS,
+                             "topology": RING_TOPOLOGY, "islands": []}
+
+        # per line cooperative coevolution (see coevolution), the lines' workers live for the duration of a run.
+        # num_workers 0 means one worker per core
+        self.coevolution = {"applied": False, "num_workers": 0, "context_interval": DEFAULT_CONTEXT_INTERVAL}
+
+        # see engine_process, the worker process lives for the duration of a run
+        self.executor = THREAD_EXECUTOR
+        self.engine_process = None
+
+        # periodic checkpoints of the run state (see checkpoint), to the problem's checkpoint directory
+        self.checkpoint = {"applied": False, "every_generations": DEFAULT_CHECKPOINT_GENERATIONS,
+                           "every_seconds": DEFAULT_CHECKPOINT_SECONDS}
+        self.checkpoint_dir: Optional[str] = None
+
+        # warm start from saved solutions: the solution ids are resolved into the seeds genomes block when the run is
+        # started (see AppManager.start_running)
+        self.seeding = {"solution_ids": [], "fraction": DEFAULT_SEED_FRACTION, "hour_offset": 0}
+        self.seeds: Optional[np.ndarray] = None
+
+        # re-planning: only the free part of the frozen schedule's base evolves, see replanning
+        self.frozen_schedule: Optional[FrozenSchedule] = None
+        # the hall of fame items are of the frozen schedule's free part and of the resolution, all change together on
+        # a new window or level
+        self.window_lock = threading.Lock()
+
+        # see rolling_horizon. (window index, number of windows) of the window being solved
+        self.rolling_horizon = {"applied": False, "window_hours": DEFAULT_WINDOW_HOURS,
+                                "overlap_hours": DEFAULT_OVERLAP_HOURS}
+        self.current_window: Optional[Tuple[int, int]] = None
+
+        # see multi_resolution. a level's bucket_hours None means the site's shift duration. the time buckets of the
+        # coarse level being evolved, and the best genomes of the previous level converted to them
+        self.multi_resolution = {"applied": False,
+                                 "levels": [{"bucket_hours": None, "generations": DEFAULT_LEVEL_GENERATIONS}]}
+        self.resolution: Optional[TimeBuckets] = None
+        self.level_seeds: Optional[np.ndarray] = None
+
+        # memetic local search (see tools.local_search), of the best hall of fame individuals every interval
+        # generations, for time_budget seconds
+        self.local_search = {"applied": False, "interval": DEFAULT_LOCAL_SEARCH_INTERVAL,
+                             "num_individuals": DEFAULT_LOCAL_SEARCH_INDIVIDUALS,
+                             "time_budget": DEFAULT_LOCAL_SEARCH_TIME_BUDGET}
+
         # prepare fitness evaluation function
         self.toolbox.register("evaluate", self._calculate_fitness)
 
@@ -87,13 +197,29 @@ class EAEngine(threading.Thread):
 
         self.set_population_size(size=POPULATION_SIZE)
 
+        self.delta_evaluation = self._should_use_delta_evaluation()
+
+        self.fitness_cache = FitnessCache(max_size=FITNESS_CACHE_SIZE)
+
+        # multi-core evaluation, the worker pool lives for the duration of a run
+        self.parallel_evaluation = {"applied": False, "num_workers": 0}
+        self.parallel_evaluator = None
+
         self.final_population = None
 
+        # PopulationArena or ArrayEvolution of the current run, depending on the engine mode
+        self.population = None
+        # hall of fame individuals injected into every generation
+        self.num_elites = 0
+
         self.stopping_conditions_configuration = {
             "TIME_STOPPING_CONDITION": StoppingCondition(applied=False, bound=0),
             "FITNESS_STOPPING_CONDITION": StoppingCondition(applied=False, bound=0),
-            "GENERATIONS_STOPPING_CONDITION": StoppingCondition(applied=True, bound=DEFAULT_GENERATIONS)
+            "GENERATIONS_STOPPING_CONDITION": StoppingCondition(applied=True, bound=DEFAULT_GENERATIONS),
+            "STAGNATION_STOPPING_CONDITION": StagnationCondition(applied=False, bound=0)
         }
+        # of the stagnation condition, reset by every _evolve()
+        self.stagnation = Stagnation()
 
     def to_dict(self):
         return EAEngineFacade(
@@ -105,7 +231,22 @@ class EAEngine(threading.Thread):
             crossover_method={"method_id": self.CROSSOVER_METHODS[self.toolbox.mate.func.__name__],
                               "params": self.toolbox.mate.keywords},
             mutations=[{"mutation_id": self.MUTATIONS[self.toolbox.mutate.func.__name__],
-                        "params": self.toolbox.mutate.keywords}]
+                        "params": {**self._get_mutation_params(), "probability": self.mutation_probability}}],
+            fitness_cache_size=self.fitness_cache.max_size,
+            parallel_evaluation=dict(self.parallel_evaluation),
+            genome_encoding=self.genome_encoding,
+            initialization=dict(self.initialization),
+            repair=self.repair,
+            engine_mode=self.engine_mode,
+            island_model=deepcopy(self.island_model),
+            executor=self.executor,
+            checkpoint=dict(self.checkpoint),
+            seeding=deepcopy(self.seeding),
+            rolling_horizon=dict(self.rolling_horizon),
+            coevolution=dict(self.coevolution),
+            multi_resolution=deepcopy(self.multi_resolution),
+            local_search=dict(self.local_search),
+            random_seed=self.random_seed
         ).to_dict()
 
     @staticmethod
@@ -116,26 +257,287 @@ class EAEngine(threading.Thread):
             raise ItemNotFoundInDB(f"item site_data with id {site_data_id} was not found in DB")
 
         engine = EAEngine(site_data=site_data)
-        engine.set_population_size(json_data['population_size'])
-        for cond_id, params in json_data['stopping_conditions_configuration'].items():
-            engine.set_stopping_condition(cond_id, bound=params["bound"], force_apply_state=params["applied"])
-
-        engine.set_selection_method(method_id=json_data['selection_method']['method_id'],
-                                    params=json_data['selection_method']['params'])
-        engine.set_crossover_method(method_id=json_data['crossover_method']['method_id'],
-                                    params=json_data['crossover_method']['params'])
-        for mutation in json_data['mutations']:
-            engine.add_mutation(mutation_id=mutation['mutation_id'],
-                                params=mutation['params'])
+        engine.configure(json_data)
 
         return engine
 
+    def configure(self, json_data):
+        """
+        applies the settings of an engine json (see EAEngineFacade), the site data excluded. settings missing from the
+        json are left as they are - so a partial engine json updates just its settings
+        """
+        if 'population_size' in json_data:
+            self.set_population_size(json_data['population_size'])
+        for cond_id, params in json_data.get('stopping_conditions_configuration', {}).items():
+            self.set_stopping_condition(cond_id, **{k: v for k, v in params.items() if k != "progress"})
+
+        if 'selection_method' in json_data:
+            self.set_selection_method(method_id=json_data['selection_method']['method_id'],
+                                      params=json_data['selection_method']['params'])
+        if 'crossover_method' in json_data:
+            self.set_crossover_method(method_id=json_data['crossover_method']['method_id'],
+                                      params=json_data['crossover_method']['params'])
+        if 'genome_encoding' in json_data:
+            self.set_genome_encoding(json_data['genome_encoding'])
+        if 'initialization' in json_data:
+            self.set_initialization(**json_data['initialization'])
+        if 'repair' in json_data:
+            self.set_repair(json_data['repair'])
+        if 'engine_mode' in json_data:
+            self.set_engine_mode(json_data['engine_mode'])
+        for mutation in json_data.get('mutations', []):
+            self.add_mutation(mutation_id=mutation['mutation_id'],
+                              params=mutation['params'])
+        if 'fitness_cache_size' in json_data:
+            self.set_fitness_cache_size(json_data['fitness_cache_size'])
+        if 'parallel_evaluation' in json_data:
+            self.set_parallel_evaluation(**json_data['parallel_evaluation'])
+        if 'island_model' in json_data:
+            self.set_island_model(**json_data['island_model'])
+        if 'executor' in json_data:
+            self.set_executor(json_data['executor'])
+        if 'checkpoint' in json_data:
+            self.set_checkpoint(**json_data['checkpoint'])
+        if 'seeding' in json_data:
+            self.set_seeding(**json_data['seeding'])
+        if 'rolling_horizon' in json_data:
+            self.set_rolling_horizon(**json_data['rolling_horizon'])
+        if 'coevolution' in json_data:
+            self.set_coevolution(**json_data['coevolution'])
+        if 'multi_resolution' in json_data:
+            self.set_multi_resolution(**json_data['multi_resolution'])
+        if 'local_search' in json_data:
+            self.set_local_search(**json_data['local_search'])
+        if 'random_seed' in json_data:
+            self.set_random_seed(json_data['random_seed'])
+
     def set_population_size(self, size):
         self.population_size = size
 
+    def set_fitness_cache_size(self, size):
+        self.fitness_cache.resize(size)
+        logger.info(f"Fitness cache size changed to {size}")
+
+    def set_parallel_evaluation(self, applied: bool, num_workers: int = 0):
+        """takes effect on the next run. num_workers 0 means one worker per core"""
+        self.parallel_evaluation = {"applied": applied, "num_workers": num_workers}
+        logger.info(f"Parallel evaluation {'applied' if applied else 'removed'}, workers: {num_workers}")
+
+    def set_initialization(self, respect_allowed_products: bool, greedy_fraction: float = 0.0):
+        """
+        :param respect_allowed_products: the initial population doesn't schedule products on lines
+                                         which don't accept them
+        :param greedy_fraction: fraction of the population created by the greedy constructive heuristic, see
+                                init_greedy_population
+        """
+        if not 0 <= greedy_fraction <= 1:
+            raise ValueError(f"greedy fraction must be between 0 and 1, got {greedy_fraction}")
+
+        self.initialization = {"respect_allowed_products": respect_allowed_products,
+                               "greedy_fraction": greedy_fraction}
+        logger.info(f"Initialization changed to {self.initialization}")
+
+    def set_repair(self, mode: str):
+        """see tools.repair for the available modes"""
+        if mode not in REPAIR_MODES:
+            raise ValueError(f"unknown repair mode {mode}, expected one of {REPAIR_MODES}")
+
+        self.repair = mode
+        logger.info(f"Repair changed to {mode}")
+
+    def set_engine_mode(self, mode: str):
+        """takes effect on the next run, see array_engine for the available modes"""
+        if mode not in ENGINE_MODES:
+            raise ValueError(f"unknown engine mode {mode}, expected one of {ENGINE_MODES}")
+
+        self.engine_mode = mode
+        logger.info(f"Engine mode changed to {mode}")
+
+    def set_checkpoint(self, applied: bool, every_generations: int = DEFAULT_CHECKPOINT_GENERATIONS,
+                       every_seconds: float = DEFAULT_CHECKPOINT_SECONDS):
+        """takes effect on the next run. a checkpoint is saved every_generations or every_seconds, 0 disables either"""
+        if every_generations < 0 or every_seconds < 0:
+            raise ValueError("checkpoint intervals must not be negative")
+
+        self.checkpoint = {"applied": applied, "every_generations": every_generations, "every_seconds": every_seconds}
+        logger.info(f"Checkpoints {'applied' if applied else 'removed'}, every {every_generations} generations "
+                    f"or {every_seconds} seconds")
+
+    def set_seeding(self, solution_ids: List[int], fraction: float = DEFAULT_SEED_FRACTION, hour_offset: int = 0):
+        """
+        takes effect on the next run. the saved solutions and their variants take fraction of the initial population.
+        :param hour_offset: working hours at the solutions' start which are skipped, see
+                            SolutionSchedule.convert_to_seed
+        """
+        if not 0 <= fraction <= 1:
+            raise ValueError(f"seed fraction must be between 0 and 1, got {fraction}")
+        if hour_offset < 0:
+            raise ValueError(f"seed hour offset must not be negative, got {hour_offset}")
+
+        self.seeding = {"solution_ids": list(solution_ids), "fraction": fraction, "hour_offset": hour_offset}
+        logger.info(f"Seeding changed to {self.seeding}")
+
+    def set_rolling_horizon(self, applied: bool, window_hours: int = DEFAULT_WINDOW_HOURS,
+                            overlap_hours: int = DEFAULT_OVERLAP_HOURS):
+        """takes effect on the next run, see rolling_horizon"""
+        if not 0 <= overlap_hours < window_hours:
+            raise ValueError(f"expected 0 <= overlap hours < window hours, got {overlap_hours} and {window_hours}")
+
+        self.rolling_horizon = {"applied": applied, "window_hours": window_hours, "overlap_hours": overlap_hours}
+        logger.info(f"Rolling horizon {'applied' if applied else 'removed'}, windows of {window_hours} hours, "
+                    f"overlapping by {overlap_hours}")
+
+    def set_coevolution(self, applied: bool, num_workers: int = 0, context_interval: int = DEFAULT_CONTEXT_INTERVAL):
+        """takes effect on the next run, see coevolution"""
+        if num_workers < 0 or context_interval < 1:
+            raise ValueError("expected non negative workers and a positive context interval")
+
+        self.coevolution = {"applied": applied, "num_workers": num_workers, "context_interval": context_interval}
+        logger.info(f"Coevolution {'applied' if applied else 'removed'}, workers: {num_workers}, "
+                    f"context interval: {context_interval}")
+
+    def set_multi_resolution(self, applied: bool, levels: List[Dict] = None):
+        """
+        takes effect on the next run, see multi_resolution.
+        :param levels: coarse levels from the coarsest, every level's bucket_hours and the generations it evolves
+                       before switching to the next one. the hourly level evolves until the stopping conditions are met
+        """
+        levels = [{"bucket_hours": None, "generations": DEFAULT_LEVEL_GENERATIONS}] if levels is None else levels
+        for level in levels:
+            if (level["bucket_hours"] is not None and level["bucket_hours"] < 2) or level["generations"] < 1:
+                raise ValueError(f"expected levels of at least 2 hours buckets and a positive number of generations, "
+                                 f"got {level}")
+
+        self.multi_resolution = {"applied": applied,
+                                 "levels": [{"bucket_hours": level["bucket_hours"],
+                                             "generations": level["generations"]} for level in levels]}
+        logger.info(f"Multi-resolution {'applied' if applied else 'removed'}, levels: {levels}")
+
+    def set_local_search(self, applied: bool, interval: int = DEFAULT_LOCAL_SEARCH_INTERVAL,
+                         num_individuals: int = DEFAULT_LOCAL_SEARCH_INDIVIDUALS,
+                         time_budget: float = DEFAULT_LOCAL_SEARCH_TIME_BUDGET):
+        """takes effect on the next run, see tools.local_search"""
+        if interval < 1 or num_individuals < 1 or time_budget <= 0:
+            raise ValueError("expected a positive interval, number of individuals and time budget")
+
+        self.local_search = {"applied": applied, "interval": interval, "num_individuals": num_individuals,
+                             "time_budget": time_budget}
+        logger.info(f"Local search {'applied' if applied else 'removed'}, {num_individuals} individuals every "
+                    f"{interval} generations, for {time_budget} seconds")
+
+    def set_frozen_schedule(self, frozen_schedule: Optional[FrozenSchedule]):
+        """takes effect on the next run. None evolves the whole schedule again"""
+        self.frozen_schedule = frozen_schedule
+        # cached fitnesses are of genomes of the previous shape, or of another frozen part
+        self.fitness_cache.clear()
+        self.delta_evaluation = self._should_use_delta_evaluation()
+        if frozen_schedule is None:
+            logger.info("Re-planning removed")
+        else:
+            logger.info(f"Re-planning from hour {frozen_schedule.first_free_hour}, "
+                        f"frozen lines: {frozen_schedule.frozen_lines}")
+
+    def get_allowed_products(self) -> np.ndarray:
+        """:return: (lines, products) mask of the products every line of the evolved genomes accepts"""
+        allowed_products = self.constraints_manager.site_model.allowed_products
+        if self.frozen_schedule is not None:
+            return allowed_products[self.frozen_schedule.free_lines]
+        return allowed_products
+
+    def get_schedule(self, individual):
+        """:return: the full schedule individual of an evolved individual, with its fitness"""
+        # the engine process publishes full schedules
+        if (self.frozen_schedule is None and self.resolution is None) or self.engine_process is not None:
+            return individual
+
+        schedule = self.get_schedules(np.asarray(individual)[None])[0].view(creator.Individual)
+        schedule.fitness = deepcopy(individual.fitness)
+        return schedule
+
+    def get_best_schedule(self):
+        """:return: the full schedule individual of the best individual so far, None before there is one"""
+        # the windows of a rolling horizon run and the levels of a multi-resolution run switch under the window lock,
+        # the best individual and the frozen schedule / resolution it's expanded with are read together
+        with self.window_lock:
+            if len(self.hall_of_fame) == 0:
+                return None
+            return self.get_schedule(self.hall_of_fame.items[0])
+
+    def get_schedules(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: the full schedule genomes of (individuals, ...) evolved genomes"""
+        if self.frozen_schedule is not None:
+            genomes = self.frozen_schedule.expand(genomes)
+        if self.resolution is not None:
+            genomes = self.resolution.expand(genomes)
+        return genomes
+
+    def set_executor(self, executor: str):
+        """takes effect on the next run, see engine_process for the available executors"""
+        if executor not in ENGINE_EXECUTORS:
+            raise ValueError(f"unknown engine executor {executor}, expected one of {ENGINE_EXECUTORS}")
+
+        self.executor = executor
+        logger.info(f"Engine executor changed to {executor}")
+
+    def set_island_model(self, applied: bool, num_islands: int = DEFAULT_NUM_ISLANDS,
+                         migration_interval: int = DEFAULT_MIGRATION_INTERVAL, num_migrants: int = DEFAULT_NUM_MIGRANTS,
+                         topology: str = RING_TOPOLOGY, islands: List[Dict] = None):
+        """
+        takes effect on the next run, see island_model.
+        :param islands: optional engine settings (ISLAND_SETTINGS keys of the engine json) overriding the problem's
+                        ones, island i takes islands[i % len(islands)]
+        """
+        islands = islands or []
+        if topology not in ISLAND_TOPOLOGIES:
+            raise ValueError(f"unknown island topology {topology}, expected one of {ISLAND_TOPOLOGIES}")
+        if num_islands < 2 or migration_interval < 1 or num_migrants < 0:
+            raise ValueError("expected at least 2 islands, a positive migration interval and non negative migrants")
+        for settings in islands:
+            unknown_settings = set(settings) - set(ISLAND_SETTINGS)
+            if unknown_settings:
+                raise ValueError(f"settings {unknown_settings} can't differ between islands, "
+                                 f"expected any of {ISLAND_SETTINGS}")
+
+        self.island_model = {"applied": applied, "num_islands": num_islands, "migration_interval": migration_interval,
+                             "num_migrants": num_migrants, "topology": topology, "islands": deepcopy(islands)}
+        logger.info(f"Island model {'applied' if applied else 'removed'}, islands: {num_islands}, "
+                    f"topology: {topology}")
+
+    def set_random_seed(self, seed: int):
+        """restarts the engine's generator from the seed, the generators of a run's workers are seeded from it too"""
+        if seed < 0:
+            raise ValueError(f"random seed must not be negative, got {seed}")
+
+        self.random_seed = seed
+        self.rng = np.random.default_rng(seed)
+        logger.info(f"Random seed changed to {seed}")
+
+    def _spawn_random_seeds(self, n) -> List[int]:
+        """:return: independent seeds for the generators of n workers, e.g. islands"""
+        return [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(self.random_seed).spawn(n)]
+
+    def set_genome_encoding(self, encoding: str):
+        """takes effect on the next run, see genome_encoding for the available encodings"""
+        if encoding not in GENOME_ENCODINGS:
+            raise ValueError(f"unknown genome encoding {encoding}, expected one of {GENOME_ENCODINGS}")
+
+        self.genome_encoding = encoding
+        # re-register the mutation, so its counterpart for the new encoding is used
+        self.add_mutation(self.MUTATIONS[self.toolbox.mutate.func.__name__],
+                          params={**self._get_mutation_params(), "probability": self.mutation_probability})
+        self.delta_evaluation = self._should_use_delta_evaluation()
+        logger.info(f"Genome encoding changed to {encoding}")
+
+    def _should_use_delta_evaluation(self) -> bool:
+        # re-evaluate only the regions touched by the genetic operators, worth it on long horizons only.
+        # re-planned sub-genomes are evaluated along with the frozen counts, see FrozenSchedule.evaluate
+        # and so are the bucket genomes of a coarse level, see TimeBuckets.evaluate
+        return self.genome_encoding == ONE_HOT_ENCODING and self.frozen_schedule is None and \
+            self.resolution is None and self.site_data.total_working_hours >= DELTA_EVALUATION_MIN_HOURS
+
     def _prepare_population_creator(self):
         # create the population operator to generate a list of individuals:
-        self.toolbox.register("population_creator", tools.initRepeat, list, self.toolbox.individual_creator)
+        self.toolbox.register("population_creator", self._create_population)
 
     def _prepare_individual_creator(self):
         # create the Individual class based on list:
@@ -149,6 +551,9 @@ class EAEngine(threading.Thread):
         self.add_mutation(self.DEFAULT_MUTATION_INDEX, params={'indpb': 1.0 / self.site_data.individual_length})
 
     def _calculate_fitness(self, individual) -> Tuple[Union[int, Any]]:
+        if self.genome_encoding == PRODUCT_INDEX_ENCODING:
+            individual = to_one_hot(individual, self.site_data.num_products)
+
         production_line_halb_compliance = self.constraints_manager.production_line_halb_compliance(schedule=individual)
         forecast_compliance = self.constraints_manager.overall_forecast_compliance_violations(schedule=individual)
         # sufficient_packaging_material = self.constraints_manager.sufficient_packaging_material(schedule=individual)
@@ -166,6 +571,99 @@ class EAEngine(threading.Thread):
                self.constraints_manager.hard_constraints_penalty * hard_constraints_violations + \
                self.constraints_manager.soft_constraints_penalty * soft_constraints_violations,
 
+    def _evaluate_invalid_individuals(self, individuals) -> Tuple[int, int]:
+        """
+        evaluates all individuals with an invalid fitness in a single batched call,
+        instead of mapping self._calculate_fitness over them one by one.
+        genomes already known to the fitness cache (or repeated within the batch) are evaluated once.
+        :return: number of evaluations performed and number of evaluations saved by the fitness cache
+        """
+        invalid_ind = [ind for ind in individuals if not ind.fitness.valid]
+        if not self.fitness_cache.enabled:
+            self._assign_fitness(invalid_ind)
+            return len(invalid_ind), 0
+
+        pending = dict()  # genome digest -> individuals sharing that genome
+        for ind in invalid_ind:
+            key = self.fitness_cache.digest(ind)
+            fitness = self.fitness_cache.get(key)
+            if fitness is None:
+                pending.setdefault(key, []).append(ind)
+            else:
+                ind.fitness.values = (fitness,)
+
+        fitnesses = self._assign_fitness([inds[0] for inds in pending.values()])
+        for (key, inds), fit in zip(pending.items(), fitnesses):
+            self.fitness_cache.put(key, fit)
+            for ind in inds[1:]:
+                ind.fitness.values = (fit,)
+
+        return len(pending), len(invalid_ind) - len(pending)
+
+    def _assign_fitness(self, individuals) -> np.ndarray:
+        """
+        with parallel evaluation, large batches are split between the worker processes.
+        with delta evaluation, only the regions marked dirty by the genetic operators are recounted.
+        :return: the fitness vector assigned to the individuals
+        """
+        if not individuals:
+            return np.empty(shape=(0,))
+
+        if self.parallel_evaluator is not None and self.resolution is None and \
+                len(individuals) >= PARALLEL_EVALUATION_MIN_BATCH:
+            fitnesses = self.parallel_evaluator.evaluate(individuals)
+        elif self.delta_evaluation:
+            update_schedule_counts(individuals, DELTA_EVALUATION_BLOCK_SIZE)
+            fitnesses = self.constraints_manager.evaluate_counts(
+                np.stack([ind.schedule_counts.occupied_hours for ind in individuals]),
+                np.stack([ind.schedule_counts.num_runs for ind in individuals]))
+        else:
+            fitnesses = self._evaluate_genomes(np.stack(individuals).view(np.ndarray))
+        for ind, fit in zip(individuals, fitnesses):
+            ind.fitness.values = (fit,)
+
+        return fitnesses
+
+    def _evaluate_block(self, genomes: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, int, int]:
+        """
+        array-native _evaluate_invalid_individuals(), evaluates the given rows of a genomes block.
+        :return: fitness vector of the rows, number of evaluations performed and number of evaluations saved by
+                 the fitness cache
+        """
+        fitness = np.empty(shape=(rows.shape[0],))
+        if not self.fitness_cache.enabled:
+            fitness[:] = self._evaluate_genomes(genomes[rows])
+            return fitness, rows.shape[0], 0
+
+        pending = dict()  # genome digest -> positions in rows sharing that genome
+        for i, row in enumerate(rows):
+            key = self.fitness_cache.digest(genomes[row])
+            cached = self.fitness_cache.get(key)
+            if cached is None:
+                pending.setdefault(key, []).append(i)
+            else:
+                fitness[i] = cached
+
+        first_rows = rows[[positions[0] for positions in pending.values()]]
+        fitnesses = self._evaluate_genomes(genomes[first_rows]) if pending else np.empty(shape=(0,))
+        for (key, positions), fit in zip(pending.items(), fitnesses):
+            self.fitness_cache.put(key, fit)
+            fitness[positions] = fit
+
+        return fitness, len(pending), rows.shape[0] - len(pending)
+
+    def _evaluate_genomes(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: fitness vector of a (individuals, ...) genomes block, evaluated in full"""
+        if self.frozen_schedule is not None:
+            return self.frozen_schedule.evaluate(genomes, self.constraints_manager)
+        if self.resolution is not None:
+            return self.resolution.evaluate(genomes, self.constraints_manager)
+        if self.parallel_evaluator is not None and genomes.shape[0] >= PARALLEL_EVALUATION_MIN_BATCH:
+            return self.parallel_evaluator.evaluate(genomes)
+        if self.genome_encoding == PRODUCT_INDEX_ENCODING:
+            return self.constraints_manager.evaluate_product_index_population(genomes)
+        return self.constraints_manager.evaluate_population(genomes)
+
     @staticmethod
     def _prepare_statistics_object():
         stats = tools.Statistics(lambda ind: ind.fitness.values)
@@ -178,82 +676,52 @@ class EAEngine(threading.Thread):
         """
         this method creates a valid individual,
         by ensuring there are no multiple products manufactured on a certain line on the same time
-        used this thread https://stackoverflow.com/questions/65395919/merging-2d-numpy-arrays-of-different-shapes-to-3d-array
-        to merge the results
         """
+        return self._create_population(n=1)[0]
 
-        # return creator.Individual(np.random.randint(2, size=self.site_data_list.get_individual_dimensions()))
-        production_line_sched_dims = (self.site_data.num_production_lines, self.site_data.total_working_hours)
-
-        # create 2D manufacturing schedule
-        product_line_schedule = np.random.randint(2, size=production_line_sched_dims)
-        total_production_schedule = np.zeros(shape=production_line_sched_dims[1], dtype=int)
-        for line in product_line_schedule:
-            total_production_schedule = total_production_schedule | line
-
-        # create random sequence of product ids to fill the schedule and shuffle their order
-        prod_ids = [prod["id"] for prod in self.site_data.json_data["products"]]
-        random.shuffle(prod_ids)
-
-        # create the 3rd dimension of schedule
-        total_ones = total_production_schedule.sum()
-        prods_schedule = []
-
-        for prod_id in prod_ids:
-            prod_sched = np.zeros(shape=(self.site_data.total_working_hours,), dtype=int)
-
-            if total_ones > 0:  # there are available slots in total schedule
-                # randomly choose how many slots this product will take in production
-                num_indices_to_take = random.randint(0, total_ones)
-
-                # get all available slots in production
-                available_indices = np.where(total_production_schedule == 1)[0]
-
-                # if this is the last product, grant the entire remaining free slots
-                if prod_id == prod_ids[-1] and total_ones > 0:
-                    indices_to_take = available_indices
-                else:
-                    # choose random available slots
-                    selected = np.random.choice(available_indices.shape[0], num_indices_to_take, replace=False)
-                    indices_to_take = available_indices[selected]
-
-                # fill in available slots in schedule for this product
-                prod_sched[indices_to_take] = 1
-
-                # remove available slots from total schedule
-                total_production_schedule[indices_to_take] = 0
-                total_ones -= len(indices_to_take)
-
-            # create a list of product schedules, shuffled
-            prods_schedule.append((prod_id, prod_sched))
+    def _create_population(self, n, seeded=False) -> List:
+        """creates the whole population in a single batch, see init_random_population"""
+        population = [genome.view(creator.Individual) for genome in self._create_genomes(n, seeded)]
+        for ind in population:
+            ind.fitness = creator.FitnessMin()
+        return population
 
-            # sort the products schedule back in ascending order
-            prods_schedule.sort(key=lambda t: t[0])
-
-        for prod_sched in prods_schedule:
-            if prod_sched[0] == 0:  # first element
-                stacked_prods_schedule = prod_sched[1]
-            else:  # stack element with existing stack
-                stacked_prods_schedule = np.vstack((stacked_prods_schedule, prod_sched[1]))
-
-        # bring the 2 2D arrays together into a 3D array of shape (num_prod_lines, num_prods, working_hours)
-        stacked_prods_schedule = np.moveaxis(stacked_prods_schedule, 0, -1)
-        product_line_schedule = np.moveaxis(product_line_schedule, 0, -1)
-
-        stacked_prods_schedule = stacked_prods_schedule[:, None, :]  # expand 1 axis
-        product_line_schedule = product_line_schedule[:, :, None]  # expand 1 axis
-        stacked_prods_schedule = np.broadcast_to(stacked_prods_schedule,
-                                                 (stacked_prods_schedule.shape[0],
-                                                  product_line_schedule.shape[1],
-                                                  stacked_prods_schedule.shape[2]))
-
-        individual = np.concatenate([stacked_prods_schedule, product_line_schedule],
-                                    axis=-1)  # concat together into a 3D array
-        individual = np.moveaxis(individual, 0, 1)
-        individual = np.moveaxis(individual, 1, 2)  # align dimensions to expected
-
-        individual = individual[:, :-1, :]  # remove last extra layer that was used for concat only
-        return creator.Individual(individual)
+    def _create_genomes(self, n, seeded=False) -> np.ndarray:
+        """
+        :param seeded: whether the seeds warm start the population, see seed_population
+        :return: (n, ...) genomes block of a random population
+        """
+        num_lines, num_hours = self.site_data.num_production_lines, self.site_data.total_working_hours
+        if self.frozen_schedule is not None:
+            num_lines, num_hours = self.frozen_schedule.free_shape
+        if self.resolution is not None:
+            num_hours = self.resolution.num_buckets
+        allowed_products = self.get_allowed_products() if self.initialization["respect_allowed_products"] else None
+        genomes = init_random_population(n, num_lines=num_lines, num_products=self.site_data.num_products,
+                                         num_hours=num_hours, genome_encoding=self.genome_encoding, rng=self.rng,
+                                         allowed_products=allowed_products)
+        # the greedy schedules produce the whole forecast, not what's left of it by the frozen part of a schedule
+        num_greedy = int(round(self.initialization["greedy_fraction"] * n)) if self.frozen_schedule is None else 0
+        if num_greedy > 0:
+            greedy_genomes = init_greedy_population(num_greedy, self.constraints_manager.site_model,
+                                                    num_hours=self.site_data.total_working_hours,
+                                                    genome_encoding=self.genome_encoding, rng=self.rng)
+            genomes[n - num_greedy:] = convert_resolution(greedy_genomes, source=None, target=self.resolution)
+        seeds, fraction = self.seeds, self.seeding["fraction"]
+        if self.resolution is not None and seeds is not None:
+            seeds = self.resolution.coarsen(seeds)
+        if self.level_seeds is not None:
+            # the best of the previous level, the seeds already took part in it
+            seeds, fraction = self.level_seeds, LEVEL_SEED_FRACTION
+        if self.frozen_schedule is not None:
+            # re-plans and windows warm start from the free part of their base too
+            base = self.frozen_schedule.base[None]
+            seeds = self.frozen_schedule.restrict(base if seeds is None else np.concatenate((base, seeds)))
+        if seeded and seeds is not None:
+            num_seeded = seed_population(genomes, seeds, fraction, SEED_VARIANT_INDPB,
+                                         num_products=self.site_data.num_products, rng=self.rng)
+            logger.info(f"initial population seeded with {num_seeded} genomes of {seeds.shape[0]} seeds")
+        return genomes
 
     def set_selection_method(self, method_id, params: Dict):
         self.toolbox.register("select", self.SELECTION_METHODS[method_id], **params)
@@ -268,75 +736,204 @@ class EAEngine(threading.Thread):
 
     def add_mutation(self, mutation_id, params: Dict):
         # probability is required for the algorithm and not for a specific method
+        params = dict(params)
         probability = params.pop("probability", None)
         self.mutation_probability = P_MUTATION if probability is None else probability
-        self.toolbox.register("mutate", self.MUTATIONS[mutation_id], **params)
-        logger.info(f"Mutation Added {self.MUTATIONS[mutation_id].__name__}")
-
-    def _perform_single_generation(self, population, gen, hof_size, verbose):
+        mutation = self.MUTATIONS[mutation_id]
+        if self.genome_encoding == PRODUCT_INDEX_ENCODING and mutation in self.PRODUCT_INDEX_MUTATIONS:
+            self.toolbox.register("mutate", self.PRODUCT_INDEX_MUTATIONS[mutation],
+                                  num_products=self.site_data.num_products, **params)
+        else:
+            self.toolbox.register("mutate", mutation, **params)
+        logger.info(f"Mutation Added {self.toolbox.mutate.func.__name__}")
+
+    def _get_mutation_params(self) -> Dict:
+        # num_products is derived from the site data, not configured by the user
+        return {k: v for k, v in self.toolbox.mutate.keywords.items() if k != "num_products"}
+
+    def _perform_single_generation(self, arena: PopulationArena, gen, hof_size, verbose):
         """Begin single generational process"""
+        generation_start = time.time()
         # Select the next generation individuals
-        offspring = self.toolbox.select(population, len(population) - hof_size)
+        if self.toolbox.select.func in self.INDEX_SELECTIONS:
+            parents = self.toolbox.select(arena.fitness, arena.size - hof_size, rng=self.rng)
+        else:
+            parents = self.toolbox.select(arena.individuals, arena.size - hof_size, rng=self.rng)
+
+        # copy the parents and the best into the next generation buffer
+        offspring = arena.next_generation(parents, elites=self.hall_of_fame.items[:hof_size])
 
         # Vary the pool of individuals
-        offspring = algorithms.varAnd(offspring, self.toolbox, self.crossover_probability, self.mutation_probability)
+        self._vary_in_place(offspring, arena.genomes[:len(offspring)])
 
-        # Evaluate the individuals with an invalid fitness
-        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-        fitnesses = self.toolbox.map(self.toolbox.evaluate, invalid_ind)
-        for ind, fit in zip(invalid_ind, fitnesses):
-            ind.fitness.values = fit
+        # fix the line / product compatibility of the offspring
+        repairs = self._repair_in_place(offspring, arena.genomes[:len(offspring)])
 
-        # add the best back to population:
-        offspring.extend(self.hall_of_fame.items)
+        # Evaluate the individuals with an invalid fitness
+        nevals, cache_hits = self._evaluate_invalid_individuals(offspring)
+        arena.sync()
 
         # Update the hall of fame with the generated individuals
-        self.hall_of_fame.update(offspring)
+        self.hall_of_fame.update(arena.individuals)
 
-        # Replace the current population by the offspring
-        population[:] = offspring
+        # improve the best individuals, they are injected into the next generation
+        local_search = self._local_search_stage(gen, generation_start)
 
         # Append the current generation statistics to the logbook
-        record = self.stats.compile(population) if self.stats else {}
-        self.logbook.record(generation=gen, nevals=len(invalid_ind), **record)
+        record = self.stats.compile(arena.individuals) if self.stats else {}
+        self.logbook.record(generation=gen, nevals=nevals, cache_hits=cache_hits, repairs=repairs, **record,
+                            **local_search)
         if verbose:
             logger.info(self.logbook.stream)
 
+    def _get_logbook_header(self) -> List[str]:
+        return ['generation', 'nevals', 'cache_hits', 'repairs'] + (self.stats.fields if self.stats else []) + \
+            (['local_search_moves', 'local_search_share'] if self.local_search["applied"] else [])
+
+    def _local_search_applied(self) -> bool:
+        # moves are evaluated from the counts of full hourly schedules
+        return self.local_search["applied"] and self.frozen_schedule is None and self.resolution is None
+
+    def _local_search_stage(self, generation, generation_start) -> Dict:
+        """
+        hill climbs the best hall of fame individuals, on the local search's generations. the improved individuals
+        join the hall of fame.
+        :return: the local search fields of the generation's logbook record - the number of moves applied and the
+                 share of the generation's time the local search took
+        """
+        if not self._local_search_applied():
+            return {}
+        if generation % self.local_search["interval"] != 0 or len(self.hall_of_fame) == 0:
+            return {"local_search_moves": 0, "local_search_share": 0.0}
+
+        start_time = time.time()
+        num_moves = improve_best(self.hall_of_fame, self.constraints_manager, self.local_search["num_individuals"],
+                                 self.local_search["time_budget"], self.rng)
+
+        end_time = time.time()
+        return {"local_search_moves": num_moves,
+                "local_search_share": (end_time - start_time) / max(end_time - generation_start, 1e-9)}
+
+    def _vary_in_place(self, offspring, block):
+        """
+        same as DEAP varAnd(), without cloning the offspring first - they are already copies living in the
+        population arena. the genetic operators modify the individuals in place.
+        :param block: the genomes of the offspring, for the batched crossovers
+        """
+        if self.toolbox.mate.func in self.BATCH_CROSSOVERS:
+            self._mate_in_batch(offspring, block)
+        else:
+            for i in range(1, len(offspring), 2):
+                if self.rng.random() < self.crossover_probability:
+                    self.toolbox.mate(offspring[i - 1], offspring[i], rng=self.rng)
+                    del offspring[i - 1].fitness.values, offspring[i].fitness.values
+
+        if self.toolbox.mutate.func in self.BATCH_MUTATIONS:
+            mutants = [ind for ind, draw in zip(offspring, self.rng.random(size=len(offspring)))
+                       if draw < self.mutation_probability]
+            if mutants:
+                self.toolbox.mutate(mutants, rng=self.rng)
+            for ind in mutants:
+                del ind.fitness.values
+            return
+
+        for i in range(len(offspring)):
+            if self.rng.random() < self.mutation_probability:
+                self.toolbox.mutate(offspring[i], rng=self.rng)
+                del offspring[i].fitness.values
+
+    def _repair_in_place(self, offspring, block) -> int:
+        """:return: number of repaired line-hours"""
+        if self.repair == REPAIR_OFF:
+            return 0
+
+        num_repaired, boxes = repair_block(block, self.get_allowed_products(), self.repair, self.rng)
+        for i in np.flatnonzero(num_repaired):
+            mark_dirty(offspring[i], *(int(points[i]) for points in boxes))
+            del offspring[i].fitness.values
+
+        return int(num_repaired.sum())
+
+    def _mate_in_batch(self, offspring, block):
+        pairs_b = np.arange(1, len(offspring), 2)
+        pairs_b = pairs_b[self.rng.random(size=pairs_b.shape[0]) < self.crossover_probability]
+        if pairs_b.shape[0] == 0:
+            return
+
+        pairs_a = pairs_b - 1
+        boxes = self.toolbox.mate(block, pairs_a, pairs_b, rng=self.rng)
+        for i, j, line_start, line_stop, hour_start, hour_stop in zip(pairs_a, pairs_b, *boxes):
+            if line_start < line_stop and hour_start < hour_stop:
+                mark_dirty(offspring[i], line_start, line_stop, hour_start, hour_stop)
+                mark_dirty(offspring[j], line_start, line_stop, hour_start, hour_stop)
+            del offspring[i].fitness.values, offspring[j].fitness.values
+
     def run(self):
         """This algorithm is similar to DEAP eaSimple() algorithm, with the modification that
         hall_of_fame is used to implement an elitism mechanism. The individuals contained in the
         hall_of_fame are directly injected into the next generation and are not subject to the
         genetic operators of selection, crossover and mutation.
+        in the array engine mode, the same algorithm runs on a genomes block, see array_engine.
         """
         verbose = __debug__
         logger.info("=== RUN STARTED ===")
         logger.info(f"thread {self.ident} started")
-        population = self.toolbox.population_creator(n=self.population_size)
+        if self.engine_process is not None:
+            self._mirror_engine_process()
+            logger.info("=== RUN FINISHED ===")
+            return self.hall_of_fame.items
+
+        self._start_parallel_evaluation()
+        try:
+            self.logbook.header = self._get_logbook_header()
+
+            if self.hall_of_fame is None:
+                raise ValueError("hall_of_fame parameter must not be empty!")
+
+            # island and coevolution runs live in their workers' processes, they are not checkpointed. re-plans are
+            # short, and their frozen schedule is not stored, nor is the window or level of the run
+            if self.island_model["applied"]:
+                run_island_model(self, verbose)
+            elif self.coevolution["applied"] and self.frozen_schedule is None:
+                run_coevolution(self, verbose)
+            elif self.rolling_horizon["applied"] and self.frozen_schedule is None:
+                run_rolling_horizon(self, verbose)
+            elif self.multi_resolution["applied"] and self.frozen_schedule is None:
+                run_multi_resolution(self, verbose)
+            elif self.checkpoint["applied"] and self.checkpoint_dir is not None and self.frozen_schedule is None:
+                run_checkpointed(self, verbose)
+            else:
+                self._evolve(self.start_evolution(verbose))
+
+            # the stopping conditions are met, there's nothing to resume. a terminated run exits while paused, and a
+            # failed one raises - both keep their checkpoint
+            if not self.terminate_run:
+                self.delete_checkpoint()
+        finally:
+            self._stop_parallel_evaluation()
 
-        self.logbook.header = ['generation', 'nevals'] + (self.stats.fields if self.stats else [])
-
-        # Evaluate the individuals with an invalid fitness
-        invalid_ind = [ind for ind in population if not ind.fitness.valid]
-        fitnesses = self.toolbox.map(self.toolbox.evaluate, invalid_ind)
-        for ind, fit in zip(invalid_ind, fitnesses):
-            ind.fitness.values = fit
-
-        if self.hall_of_fame is None:
-            raise ValueError("hall_of_fame parameter must not be empty!")
-
-        self.hall_of_fame.update(population)
-        hof_size = len(self.hall_of_fame.items) if self.hall_of_fame.items else 0
-
-        record = self.stats.compile(population) if self.stats else {}
-        self.logbook.record(generation=0, nevals=len(invalid_ind), **record)
-        if verbose:
-            logger.info(self.logbook.stream)
+        logger.info("=== RUN FINISHED ===")
+        return self.hall_of_fame.items
 
+    def _evolve(self, perform_single_generation: Callable[[int], None], generation=1, generation_offset=0,
+                elapsed_time=0, last_generation: Optional[int] = None,
+                after_generation: Optional[Callable[[int, float], None]] = None) -> Tuple[int, float]:
+        """
+        performs generations until the stopping conditions are met, pausing on demand.
+        :param generation_offset: generations performed before, not counted by the stopping conditions
+        :param elapsed_time: seconds the run took before, counted by the stopping conditions
+        :param last_generation: generation to stop after, even if the stopping conditions are not met
+        :param after_generation: called with the generation number and the seconds the run took after every
+                                 generation, e.g. to checkpoint the run
+        :return: the next generation number and the seconds the run took, pauses excluded
+        """
         paused_total_time = 0
-        start_time = time.time()
-        generation = 1
+        start_time = time.time() - elapsed_time
         cur_fitness = -1
-        while not self.should_finish(generation, cur_fitness, time.time() - start_time - paused_total_time):
+        self.stagnation = Stagnation(generation - generation_offset)
+        while (last_generation is None or generation <= last_generation) and \
+                not self.should_finish(generation - generation_offset, cur_fitness,
+                                       time.time() - start_time - paused_total_time):
             cur_fitness = self.hall_of_fame.items[0].fitness.values[0]
             while self.paused:
                 paused_time = time.time()
@@ -348,14 +945,142 @@ class EAEngine(threading.Thread):
                 paused_total_time += (time.time() - paused_time)
                 logger.info(f'paused total time: {paused_total_time}')
 
-            self._perform_single_generation(population, generation, hof_size, verbose)
+            perform_single_generation(generation)
+            if after_generation is not None:
+                after_generation(generation, time.time() - start_time - paused_total_time)
             generation += 1
 
-        logger.info("=== RUN FINISHED ===")
-        return self.hall_of_fame.items
+        return generation, time.time() - start_time - paused_total_time
+
+    def set_resolution(self, resolution: Optional[TimeBuckets]):
+        """the resolution of the genomes being evolved, None is the hourly resolution. see multi_resolution"""
+        self.resolution = resolution
+        # cached fitnesses are of genomes of the previous resolution
+        self.fitness_cache.clear()
+        self.delta_evaluation = self._should_use_delta_evaluation()
+
+    def start_evolution(self, verbose, state: Optional[RunState] = None, generation=0) -> Callable[[int], None]:
+        """
+        creates and evaluates the initial population, in the engine mode.
+        :param state: checkpointed run state to continue from instead, see checkpoint.run_checkpointed()
+        :param generation: generation number of the initial population
+        :return: the single generation step, taking the generation number
+        """
+        if self.engine_mode == ARRAY_ENGINE_MODE:
+            return self._start_array_evolution(verbose, state, generation)
+        return self._start_evolution(verbose, state, generation)
+
+    def _start_evolution(self, verbose, state: Optional[RunState], generation) -> Callable[[int], None]:
+        if state is None:
+            population = self.toolbox.population_creator(n=self.population_size, seeded=True)
+
+            # Evaluate the individuals with an invalid fitness
+            nevals, cache_hits = self._evaluate_invalid_individuals(population)
+
+            self.hall_of_fame.update(population)
+            self.num_elites = len(self.hall_of_fame.items) if self.hall_of_fame.items else 0
+        else:
+            population = [np.array(genome).view(creator.Individual) for genome in state.population_genomes]
+            for ind, fitness in zip(population, state.population_fitness):
+                ind.fitness = creator.FitnessMin((fitness,))
+            self.num_elites = state.num_elites
+
+        arena = PopulationArena(population)
+        self.population = arena
+
+        if state is None:
+            record = self.stats.compile(population) if self.stats else {}
+            self.logbook.record(generation=generation, nevals=nevals, cache_hits=cache_hits, repairs=0, **record)
+            if verbose:
+                logger.info(self.logbook.stream)
+
+        return partial(self._perform_single_generation, arena, hof_size=self.num_elites, verbose=verbose)
+
+    def _start_array_evolution(self, verbose, state: Optional[RunState], generation) -> Callable[[int], None]:
+        """same as _start_evolution(), in the array engine mode"""
+        evolution = ArrayEvolution(self)
+        self.population = evolution
+        if state is None:
+            nevals, cache_hits = evolution.start()
+            self.logbook.record(generation=generation, nevals=nevals, cache_hits=cache_hits, repairs=0,
+                                **evolution.compile_statistics(self.stats))
+            if verbose:
+                logger.info(self.logbook.stream)
+        else:
+            evolution.restore(state.population_genomes, state.population_fitness, state.num_elites)
+        self.num_elites = evolution.hof_size
+
+        def perform_single_generation(gen):
+            generation_start = time.time()
+            nevals, cache_hits, repairs = evolution.perform_single_generation()
+            local_search = self._local_search_stage(gen, generation_start)
+            self.logbook.record(generation=gen, nevals=nevals, cache_hits=cache_hits, repairs=repairs,
+                                **evolution.compile_statistics(self.stats), **local_search)
+            if verbose:
+                logger.info(self.logbook.stream)
+
+        return perform_single_generation
+
+    def reevaluate(self) -> int:
+        """
+        re-evaluates the current population and the hall of fame, e.g. after the frozen schedule's lines were replaced.
+        :return: number of evaluations performed
+        """
+        # cached fitnesses are of the previous frozen part
+        self.fitness_cache.clear()
+        self.population.set_fitness(self._evaluate_genomes(self.population.genomes))
+
+        genomes = self.hall_of_fame.genomes
+        self.hall_of_fame.clear()
+        self.hall_of_fame.update_block(genomes, self._evaluate_genomes(genomes))
+        return self.population.genomes.shape[0] + genomes.shape[0]
+
+    def delete_checkpoint(self):
+        if self.checkpoint_dir is not None:
+            delete_checkpoint(self.checkpoint_dir)
+
+    def has_checkpoint(self) -> bool:
+        return self.checkpoint_dir is not None and has_checkpoint(self.checkpoint_dir)
+
+    def start(self):
+        if self.executor == PROCESS_EXECUTOR:
+            # created before the thread starts, so the run can be paused right away
+            self.engine_process = EngineProcess(site_data=self.site_data, engine_settings=self.to_dict(),
+                                                checkpoint_dir=self.checkpoint_dir, seeds=self.seeds,
+                                                frozen_schedule=self.frozen_schedule)
+        super().start()
+
+    def _mirror_engine_process(self):
+        """keeps the logbook, hall of fame and progress up to date with the run of the engine process"""
+        self.logbook.header = self._get_logbook_header()
+        for snapshot in self.engine_process.snapshots():
+            for record in snapshot["records"]:
+                self.logbook.record(**record)
+            if snapshot["hall_of_fame"] is not None:
+                self.hall_of_fame.update_block(*snapshot["hall_of_fame"])
+            for cond_id, progress in snapshot["progress"].items():
+                self.stopping_conditions_configuration[cond_id].progress = progress
+
+    def _start_parallel_evaluation(self):
+        # the workers evaluate full schedules, re-planned sub-genomes are evaluated in process
+        if self.parallel_evaluation["applied"] and self.frozen_schedule is None:
+            self.parallel_evaluator = ParallelEvaluator(site_data=self.site_data,
+                                                        constraints_manager=self.constraints_manager,
+                                                        num_workers=self.parallel_evaluation["num_workers"],
+                                                        genome_encoding=self.genome_encoding)
+
+    def _stop_parallel_evaluation(self):
+        if self.parallel_evaluator is not None:
+            self.parallel_evaluator.close()
+            self.parallel_evaluator = None
 
     def pause(self):
         logger.info(f"thread {self.ident} paused")
+        if self.engine_process is not None:
+            self.engine_process.send("pause")
+            self.paused = True
+            return
+
         self.pause_cond.acquire()
         # If in sleep, we acquire immediately, otherwise we wait for thread
         # to release condition. In race, worker will still see self.paused
@@ -364,6 +1089,11 @@ class EAEngine(threading.Thread):
 
     def resume(self):
         logger.info(f"thread {self.ident} resumed")
+        if self.engine_process is not None:
+            self.engine_process.send("resume")
+            self.paused = False
+            return
+
         self.pause_cond.acquire()
         self.paused = False
         # Notify so thread will wake after lock released
@@ -371,55 +1101,92 @@ class EAEngine(threading.Thread):
         # Now release the lock
         self.pause_cond.release()
 
-    def set_stopping_condition(self, cond_id: str, bound, applied):
+    def set_stopping_condition(self, cond_id: str, bound, applied, **params):
+        """
+        :param params: epsilon and restarts of the stagnation condition, see StagnationCondition
+        """
         logger.info(f"Set stopping condition to {cond_id}, bound {bound}")
-        self.stopping_conditions_configuration[cond_id] = StoppingCondition(applied=applied, bound=bound)
+        if cond_id == "STAGNATION_STOPPING_CONDITION":
+            cond = StagnationCondition(applied=applied, bound=bound, **params)
+            if cond.epsilon < 0 or cond.restarts < 0 or (applied and cond.bound < 1):
+                raise ValueError(f"stagnation condition must have a positive bound, a non negative epsilon and "
+                                 f"restarts, got {cond}")
+        else:
+            cond = StoppingCondition(applied=applied, bound=bound, **params)
+        self.stopping_conditions_configuration[cond_id] = cond
 
     def delete_stopping_condition(self, cond_id: str):
         logger.info(f"delete stopping condition {cond_id}")
-        self.stopping_conditions_configuration[cond_id] = StoppingCondition(applied=False, bound=0)
+        self.stopping_conditions_configuration[cond_id] = StagnationCondition(applied=False, bound=0) \
+            if cond_id == "STAGNATION_STOPPING_CONDITION" else StoppingCondition(applied=False, bound=0)
 
     def should_finish(self, generation, fitness, time):
         should_stop = False
         time_cond = self.stopping_conditions_configuration.get("TIME_STOPPING_CONDITION")
         fitness_cond = self.stopping_conditions_configuration.get("FITNESS_STOPPING_CONDITION")
         generations_cond = self.stopping_conditions_configuration.get("GENERATIONS_STOPPING_CONDITION")
+        stagnation_cond = self.stopping_conditions_configuration.get("STAGNATION_STOPPING_CONDITION")
 
         should_stop = should_stop or (
                         time_cond.bound < time and time_cond.applied) or (
                         fitness_cond.bound > fitness and fitness_cond.applied) or (
                         generations_cond.bound < generation and generations_cond.applied)
 
+        self.stagnation.track(generation, fitness, stagnation_cond.epsilon)
+        should_stop = should_stop or self.stagnation.should_stop(stagnation_cond, generation, self._restart_population)
+
         self.update_progress(time, fitness, generation)
 
         return should_stop
 
+    def _restart_population(self) -> bool:
+        """
+        re-diversifies a stagnated population: all the individuals but the best num_elites are replaced with new
+        ones (see _create_genomes). the hall of fame is kept, and is injected into the next generations as usual.
+        :return: whether the population was restarted, islands and coevolving lines evolve theirs in their workers
+        """
+        if self.population is None:
+            return False
+
+        genomes = self._create_genomes(self.population.genomes.shape[0] - self.num_elites)
+        self.population.immigrate(genomes, self._evaluate_genomes(genomes))
+        return True
+
     def update_progress(self, time, fitness, generation):
         time_cond = self.stopping_conditions_configuration.get("TIME_STOPPING_CONDITION")
         fitness_cond = self.stopping_conditions_configuration.get("FITNESS_STOPPING_CONDITION")
         generations_cond = self.stopping_conditions_configuration.get("GENERATIONS_STOPPING_CONDITION")
+        stagnation_cond = self.stopping_conditions_configuration.get("STAGNATION_STOPPING_CONDITION")
 
         time_cond.progress = time_cond.bound if time_cond.bound == 0 else round((time / time_cond.bound) * 100, 0)
         generations_cond.progress = generations_cond.bound if generations_cond.bound == 0 \
             else round((generation / generations_cond.bound) * 100, 0)
         fitness_cond.progress = fitness_cond.bound if fitness_cond.bound == 0 else \
             round((1 - (float(fitness) - fitness_cond.bound) / float(fitness)) * 100, 0)
+        stagnation_cond.progress = self.stagnation.progress(stagnation_cond, generation)
+
+        if self.current_window is not None:
+            # aggregated over the rolling horizon windows, the windows before the current one are complete
+            index, num_windows = self.current_window
+            for cond in (time_cond, generations_cond, fitness_cond, stagnation_cond):
+                if cond.bound != 0:
+                    cond.progress = round((index * 100 + min(cond.progress, 100)) / num_windows, 0)
 
     def notify_run_termination(self):
         self.terminate_run = True
+        if self.engine_process is not None:
+            self.engine_process.send("notify_run_termination")
+            return
+
         self.resume()
 
     def new_engine_from_existing(self):
+        """
+        :return: an engine with the same settings, for the next run. all EA parameters are maintained, registered on
+                 a toolbox of its own - so its creators and evaluation are bound to it, not to this engine
+        """
         new_engine = EAEngine(self.site_data)
+        new_engine.configure(self.to_dict())
+        new_engine.checkpoint_dir = self.checkpoint_dir
 
-        new_engine.set_population_size(self.population_size)
-        new_engine.stopping_conditions_configuration = self.stopping_conditions_configuration
-        self._reset_run_progression(new_engine.stopping_conditions_configuration)
-
-        new_engine.toolbox = self.toolbox  # all EA parameters are maintained
-
-        return new_engine
-
-    def _reset_run_progression(self, stopping_conditions_configuration):
-        for stopping_cond in stopping_conditions_configuration.values():
-            stopping_cond.progress = 0
\ No newline at end of file
+        return new_engine
\ No newline at end of file
@@ -0,0 +1,122 @@
+"""
+hall of fame with hash-indexed duplicates detection.
+
+DEAP's HallOfFame compares every candidate to its entries with similar() (np.array_equal), and deep copies the
+inserted individuals - quadratic in the hall of fame size. the archive keys its entries by a digest of their
+genome, so a duplicate is found with a dict lookup, and keeps them in a heap with the worst entry on top, so a
+candidate is rejected with a single comparison and inserted in O(log size).
+"""
+import heapq
+from copy import deepcopy
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from deap import creator
+
+from src.genetic_engine.fitness_cache import FitnessCache
+
+
+class EliteArchive:
+    """
+    drop-in replacement of DEAP's HallOfFame(maxsize, similar=np.array_equal), for single objective fitnesses.
+    :param maxsize: maximum number of individuals kept
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: Dict[bytes, np.ndarray] = dict()
+        # (wvalues, insertion number, digest) of every entry, the worst (and oldest among equals) first
+        self._heap: List[Tuple[tuple, int, bytes]] = []
+        self._insertions = 0
+        # best first, rebuilt on every change - so readers from other threads always see a complete list
+        self._items: List = []
+        self._block: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def items(self) -> List:
+        """the archived individuals, best first. among equally fit individuals, the newer comes first"""
+        return self._items
+
+    @property
+    def genomes(self) -> np.ndarray:
+        """(individuals, ...) genomes block of the items"""
+        return self._get_block()[0]
+
+    @property
+    def fitness(self) -> np.ndarray:
+        """fitness vector of the items"""
+        return self._get_block()[1]
+
+    def update(self, population: List):
+        """same as HallOfFame.update(), the inserted individuals are copied"""
+        changed = False
+        for ind in population:
+            if self._accepts(ind.fitness.wvalues):
+                key = FitnessCache.digest(ind)
+                if key not in self._entries:
+                    self._insert(key, self._copy(ind))
+                    changed = True
+        if changed:
+            self._refresh()
+
+    def update_block(self, genomes: np.ndarray, fitness: np.ndarray):
+        """
+        update() with an evaluated (individuals, ...) genomes block and its fitness vector.
+        candidates are filtered by fitness in bulk, individuals are created for the inserted genomes only.
+        """
+        weight = creator.FitnessMin.weights[0]
+        wvalues = fitness * weight
+        candidates = np.arange(fitness.shape[0]) if len(self._heap) < self.maxsize \
+            else np.flatnonzero(wvalues > self._heap[0][0][0])
+
+        changed = False
+        for row in candidates:
+            if self._accepts((wvalues[row],)):
+                key = FitnessCache.digest(genomes[row])
+                if key not in self._entries:
+                    ind = np.array(genomes[row]).view(creator.Individual)
+                    ind.fitness = creator.FitnessMin()
+                    ind.fitness.values = (fitness[row],)
+                    self._insert(key, ind)
+                    changed = True
+        if changed:
+            self._refresh()
+
+    def clear(self):
+        self._entries.clear()
+        self._heap.clear()
+        self._items = []
+        self._block = None
+
+    def _accepts(self, wvalues) -> bool:
+        return len(self._heap) < self.maxsize or wvalues > self._heap[0][0]
+
+    def _insert(self, key: bytes, ind):
+        if len(self._heap) == self.maxsize:
+            _, _, worst_key = heapq.heappop(self._heap)
+            del self._entries[worst_key]
+        self._insertions += 1
+        heapq.heappush(self._heap, (ind.fitness.wvalues, self._insertions, key))
+        self._entries[key] = ind
+
+    def _refresh(self):
+        self._items = [self._entries[key] for _, _, key in sorted(self._heap, reverse=True)]
+        self._block = None
+
+    def _get_block(self) -> Tuple[np.ndarray, np.ndarray]:
+        if self._block is None:
+            self._block = (np.stack(self._items).view(np.ndarray),
+                           np.array([ind.fitness.values[0] for ind in self._items]))
+        return self._block
+
+    @staticmethod
+    def _copy(ind):
+        """copies the genome and its evaluation state, without the arena slot of population arena views"""
+        copy = np.array(ind).view(type(ind))
+        copy.fitness = deepcopy(ind.fitness)
+        copy.dirty_regions = list(getattr(ind, "dirty_regions", []))
+        copy.schedule_counts = deepcopy(getattr(ind, "schedule_counts", None))
+        return copy
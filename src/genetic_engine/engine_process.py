@@ -0,0 +1,135 @@
+"""
+engine executors.
+
+thread - the engine runs as a thread of the server process, so all the running problems share its GIL.
+process - the engine runs in a dedicated worker process. the server's engine only mirrors the run: pause / resume /
+          terminate are forwarded over a control channel, and the worker publishes snapshots of its logbook, hall of
+          fame and progress back.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+from src.database.models import SiteData as SiteDataDB
+from src.genetic_engine.ea_conf import ENGINE_SNAPSHOT_INTERVAL
+from src.genetic_engine.parallel_evaluation import site_data_columns
+from src.genetic_engine.replanning import FrozenSchedule
+
+logger = logging.getLogger()
+
+THREAD_EXECUTOR = "thread"
+PROCESS_EXECUTOR = "process"
+ENGINE_EXECUTORS = (THREAD_EXECUTOR, PROCESS_EXECUTOR)
+
+# engine methods the server may call on a running engine
+_CONTROL_COMMANDS = ("pause", "resume", "notify_run_termination")
+
+
+def _engine_main(connection, site_columns: Dict, engine_settings: Dict, checkpoint_dir: Optional[str],
+                 seeds: Optional[np.ndarray], frozen_schedule: Optional[FrozenSchedule]):
+    """runs the engine as a thread of this worker process, while serving the control channel"""
+    from src.genetic_engine.ea_engine import EAEngine  # the engine module imports this one
+
+    engine = EAEngine(site_data=SiteDataDB(**site_columns))
+    engine.configure({**engine_settings, "executor": THREAD_EXECUTOR})
+    engine.checkpoint_dir = checkpoint_dir
+    engine.seeds = seeds
+    engine.set_frozen_schedule(frozen_schedule)
+    publisher = _SnapshotPublisher(engine)
+    engine.start()
+
+    while engine.is_alive():
+        try:
+            if connection.poll(ENGINE_SNAPSHOT_INTERVAL):
+                command = connection.recv()
+                if command in _CONTROL_COMMANDS:
+                    getattr(engine, command)()
+        except EOFError:  # the server process is gone, nobody is left to stop the run
+            os._exit(1)
+
+        snapshot = publisher.snapshot(finished=False)
+        if snapshot["records"] or snapshot["hall_of_fame"] is not None:
+            connection.send(snapshot)
+
+    engine.join()
+    connection.send(publisher.snapshot(finished=True))
+    connection.close()
+
+
+class _SnapshotPublisher:
+    """the parts of the engine's state which changed since the last snapshot"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._num_records = 0
+        self._hall_of_fame_items = None
+
+    def snapshot(self, finished: bool) -> Dict:
+        records = [dict(record) for record in self.engine.logbook[self._num_records:]]
+        self._num_records += len(records)
+
+        # the archive swaps its items list on every change
+        hall_of_fame = None
+        with self.engine.window_lock:
+            items = self.engine.hall_of_fame.items
+            if items and items is not self._hall_of_fame_items:
+                self._hall_of_fame_items = items
+                # full schedules, the server's engine doesn't follow the windows of a rolling horizon or the levels of
+                # a multi-resolution run
+                genomes = self.engine.get_schedules(np.stack(items).view(np.ndarray))
+                hall_of_fame = (genomes, np.array([ind.fitness.values[0] for ind in items]))
+
+        progress = {cond_id: cond.progress for cond_id, cond in self.engine.stopping_conditions_configuration.items()}
+        return {"records": records, "hall_of_fame": hall_of_fame, "progress": progress, "finished": finished}
+
+
+class EngineProcess:
+    """
+    server side handle of an engine running in a worker process.
+    :param engine_settings: engine json (see EAEngineFacade) of the engine to run
+    :param checkpoint_dir: checkpoint directory of the engine to run
+    :param seeds: seeds genomes block of the engine to run
+    :param frozen_schedule: frozen schedule of the engine to run, when re-planning
+    """
+
+    def __init__(self, site_data: SiteDataDB, engine_settings: Dict, checkpoint_dir: Optional[str] = None,
+                 seeds: Optional[np.ndarray] = None, frozen_schedule: Optional[FrozenSchedule] = None):
+        # spawn, since forking the multi-threaded server process is unsafe. not a daemon, so the engine may still
+        # start its own worker processes (islands, parallel evaluation)
+        context = multiprocessing.get_context("spawn")
+        self._connection, engine_connection = context.Pipe()
+        self._process = context.Process(target=_engine_main,
+                                        args=(engine_connection, site_data_columns(site_data), engine_settings,
+                                              checkpoint_dir, seeds, frozen_schedule))
+        self._process.start()
+        engine_connection.close()
+        self._send_lock = threading.Lock()
+        logger.info(f"engine process {self._process.pid} started")
+
+    def send(self, command: str):
+        """:param command: one of the control commands - pause, resume or notify_run_termination"""
+        with self._send_lock:
+            try:
+                self._connection.send(command)
+            except (BrokenPipeError, OSError):  # the run is already over
+                pass
+
+    def snapshots(self) -> Iterator[Dict]:
+        """the snapshots published by the engine process, until its run is over"""
+        while True:
+            try:
+                snapshot = self._connection.recv()
+            except EOFError:
+                logger.error(f"engine process {self._process.pid} exited unexpectedly")
+                break
+            yield snapshot
+            if snapshot["finished"]:
+                break
+
+        self._process.join()
+        self._connection.close()
+        logger.info(f"engine process {self._process.pid} stopped")
@@ -0,0 +1,54 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+
+class FitnessCache:
+    """
+    bounded LRU cache of fitness values, keyed by a digest of the individual's genome.
+    once the population converges most offspring are copies of existing genomes, so their fitness is already known.
+    a max_size of 0 disables the cache.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def digest(individual) -> bytes:
+        genome = np.asarray(individual)
+        if genome.ndim == 2:  # product_index genome, already compact
+            return hashlib.blake2b(np.ascontiguousarray(genome).tobytes(), digest_size=16).digest()
+        # genes are 0/1, so packing them into bits is lossless and much cheaper to hash than the raw int64 bytes
+        return hashlib.blake2b(np.packbits(genome.astype(bool, copy=False)).tobytes(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[float]:
+        fitness = self._entries.get(key)
+        if fitness is not None:
+            self._entries.move_to_end(key)
+        return fitness
+
+    def put(self, key: bytes, fitness: float):
+        if not self.enabled:
+            return
+        self._entries[key] = fitness
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def resize(self, max_size: int):
+        self.max_size = max_size
+        while len(self._entries) > max(self.max_size, 0):
+            self._entries.popitem(last=False)
@@ -0,0 +1,39 @@
+"""
+individuals can be encoded in one of two ways:
+
+one_hot - (lines, products, hours) array of 0/1, 1 where the product is manufactured on the line at that hour.
+product_index - (lines, hours) array holding the manufactured product index, or IDLE. at most one product per
+                line-hour is valid by construction, and it takes 1 byte per slot instead of 8 * num_products.
+
+the rest of the system (solution schedule, analysis) works with one_hot schedules, so product_index individuals
+are converted at those boundaries.
+"""
+import numpy as np
+
+ONE_HOT_ENCODING = "one_hot"
+PRODUCT_INDEX_ENCODING = "product_index"
+GENOME_ENCODINGS = (ONE_HOT_ENCODING, PRODUCT_INDEX_ENCODING)
+
+IDLE = -1
+
+
+def product_index_dtype(num_products: int):
+    return np.int8 if num_products <= np.iinfo(np.int8).max else np.int16
+
+
+def to_one_hot(genome: np.ndarray, num_products: int) -> np.ndarray:
+    """:param genome: product index schedule(s) of shape (..., lines, hours)
+    :return: one hot schedule(s) of shape (..., lines, products, hours)"""
+    genome = np.asarray(genome)
+    return (genome[..., None, :] == np.arange(num_products)[:, None]).astype(int)
+
+
+def to_product_index(schedule: np.ndarray) -> np.ndarray:
+    """
+    :param schedule: one hot schedule(s) of shape (..., lines, products, hours)
+    :return: product index schedule(s) of shape (..., lines, hours).
+             if several products share a line-hour, the lowest product index is kept.
+    """
+    schedule = np.asarray(schedule)
+    genome = np.where(schedule.any(axis=-2), schedule.argmax(axis=-2), IDLE)
+    return genome.astype(product_index_dtype(schedule.shape[-2]))
@@ -0,0 +1,194 @@
+"""
+island model.
+
+the problem's population is split into islands, every island evolving its own population with its own EAEngine in a
+dedicated worker process - possibly with different operator settings. every migration_interval generations, the
+best individuals of every island migrate to other islands, replacing their worst individuals:
+
+ring - island i sends its migrants to island i + 1.
+all_to_all - every island sends its migrants to all the other islands.
+
+after every generation the islands report their logbook record and their best individuals, which are merged into
+the logbook and the hall of fame of the problem's engine (see run_island_model).
+"""
+import logging
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.database.models import SiteData as SiteDataDB
+from src.genetic_engine.parallel_evaluation import site_data_columns
+from src.genetic_engine.replanning import FrozenSchedule
+
+logger = logging.getLogger()
+
+RING_TOPOLOGY = "ring"
+ALL_TO_ALL_TOPOLOGY = "all_to_all"
+ISLAND_TOPOLOGIES = (RING_TOPOLOGY, ALL_TO_ALL_TOPOLOGY)
+
+# engine settings which may differ between the islands. migrants move between islands as they are, so the islands
+# share the genome encoding
+ISLAND_SETTINGS = ("population_size", "selection_method", "crossover_method", "mutations", "initialization", "repair",
+                   "engine_mode")
+
+# logbook fields summed over the islands, the statistics are merged by their name (min_*, max_*, or averaged)
+_SUMMED_FIELDS = ("nevals", "cache_hits", "repairs", "local_search_moves")
+
+# (logbook record, best genomes, best fitness) reported by an island after every generation
+IslandReport = Tuple[Dict, np.ndarray, np.ndarray]
+
+
+def _island_main(connection, site_columns: Dict, engine_settings: Dict, seeds: Optional[np.ndarray],
+                 frozen_schedule: Optional[FrozenSchedule]):
+    """evolves one island, a generation per message received from the IslandModel"""
+    from src.genetic_engine.ea_engine import EAEngine  # the engine module imports this one
+
+    engine = EAEngine(site_data=SiteDataDB(**site_columns))
+    engine.configure(engine_settings)
+    engine.seeds = seeds
+    engine.set_frozen_schedule(frozen_schedule)
+    perform_single_generation = engine.start_evolution(verbose=False)
+    connection.send(_report(engine, num_best=1))
+
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+
+        generation, immigrants, num_emigrants = message
+        if immigrants is not None:
+            engine.population.immigrate(*immigrants)
+        perform_single_generation(generation)
+        connection.send(_report(engine, num_best=max(num_emigrants, 1)))
+
+    connection.close()
+
+
+def _report(engine, num_best) -> IslandReport:
+    return dict(engine.logbook[-1]), engine.hall_of_fame.genomes[:num_best], engine.hall_of_fame.fitness[:num_best]
+
+
+def merge_records(records: List[Dict]) -> Dict:
+    """
+    merges the logbook records of the islands' generation into a single record.
+    averaged statistics are averaged over the islands, so they are exact for islands of the same population size.
+    """
+    merged = dict()
+    for key in records[0]:
+        values = [record[key] for record in records]
+        if key == "generation":
+            merged[key] = values[0]
+        elif key in _SUMMED_FIELDS:
+            merged[key] = sum(values)
+        elif key.startswith("min"):
+            merged[key] = min(values)
+        elif key.startswith("max"):
+            merged[key] = max(values)
+        else:
+            merged[key] = np.mean(values)
+    return merged
+
+
+class IslandModel:
+    """
+    :param islands_settings: engine json (see EAEngineFacade) of every island
+    :param migration_interval: generations between migrations
+    :param num_migrants: best individuals sent by every island on each migration
+    :param topology: one of ISLAND_TOPOLOGIES
+    :param seeds: genomes block warm starting every island, see EAEngine.seeds
+    :param frozen_schedule: frozen schedule of every island, when re-planning
+    """
+
+    def __init__(self, site_data: SiteDataDB, islands_settings: List[Dict], migration_interval: int,
+                 num_migrants: int, topology: str, seeds: Optional[np.ndarray] = None,
+                 frozen_schedule: Optional[FrozenSchedule] = None):
+        self.migration_interval = migration_interval
+        self.num_migrants = num_migrants
+        self.topology = topology
+
+        # spawn, since forking the multi-threaded server process is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._connections = []
+        self._processes = []
+        for settings in islands_settings:
+            connection, island_connection = context.Pipe()
+            process = context.Process(target=_island_main, args=(island_connection, site_data_columns(site_data),
+                                                                 settings, seeds, frozen_schedule),
+                                      daemon=True)
+            process.start()
+            island_connection.close()
+            self._connections.append(connection)
+            self._processes.append(process)
+        self._immigrants = [None] * len(islands_settings)
+        logger.info(f"island model started with {len(islands_settings)} islands")
+
+    def start(self) -> List[IslandReport]:
+        """:return: the reports of the islands' initial populations"""
+        return [connection.recv() for connection in self._connections]
+
+    def perform_single_generation(self, generation) -> List[IslandReport]:
+        """evolves all the islands by one generation, in parallel. the migrants of the last migration arrive first"""
+        migrate = generation % self.migration_interval == 0
+        for connection, immigrants in zip(self._connections, self._immigrants):
+            connection.send((generation, immigrants, self.num_migrants if migrate else 0))
+        reports = [connection.recv() for connection in self._connections]
+
+        self._immigrants = self._migrants_by_destination(reports) if migrate and self.num_migrants > 0 \
+            else [None] * len(reports)
+        return reports
+
+    def _migrants_by_destination(self, reports: List[IslandReport]) -> List[Tuple[np.ndarray, np.ndarray]]:
+        emigrants = [(genomes[:self.num_migrants], fitness[:self.num_migrants]) for _, genomes, fitness in reports]
+        if self.topology == RING_TOPOLOGY:
+            return [emigrants[i - 1] for i in range(len(emigrants))]
+
+        return [(np.concatenate([genomes for j, (genomes, _) in enumerate(emigrants) if j != i]),
+                 np.concatenate([fitness for j, (_, fitness) in enumerate(emigrants) if j != i]))
+                for i in range(len(emigrants))]
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.send(None)
+            except (BrokenPipeError, OSError):  # the island is already gone
+                pass
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        for connection in self._connections:
+            connection.close()
+        logger.info("island model stopped")
+
+
+def run_island_model(engine, verbose):
+    """
+    evolves the engine's population as islands until the engine's stopping conditions are met. the islands report
+    their generations to the engine.
+    """
+    # the islands already take a core each
+    settings = {**engine.to_dict(), "parallel_evaluation": {"applied": False, "num_workers": 0}}
+    del settings["island_model"]
+    num_islands = engine.island_model["num_islands"]
+    overrides = engine.island_model["islands"] or [{}]
+    random_seeds = engine._spawn_random_seeds(num_islands)
+    islands_settings = [{**settings, "random_seed": random_seeds[i], **overrides[i % len(overrides)]}
+                        for i in range(num_islands)]
+
+    def record_generation(reports: List[IslandReport]):
+        for _, best_genomes, best_fitness in reports:
+            engine.hall_of_fame.update_block(best_genomes, best_fitness)
+        engine.logbook.record(**merge_records([record for record, _, _ in reports]))
+        if verbose:
+            logger.info(engine.logbook.stream)
+
+    islands = IslandModel(site_data=engine.site_data, islands_settings=islands_settings,
+                          migration_interval=engine.island_model["migration_interval"],
+                          num_migrants=engine.island_model["num_migrants"], topology=engine.island_model["topology"],
+                          seeds=engine.seeds, frozen_schedule=engine.frozen_schedule)
+    try:
+        record_generation(islands.start())
+        engine._evolve(lambda gen: record_generation(islands.perform_single_generation(gen)))
+    finally:
+        islands.close()
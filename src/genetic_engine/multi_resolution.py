@@ -0,0 +1,92 @@
+"""
+multi-resolution (coarse to fine) evolution.
+
+every genome slot is an hour of the horizon, so the GA searches the full resolution from the first generation. in the
+multi-resolution mode the run goes through levels of coarser time buckets first - e.g. shifts - where every slot of the
+genome is a bucket of bucket_hours hours, and ends with the hourly level. every level is seeded with the best genomes
+of the previous one, converted to its resolution.
+
+a bucket genome stands for the hourly schedule repeating every slot over its bucket's hours, and its fitness is the
+fitness of that hourly schedule: a bucket counts as its length of occupied hours, and a run over several buckets is a
+single run - while the schedule counts are taken over the (much shorter) buckets axis.
+"""
+import logging
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger()
+
+
+class TimeBuckets:
+    """
+    :param num_hours: hours of the horizon
+    :param bucket_hours: hours of every bucket, the last bucket takes the remaining hours
+    """
+
+    def __init__(self, num_hours: int, bucket_hours: int):
+        self.bucket_hours = bucket_hours
+        self.starts = np.arange(0, num_hours, bucket_hours)
+        self.lengths = np.diff(np.append(self.starts, num_hours))
+
+    @property
+    def num_buckets(self) -> int:
+        return self.starts.shape[0]
+
+    def expand(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: the hourly genomes of (individuals, ...) bucket genomes"""
+        return np.repeat(np.asarray(genomes), self.lengths, axis=-1)
+
+    def coarsen(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: the bucket genomes of (individuals, ...) hourly genomes, every bucket takes its first hour"""
+        return np.asarray(genomes)[..., self.starts]
+
+    def evaluate(self, genomes: np.ndarray, constraints_manager) -> np.ndarray:
+        """:return: fitness vector of (individuals, ...) bucket genomes, same as of their hourly genomes"""
+        occupied_hours, num_runs = constraints_manager.get_schedule_counts(genomes, hour_weights=self.lengths)
+        return constraints_manager.evaluate_counts(occupied_hours, num_runs)
+
+
+def convert_resolution(genomes: np.ndarray, source: Optional[TimeBuckets],
+                       target: Optional[TimeBuckets]) -> np.ndarray:
+    """:return: the genomes of the source resolution converted to the target one, None is the hourly resolution"""
+    if source is not None:
+        genomes = source.expand(genomes)
+    if target is not None:
+        genomes = target.coarsen(genomes)
+    return genomes
+
+
+def run_multi_resolution(engine, verbose):
+    """evolves the engine's levels from the coarsest, each seeded with the best of the previous one"""
+    num_hours = engine.site_data.total_working_hours
+    shift_duration = engine.site_data.json_data["shift_duration"]
+    levels = [(TimeBuckets(num_hours, level["bucket_hours"] or shift_duration), level["generations"])
+              for level in engine.multi_resolution["levels"]] + [(None, None)]
+
+    generation, elapsed_time = 0, 0
+    for index, (resolution, num_generations) in enumerate(levels):
+        logger.info(f"multi-resolution level {index + 1}/{len(levels)}: "
+                    f"{resolution.bucket_hours if resolution else 1} hours buckets")
+        with engine.window_lock:
+            if len(engine.hall_of_fame):
+                engine.level_seeds = convert_resolution(engine.hall_of_fame.genomes, engine.resolution, resolution)
+            engine.set_resolution(resolution)
+            engine.hall_of_fame.clear()
+
+        perform_single_generation = engine.start_evolution(verbose, generation=generation)
+        last_generation = None if resolution is None else generation + num_generations
+        generation, elapsed_time = engine._evolve(perform_single_generation, generation=generation + 1,
+                                                  elapsed_time=elapsed_time, last_generation=last_generation)
+        # the stopping conditions are met, a stagnated level only moves on to the next one
+        if last_generation is not None and generation <= last_generation and not engine.stagnation.stagnated:
+            break
+
+    # the coarse genomes of a run stopped on a coarse level keep their fitness as hourly genomes
+    with engine.window_lock:
+        if engine.resolution is not None:
+            genomes, fitness = engine.resolution.expand(engine.hall_of_fame.genomes), engine.hall_of_fame.fitness
+            engine.hall_of_fame.clear()
+            engine.hall_of_fame.update_block(genomes, fitness)
+        engine.set_resolution(None)
+        engine.level_seeds = None
@@ -0,0 +1,116 @@
+import logging
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from typing import Dict, Optional, List, Union
+
+import numpy as np
+
+from src.database.models import SiteData as SiteDataDB
+from src.genetic_engine.constraints_manager import ConstraintsManager
+from src.genetic_engine.genome_encoding import ONE_HOT_ENCODING, PRODUCT_INDEX_ENCODING, product_index_dtype
+
+logger = logging.getLogger()
+
+# ~~~~~~ worker process state, initialized once per worker by _init_worker
+_constraints_manager: Optional[ConstraintsManager] = None
+_attached_blocks: Dict[str, shared_memory.SharedMemory] = dict()
+
+
+def site_data_columns(site_data: SiteDataDB) -> Dict:
+    """:return: the columns of the site data, to rebuild it in a worker process"""
+    return {"id": site_data.id, "json_data": site_data.json_data,
+            "num_products": site_data.num_products,
+            "num_production_lines": site_data.num_production_lines,
+            "total_working_hours": site_data.total_working_hours,
+            "individual_length": site_data.individual_length}
+
+
+def _init_worker(site_data_columns: Dict, penalties: Dict):
+    global _constraints_manager
+    # site tables are compiled once per worker, not per task
+    _constraints_manager = ConstraintsManager(db_site_data=SiteDataDB(**site_data_columns), **penalties)
+
+
+def _evaluate_slice(block_name: str, shape, dtype, start: int, stop: int) -> np.ndarray:
+    block = _attached_blocks.get(block_name)
+    if block is None:
+        # the parent reallocates the block when the population outgrows it, older blocks are not used anymore
+        for old_block in _attached_blocks.values():
+            old_block.close()
+        _attached_blocks.clear()
+        block = shared_memory.SharedMemory(name=block_name)
+        _attached_blocks[block_name] = block
+
+    population = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    if len(shape) == 3:  # product_index genomes
+        return _constraints_manager.evaluate_product_index_population(population[start:stop])
+    return _constraints_manager.evaluate_population(population[start:stop])
+
+
+class ParallelEvaluator:
+    """
+    evaluates populations on a persistent pool of worker processes, one core each.
+    individuals are written once into a shared memory block that all workers read their slice from,
+    instead of pickling every individual to the workers. only the fitness values are sent back.
+    """
+
+    def __init__(self, site_data: SiteDataDB, constraints_manager: ConstraintsManager, num_workers: int = 0,
+                 genome_encoding: str = ONE_HOT_ENCODING):
+        """
+        :param num_workers: number of worker processes, 0 means one per core
+        :param genome_encoding: encoding of the evaluated individuals, see genome_encoding
+        """
+        self.num_workers = num_workers if num_workers > 0 else (os.cpu_count() or 1)
+        self.dtype = np.dtype(product_index_dtype(site_data.num_products)
+                              if genome_encoding == PRODUCT_INDEX_ENCODING else np.bool_)
+
+        penalties = {"invalid_scheduling_penalty": constraints_manager.invalid_scheduling_penalty,
+                     "hard_constraints_penalty": constraints_manager.hard_constraints_penalty,
+                     "soft_constraints_penalty": constraints_manager.soft_constraints_penalty}
+
+        # spawn, since forking the multi-threaded server process is unsafe
+        context = multiprocessing.get_context("spawn")
+        self._pool = context.Pool(processes=self.num_workers, initializer=_init_worker,
+                                  initargs=(site_data_columns(site_data), penalties))
+        self._block: Optional[shared_memory.SharedMemory] = None
+        logger.info(f"parallel evaluation started with {self.num_workers} workers")
+
+    def evaluate(self, individuals: Union[List[np.ndarray], np.ndarray]) -> np.ndarray:
+        """
+        :param individuals: list of individuals, or a (individuals, ...) genomes block
+        :return: fitness vector of shape (len(individuals),)
+        """
+        shape = (len(individuals),) + individuals[0].shape
+        population = self._get_shared_population(shape)
+        if isinstance(individuals, np.ndarray):  # a genomes block, copied in bulk
+            population[...] = individuals != 0 if self.dtype == np.bool_ else individuals
+        else:
+            for i, ind in enumerate(individuals):
+                if self.dtype == np.bool_:
+                    np.not_equal(ind, 0, out=population[i])
+                else:
+                    population[i] = ind
+
+        bounds = np.linspace(0, len(individuals), min(self.num_workers, len(individuals)) + 1, dtype=int)
+        tasks = [(self._block.name, shape, self.dtype.str, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        return np.concatenate(self._pool.starmap(_evaluate_slice, tasks))
+
+    def _get_shared_population(self, shape) -> np.ndarray:
+        size = int(np.prod(shape)) * self.dtype.itemsize
+        if self._block is None or self._block.size < size:
+            self._release_block()
+            self._block = shared_memory.SharedMemory(create=True, size=size)
+        return np.ndarray(shape, dtype=self.dtype, buffer=self._block.buf)
+
+    def _release_block(self):
+        if self._block is not None:
+            self._block.close()
+            self._block.unlink()
+            self._block = None
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._release_block()
+        logger.info("parallel evaluation stopped")
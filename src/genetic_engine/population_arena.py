@@ -0,0 +1,155 @@
+"""
+preallocated, double buffered population storage.
+
+the genomes of the whole population live in a single (2, population size, ...) block, and every individual is a
+persistent view into one of its slots. a generation turnover copies the selected parents into the back buffer in
+bulk and swaps the buffers, instead of deep copying every offspring - so no individual (or fitness) objects are
+allocated during a run.
+"""
+from dataclasses import fields
+from typing import List, Optional
+
+import numpy as np
+
+from src.genetic_engine.tools.delta_evaluation import ScheduleCounts
+
+
+class PopulationArena:
+    """
+    :param population: initial population, copied into the arena. its individuals define the genome shape and dtype
+    """
+
+    def __init__(self, population: List):
+        template = population[0]
+        self.size = len(population)
+
+        self._genomes = np.zeros(shape=(2, self.size) + template.shape, dtype=template.dtype)
+        # fitness values of every slot, nan where the fitness is invalid
+        self._fitness = np.full(shape=(2, self.size), fill_value=np.nan)
+        # schedule counts (delta evaluation) tables, allocated with the first individual carrying counts
+        self._counts_tables: Optional[dict] = None
+        self._counts_views: Optional[List[List[ScheduleCounts]]] = None
+        self._counts_valid = np.zeros(shape=(2, self.size), dtype=bool)
+
+        individual_type, fitness_type = type(template), type(template.fitness)
+        self._individuals = [[self._create_view(buffer, slot, individual_type, fitness_type)
+                              for slot in range(self.size)] for buffer in range(2)]
+        self._current = 0
+
+        for slot, ind in enumerate(population):
+            self._store(self._current, slot, ind)
+
+    @property
+    def individuals(self) -> List:
+        return self._individuals[self._current]
+
+    @property
+    def genomes(self) -> np.ndarray:
+        """genomes of the current generation, individual i is a view of genomes[i]"""
+        return self._genomes[self._current]
+
+    @property
+    def fitness(self) -> np.ndarray:
+        """fitness values of the current generation, nan where invalid. kept up to date by sync()"""
+        return self._fitness[self._current]
+
+    def next_generation(self, parents: List, elites: List) -> List:
+        """
+        fills the back buffer with copies of the parents followed by copies of the elites, and swaps the buffers.
+        :param parents: individuals of the current generation, or an index array of their slots. may repeat
+        :param elites: any individuals, e.g. the hall of fame items
+        :return: the copies of the parents, to be varied in place
+        """
+        if len(parents) + len(elites) != self.size:
+            raise ValueError(f"expected {self.size} individuals, got {len(parents)} parents and {len(elites)} elites")
+
+        current, back = self._current, 1 - self._current
+        num_parents = len(parents)
+        if isinstance(parents, np.ndarray):
+            slots = parents.astype(np.intp, copy=False)
+            parents = [self._individuals[current][slot] for slot in slots]
+        else:
+            slots = np.fromiter((parent.arena_slot for parent in parents), dtype=np.intp, count=num_parents)
+
+        np.take(self._genomes[current], slots, axis=0, out=self._genomes[back, :num_parents])
+        self._fitness[back, :num_parents] = self._fitness[current, slots]
+        if self._counts_tables is not None:
+            for table in self._counts_tables.values():
+                np.take(table[current], slots, axis=0, out=table[back, :num_parents])
+            self._counts_valid[back, :num_parents] = self._counts_valid[current, slots]
+
+        offspring = self._individuals[back][:num_parents]
+        for child, parent in zip(offspring, parents):
+            child.fitness.wvalues = parent.fitness.wvalues
+            child.dirty_regions = list(parent.dirty_regions)
+            child.schedule_counts = self._counts_views[back][child.arena_slot] \
+                if self._counts_valid[back, child.arena_slot] else None
+
+        for slot, elite in enumerate(elites, start=num_parents):
+            self._store(back, slot, elite)
+
+        self._current = back
+        return offspring
+
+    def immigrate(self, genomes: np.ndarray, fitness: np.ndarray):
+        """replaces the worst individuals of the current generation with the given evaluated genomes"""
+        worst = np.argsort(self.fitness, kind="stable")[::-1][:fitness.shape[0]]
+        for slot, genome, fit in zip(worst, genomes, fitness):
+            view = self._individuals[self._current][slot]
+            self._genomes[self._current, slot] = genome
+            view.fitness.values = (fit,)
+            self._fitness[self._current, slot] = fit
+            view.dirty_regions = []
+            view.schedule_counts = None
+            self._sync_counts(self._current, slot, None)
+
+    def set_fitness(self, fitness: np.ndarray):
+        """assigns re-evaluated fitness values to the current generation"""
+        for ind, fit in zip(self.individuals, fitness):
+            ind.fitness.values = (fit,)
+        self._fitness[self._current] = fitness
+
+    def sync(self):
+        """
+        pulls the fitness values and schedule counts of the current generation back into the arena,
+        after they were (re)evaluated.
+        """
+        for ind in self.individuals:
+            self._fitness[self._current, ind.arena_slot] = ind.fitness.values[0] if ind.fitness.valid else np.nan
+            self._sync_counts(self._current, ind.arena_slot, ind.schedule_counts)
+
+    def _create_view(self, buffer, slot, individual_type, fitness_type):
+        ind = self._genomes[buffer, slot].view(individual_type)
+        ind.fitness = fitness_type()
+        ind.arena_slot = slot
+        ind.schedule_counts = None
+        ind.dirty_regions = []
+        return ind
+
+    def _store(self, buffer, slot, ind):
+        view = self._individuals[buffer][slot]
+        self._genomes[buffer, slot] = ind
+        view.fitness.wvalues = ind.fitness.wvalues
+        self._fitness[buffer, slot] = ind.fitness.values[0] if ind.fitness.valid else np.nan
+        view.dirty_regions = list(getattr(ind, "dirty_regions", []))
+        view.schedule_counts = getattr(ind, "schedule_counts", None)
+        self._sync_counts(buffer, slot, view.schedule_counts)
+
+    def _sync_counts(self, buffer, slot, counts: Optional[ScheduleCounts]):
+        view = self._individuals[buffer][slot]
+        if counts is None:
+            self._counts_valid[buffer, slot] = False
+            return
+
+        if self._counts_tables is None:
+            self._counts_tables = {f.name: np.zeros(shape=(2, self.size) + getattr(counts, f.name).shape,
+                                                    dtype=getattr(counts, f.name).dtype) for f in fields(counts)}
+            self._counts_views = [[ScheduleCounts(**{name: table[b, s] for name, table in self._counts_tables.items()})
+                                   for s in range(self.size)] for b in range(2)]
+
+        arena_counts = self._counts_views[buffer][slot]
+        if counts is not arena_counts:  # freshly recounted, move it into the arena
+            for name in self._counts_tables:
+                getattr(arena_counts, name)[...] = getattr(counts, name)
+            view.schedule_counts = arena_counts
+        self._counts_valid[buffer, slot] = True
@@ -0,0 +1,122 @@
+"""
+frozen-prefix re-planning.
+
+mid-run changes (a line breaks, the forecast is updated) re-optimize the remaining hours of a schedule, while the
+hours already executed stay as they were. the base schedule - the current best or a saved solution - is frozen on
+the first first_free_hour hours of all the lines, and on all the hours of the frozen lines. the engine evolves only
+the free (free lines, [products,] free hours) sub-genome. the free hours may also end before the horizon does, see
+rolling_horizon.
+
+the fitness is made of per (line, product) schedule counts (see ConstraintsManager.evaluate_counts), which add up
+over the lines and over the hours - except for a run which crosses a boundary of the free hours, counted once on each
+side. so the counts of the frozen part are computed once, and every sub-genome evaluation only counts its own hours.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.genetic_engine.genome_encoding import IDLE, to_one_hot
+
+
+class FrozenSchedule:
+    """
+    :param base: full genome of the schedule re-planned, in the engine's genome encoding
+    :param first_free_hour: hours before it are frozen on all the lines
+    :param frozen_lines: lines frozen on all the hours
+    :param end_free_hour: hours from it on are frozen on all the lines, the end of the horizon by default
+    """
+
+    def __init__(self, base: np.ndarray, first_free_hour: int, frozen_lines: List[int] = (),
+                 end_free_hour: Optional[int] = None):
+        self.base = np.array(base)
+        num_lines, num_hours = self.base.shape[0], self.base.shape[-1]
+        end_free_hour = num_hours if end_free_hour is None else end_free_hour
+        if not 0 <= first_free_hour < end_free_hour <= num_hours:
+            raise ValueError(f"free hours must be within 0 and {num_hours}, got {first_free_hour} - {end_free_hour}")
+        if any(not 0 <= line < num_lines for line in frozen_lines):
+            raise ValueError(f"frozen lines must be between 0 and {num_lines - 1}, got {list(frozen_lines)}")
+
+        self.first_free_hour = first_free_hour
+        self.end_free_hour = end_free_hour
+        self.frozen_lines = sorted(set(frozen_lines))
+        self.free_lines = np.setdiff1d(np.arange(num_lines), self.frozen_lines)
+        if self.free_lines.shape[0] == 0:
+            raise ValueError("at least one production line must be free")
+
+        # schedule counts of the frozen part, computed on the first evaluation. frozen lines replaced since, whose
+        # counts are recounted on the next evaluation
+        self._frozen_counts: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._replaced_lines = set()
+
+    @property
+    def one_hot(self) -> bool:
+        return self.base.ndim == 3
+
+    @property
+    def free_shape(self) -> Tuple[int, int]:
+        """number of free lines and number of free hours"""
+        return self.free_lines.shape[0], self.end_free_hour - self.first_free_hour
+
+    def restrict(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: the free sub-genomes of (individuals, ...) full genomes"""
+        return np.asarray(genomes)[:, self.free_lines, ..., self.first_free_hour:self.end_free_hour]
+
+    def expand(self, genomes: np.ndarray) -> np.ndarray:
+        """:return: the full genomes of (individuals, ...) free sub-genomes"""
+        genomes = np.asarray(genomes)
+        full = np.repeat(self.base[None], genomes.shape[0], axis=0)
+        full[:, self.free_lines, ..., self.first_free_hour:self.end_free_hour] = genomes
+        return full
+
+    def replace_frozen_lines(self, lines: List[int], schedules: np.ndarray):
+        """replaces the schedules of frozen lines, e.g. the context of coevolution"""
+        if any(line not in self.frozen_lines for line in lines):
+            raise ValueError(f"only frozen lines can be replaced, got {list(lines)}")
+
+        self.base[lines] = schedules
+        self._replaced_lines.update(lines)
+
+    def evaluate(self, genomes: np.ndarray, constraints_manager) -> np.ndarray:
+        """:return: fitness vector of (individuals, ...) free sub-genomes, as parts of the full schedule"""
+        if self._frozen_counts is None:
+            self._frozen_counts = self._count_frozen(constraints_manager)
+            self._replaced_lines.clear()
+        if self._replaced_lines:
+            # the counts of a frozen line are of its own schedule only
+            lines = sorted(self._replaced_lines)
+            occupied_hours, num_runs = constraints_manager.get_schedule_counts(self.base[lines][None])
+            self._frozen_counts[0][lines], self._frozen_counts[1][lines] = occupied_hours[0], num_runs[0]
+            self._replaced_lines.clear()
+        frozen_occupied_hours, frozen_num_runs = self._frozen_counts
+
+        occupied_hours, num_runs = constraints_manager.get_schedule_counts(genomes)
+        full_occupied_hours = np.repeat(frozen_occupied_hours[None], genomes.shape[0], axis=0)
+        full_num_runs = np.repeat(frozen_num_runs[None], genomes.shape[0], axis=0)
+        full_occupied_hours[:, self.free_lines] += occupied_hours
+        full_num_runs[:, self.free_lines] += num_runs - \
+            self._count_continued_runs(genomes, constraints_manager.num_products)
+        return constraints_manager.evaluate_counts(full_occupied_hours, full_num_runs)
+
+    def _count_frozen(self, constraints_manager) -> Tuple[np.ndarray, np.ndarray]:
+        frozen = self.base.copy()
+        frozen[self.free_lines, ..., self.first_free_hour:self.end_free_hour] = 0 if self.one_hot else IDLE
+        occupied_hours, num_runs = constraints_manager.get_schedule_counts(frozen[None])
+        return occupied_hours[0], num_runs[0]
+
+    def _count_continued_runs(self, genomes: np.ndarray, num_products: int) -> np.ndarray:
+        """:return: (individuals, free lines, products) runs crossing the boundaries of the free hours"""
+        continued = 0
+        if self.first_free_hour > 0:
+            continued = continued + self._count_joined(self.base[self.free_lines, ..., self.first_free_hour - 1],
+                                                       genomes[..., 0], num_products)
+        if self.end_free_hour < self.base.shape[-1]:
+            continued = continued + self._count_joined(self.base[self.free_lines, ..., self.end_free_hour],
+                                                       genomes[..., -1], num_products)
+        return continued
+
+    def _count_joined(self, frozen_hour: np.ndarray, free_hours: np.ndarray, num_products: int) -> np.ndarray:
+        """:return: (individuals, free lines, products) runs of a frozen hour, joined by the adjacent free hours"""
+        if self.one_hot:
+            return (free_hours.astype(bool) & frozen_hour.astype(bool)).astype(int)
+        joined = np.where(free_hours == frozen_hour, frozen_hour, IDLE)
+        return to_one_hot(joined[..., None], num_products)[..., 0]
@@ -0,0 +1,74 @@
+"""
+rolling horizon decomposition.
+
+the genome grows with the horizon, and so do the creation and evaluation costs - while the convergence collapses on
+multi-week horizons. in the rolling horizon mode, the horizon is split into overlapping windows of window_hours,
+solved one after the other with a GA run of their own:
+
+window k evolves its hours only (see replanning.FrozenSchedule), the hours before it keep the schedule stitched from
+the previous windows and the hours after it are idle. so the state of the previous windows carries over:
+the forecast they already produced counts towards the fitness, and a run continuing the last product of a line costs
+no transition. the first overlap_hours of window k are the tail of window k - 1, re-optimized - the window is seeded
+with the schedule stitched so far.
+"""
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from src.genetic_engine.genome_encoding import PRODUCT_INDEX_ENCODING, IDLE, product_index_dtype
+from src.genetic_engine.replanning import FrozenSchedule
+
+logger = logging.getLogger()
+
+# (first hour, end hour) of a window
+Window = Tuple[int, int]
+
+
+def split_horizon(num_hours: int, window_hours: int, overlap_hours: int) -> List[Window]:
+    """:return: the windows covering the horizon, every window overlaps the previous one by overlap_hours"""
+    windows = []
+    start = 0
+    while True:
+        end = min(start + window_hours, num_hours)
+        windows.append((start, end))
+        if end == num_hours:
+            return windows
+        start = end - overlap_hours
+
+
+def empty_schedule(num_lines: int, num_products: int, num_hours: int, genome_encoding: str) -> np.ndarray:
+    """:return: genome of a schedule with all the lines idle"""
+    if genome_encoding == PRODUCT_INDEX_ENCODING:
+        return np.full(shape=(num_lines, num_hours), fill_value=IDLE, dtype=product_index_dtype(num_products))
+    return np.zeros(shape=(num_lines, num_products, num_hours), dtype=int)
+
+
+def run_rolling_horizon(engine, verbose):
+    """solves the engine's horizon window by window, each until the engine's stopping conditions are met"""
+    site_data = engine.site_data
+    windows = split_horizon(site_data.total_working_hours, engine.rolling_horizon["window_hours"],
+                            engine.rolling_horizon["overlap_hours"])
+    schedule = empty_schedule(site_data.num_production_lines, site_data.num_products, site_data.total_working_hours,
+                              engine.genome_encoding)
+    generation = 0
+    for index, (start, end) in enumerate(windows):
+        logger.info(f"rolling horizon window {index + 1}/{len(windows)}: hours {start} - {end}")
+        with engine.window_lock:
+            engine.current_window = (index, len(windows))
+            engine.set_frozen_schedule(FrozenSchedule(schedule, first_free_hour=start, end_free_hour=end))
+            engine.hall_of_fame.clear()
+
+        perform_single_generation = engine.start_evolution(verbose, generation=generation)
+        generation, _ = engine._evolve(perform_single_generation, generation=generation + 1,
+                                       generation_offset=generation)
+        schedule = np.asarray(engine.get_schedule(engine.hall_of_fame.items[0]))
+
+    # the windows' genomes are evaluated along with the rest of the schedule, so they keep their fitness as full
+    # schedules
+    with engine.window_lock:
+        genomes, fitness = engine.get_schedules(engine.hall_of_fame.genomes), engine.hall_of_fame.fitness
+        engine.hall_of_fame.clear()
+        engine.hall_of_fame.update_block(genomes, fitness)
+        engine.set_frozen_schedule(None)
+        engine.current_window = None
@@ -0,0 +1,139 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+
+from src.database.models import SiteData as SiteDataDB
+from src.site_data_parser.data_classes import SiteData
+
+
+@dataclass
+class SiteModel:
+    """
+    ~~~~~~~ READ ONLY CLASS ~~~~~~~
+
+    numeric tables compiled once from a SiteData, so constraint and analysis kernels
+    don't need any dict / string lookups on the hot path.
+    all arrays are indexed by production line / product position, matching the
+    (lines, products, hours) layout of an individual.
+
+    :param production_rates: (lines, products) kg per hour, 0 where the line does not accept the product
+    :param allowed_products: (lines, products) True where the line accepts the product
+    :param line_production_rates: (lines,) overall line production rate, kg per hour
+    :param transition_times: (products,) transition time of the product's bulk, paid once per production run
+    :param expected_amounts: (products,) kgs to be produced on a week's course
+    :param forecast_units: (products,) packaged units to be produced (forecast - stock), in thousands
+    :param priorities: (products,) 1 - 5 / low (1) - urgent (5)
+    :param weights: (products,) weight per unit, grams
+    :param recipes: (products, materials) kgs of raw material needed per kg of product
+    :param raw_materials_stock: (materials,) existing stock in kgs
+    :param unit_packaging: (products, unit packages) 1 where the product uses the unit package
+    :param unit_packaging_stock: (unit packages,) existing stock quantity
+    :param retailer_packaging: (products, retailer packages) 1 where the product uses the retailer package
+    :param retailer_packaging_stock: (retailer packages,) existing stock quantity
+    :param units_per_retailer_package: (products,) unit packages per retailer package
+    """
+    num_production_lines: int
+    num_products: int
+    total_working_hours: int
+
+    line_ids: List[int]
+    product_ids: List[int]
+    product_names: List[str]
+    raw_material_ids: List[str]
+
+    production_rates: np.ndarray
+    allowed_products: np.ndarray
+    line_production_rates: np.ndarray
+    transition_times: np.ndarray
+    expected_amounts: np.ndarray
+    forecast_units: np.ndarray
+    priorities: np.ndarray
+    weights: np.ndarray
+    recipes: np.ndarray
+    raw_materials_stock: np.ndarray
+    unit_packaging: np.ndarray
+    unit_packaging_stock: np.ndarray
+    retailer_packaging: np.ndarray
+    retailer_packaging_stock: np.ndarray
+    units_per_retailer_package: np.ndarray
+
+    @classmethod
+    def from_site_data(cls, site_data: SiteData):
+        num_production_lines = len(site_data.production_lines)
+        num_products = len(site_data.products)
+
+        production_rates = np.zeros(shape=(num_production_lines, num_products), dtype=float)
+        allowed_products = np.zeros(shape=(num_production_lines, num_products), dtype=bool)
+        for i, line in enumerate(site_data.production_lines):
+            for product_id, rate in line.product_ids.items():
+                production_rates[i, int(product_id)] = rate
+                allowed_products[i, int(product_id)] = True
+
+        raw_material_ids = list(site_data.raw_materials_stock.keys())
+        recipes = np.zeros(shape=(num_products, len(raw_material_ids)), dtype=float)
+        for j, prod in enumerate(site_data.products):
+            for material_id, needed_amount_per_kg in site_data.recipes[str(prod.bulk_id)].items():
+                recipes[j, raw_material_ids.index(material_id)] = needed_amount_per_kg
+
+        unit_package_ids = list(site_data.product_packaging_unit.keys())
+        retailer_package_ids = list(site_data.retailer_packaging_unit.keys())
+        unit_packaging = np.zeros(shape=(num_products, len(unit_package_ids)), dtype=float)
+        retailer_packaging = np.zeros(shape=(num_products, len(retailer_package_ids)), dtype=float)
+        for j, prod in enumerate(site_data.products):
+            unit_packaging[j, unit_package_ids.index(str(prod.unit_package_id))] = 1
+            retailer_packaging[j, retailer_package_ids.index(str(prod.retailer_package_id))] = 1
+
+        return cls(
+            num_production_lines=num_production_lines,
+            num_products=num_products,
+            total_working_hours=site_data.total_working_hours,
+            line_ids=[line.id for line in site_data.production_lines],
+            product_ids=[prod.id for prod in site_data.products],
+            product_names=[prod.name for prod in site_data.products],
+            raw_material_ids=raw_material_ids,
+            production_rates=production_rates,
+            allowed_products=allowed_products,
+            line_production_rates=np.array([line.production_rate for line in site_data.production_lines], dtype=float),
+            transition_times=np.array([site_data.bulk_products[prod.bulk_id].transition_time
+                                       for prod in site_data.products], dtype=float),
+            expected_amounts=np.array([prod.get_amount_to_produce() for prod in site_data.products], dtype=float),
+            forecast_units=np.array([prod.forecast - prod.stock for prod in site_data.products], dtype=float),
+            priorities=np.array([prod.priority for prod in site_data.products], dtype=float),
+            weights=np.array([prod.weight for prod in site_data.products], dtype=float),
+            recipes=recipes,
+            raw_materials_stock=np.array(list(site_data.raw_materials_stock.values()), dtype=float),
+            unit_packaging=unit_packaging,
+            unit_packaging_stock=np.array(list(site_data.product_packaging_unit.values()), dtype=float),
+            retailer_packaging=retailer_packaging,
+            retailer_packaging_stock=np.array(list(site_data.retailer_packaging_unit.values()), dtype=float),
+            units_per_retailer_package=np.array([prod.units_per_retailer_package_unit
+                                                 for prod in site_data.products], dtype=float)
+        )
+
+
+_site_models: Dict[int, SiteModel] = dict()
+_site_models_lock = threading.Lock()
+
+
+def get_site_model(db_site_data: SiteDataDB) -> SiteModel:
+    """
+    site data is read only, so a single compiled model is shared by every engine and analysis
+    running against the same site.
+    """
+    if db_site_data.id is None:  # not stored in db yet, nothing to share
+        return SiteModel.from_site_data(SiteData.from_dict(db_site_data.json_data))
+
+    with _site_models_lock:
+        site_model = _site_models.get(db_site_data.id)
+        if site_model is None:
+            site_model = SiteModel.from_site_data(SiteData.from_dict(db_site_data.json_data))
+            _site_models[db_site_data.id] = site_model
+
+    return site_model
+
+
+def forget_site_model(site_data_id: int):
+    with _site_models_lock:
+        _site_models.pop(site_data_id, None)
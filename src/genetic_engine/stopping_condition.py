@@ -1,4 +1,8 @@
+import logging
 from dataclasses import dataclass
+from typing import Callable, Optional
+
+logger = logging.getLogger()
 
 
 @dataclass
@@ -6,3 +10,68 @@ class StoppingCondition:
     applied: bool
     bound: int
     progress: int = 0
+
+
+@dataclass
+class StagnationCondition(StoppingCondition):
+    """
+    bound generations without an improvement of at least epsilon of the best fitness.
+    :param restarts: times the population is re-diversified on stagnation before the run stops, see
+                     EAEngine._restart_population
+    """
+    epsilon: float = 0.0
+    restarts: int = 0
+
+
+class Stagnation:
+    """
+    the stagnation of a run's best fitness, and the restarts performed on stagnation (see StagnationCondition).
+    :param generation: generation the stagnation window starts on
+    """
+
+    def __init__(self, generation: int = 0):
+        self.best_fitness: Optional[float] = None
+        # generation the best fitness last improved on, or the population was restarted on
+        self.improved_generation = generation
+        self.num_restarts = 0
+        # whether the stagnation condition stopped the evolution
+        self.stagnated = False
+
+    def track(self, generation, fitness, epsilon) -> int:
+        """:return: the generations since the best fitness last improved by at least epsilon"""
+        # the fitness is -1 before the first generation
+        if fitness >= 0 and (self.best_fitness is None or
+                             (self.best_fitness - fitness > 0 and self.best_fitness - fitness >= epsilon)):
+            self.best_fitness, self.improved_generation = fitness, generation
+        return generation - self.improved_generation
+
+    def should_stop(self, cond: StagnationCondition, generation, restart_population: Callable[[], bool]) -> bool:
+        """
+        restarts a stagnated population while the condition's restarts last, see track().
+        :param restart_population: re-diversifies the population, returns whether it did
+        """
+        stagnant_generations = generation - self.improved_generation
+        if not cond.applied or stagnant_generations < cond.bound:
+            return False
+
+        # a restart starts a new stagnation window
+        if self.num_restarts < cond.restarts and restart_population():
+            self.num_restarts += 1
+            self.improved_generation = generation
+            logger.info(f"population restarted after {stagnant_generations} stagnant generations "
+                        f"({self.num_restarts}/{cond.restarts})")
+            return False
+
+        self.stagnated = True
+        return True
+
+    def progress(self, cond: StagnationCondition, generation) -> float:
+        """:return: the share of the current window without improvement, over the restarts"""
+        if cond.bound == 0:
+            return cond.bound
+
+        # the restarts performed are complete, every restart starts a new stagnation window. a stagnated run is
+        # complete, even if it couldn't restart
+        num_restarts = cond.restarts if self.stagnated else self.num_restarts
+        return round((num_restarts * 100 + min((generation - self.improved_generation) / cond.bound * 100, 100))
+                     / (cond.restarts + 1), 0)
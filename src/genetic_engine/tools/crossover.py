@@ -1,59 +1,176 @@
-import random
-
 import numpy as np
 
+from src.genetic_engine.tools.delta_evaluation import mark_dirty
+
 
-def cxTwoPoint(ind1, ind2):
+def cxTwoPoint(ind1, ind2, rng: np.random.Generator):
     """Executes a two-point crossover on the input :term:`sequence`
     individuals. The two individuals are modified in place and both keep
     their original length.
 
     :param ind1: The first individual participating in the crossover.
     :param ind2: The second individual participating in the crossover.
+    :param rng: generator the cut points are drawn from.
     :returns: A tuple of two individuals.
 
-    This function uses the :func:`~random.randint` function from the Python
-    base :mod:`random` module.
-
-    we swap a 3D box-shaped area in both individuals
+    we swap a 3D box-shaped area in both individuals (lines x all products x hours).
+    works for both genome encodings, the hours axis is always the last one.
     """
-    cxpoint1_x, cxpoint2_x = _get_cx_points(min(ind1.shape[0], ind2.shape[0]))
-    cxpoint1_z, cxpoint2_z = _get_cx_points(min(ind1.shape[2], ind2.shape[2]))
+    cxpoint1_x, cxpoint2_x = _get_cx_points(min(ind1.shape[0], ind2.shape[0]), rng)
+    cxpoint1_z, cxpoint2_z = _get_cx_points(min(ind1.shape[-1], ind2.shape[-1]), rng)
 
-    ind1[cxpoint1_x:cxpoint2_x, :, cxpoint1_z:cxpoint2_z], \
-    ind2[cxpoint1_x:cxpoint2_x, :, cxpoint1_z:cxpoint2_z] \
-        = ind2[cxpoint1_x:cxpoint2_x, :, cxpoint1_z:cxpoint2_z].copy(), \
-          ind1[cxpoint1_x:cxpoint2_x, :, cxpoint1_z:cxpoint2_z].copy()
+    ind1[cxpoint1_x:cxpoint2_x, ..., cxpoint1_z:cxpoint2_z], \
+    ind2[cxpoint1_x:cxpoint2_x, ..., cxpoint1_z:cxpoint2_z] \
+        = ind2[cxpoint1_x:cxpoint2_x, ..., cxpoint1_z:cxpoint2_z].copy(), \
+          ind1[cxpoint1_x:cxpoint2_x, ..., cxpoint1_z:cxpoint2_z].copy()
+    mark_dirty(ind1, cxpoint1_x, cxpoint2_x, cxpoint1_z, cxpoint2_z)
+    mark_dirty(ind2, cxpoint1_x, cxpoint2_x, cxpoint1_z, cxpoint2_z)
 
     return ind1, ind2
 
 
-def cxOnePoint(ind1, ind2):
+def cxOnePoint(ind1, ind2, rng: np.random.Generator):
     """Executes a one point crossover on the input :term:`sequence` individuals.
     The two individuals are modified in place. The resulting individuals will
     respectively have the length of the other.
 
     :param ind1: The first individual participating in the crossover.
     :param ind2: The second individual participating in the crossover.
+    :param rng: generator the cut points are drawn from.
     :returns: A tuple of two individuals.
 
-    This function uses the :func:`~random.randint` function from the
-    python base :mod:`random` module.
+    works for both genome encodings, the hours axis is always the last one.
     """
-    cxpoint1_x = random.randint(1, min(ind1.shape[0], ind2.shape[0]))
-    cxpoint1_z = random.randint(1, min(ind1.shape[2], ind2.shape[2]))
+    num_lines = min(ind1.shape[0], ind2.shape[0])
+    # a single line (e.g. of a coevolution sub-population) is always crossed
+    cxpoint1_x = rng.integers(1, num_lines + 1) if num_lines > 1 else 0
+    cxpoint1_z = rng.integers(1, min(ind1.shape[-1], ind2.shape[-1]) + 1)
 
-    ind1[cxpoint1_x:, :, cxpoint1_z:], ind2[cxpoint1_x:, :, cxpoint1_z:] = \
-        ind2[cxpoint1_x:, :, cxpoint1_z:].copy(), ind1[cxpoint1_x:, :, cxpoint1_z:].copy()
+    ind1[cxpoint1_x:, ..., cxpoint1_z:], ind2[cxpoint1_x:, ..., cxpoint1_z:] = \
+        ind2[cxpoint1_x:, ..., cxpoint1_z:].copy(), ind1[cxpoint1_x:, ..., cxpoint1_z:].copy()
+    mark_dirty(ind1, cxpoint1_x, ind1.shape[0], cxpoint1_z, ind1.shape[-1])
+    mark_dirty(ind2, cxpoint1_x, ind2.shape[0], cxpoint1_z, ind2.shape[-1])
 
     return ind1, ind2
 
 
-def _get_cx_points(size):
-    cxpoint1 = random.randint(1, size)
-    cxpoint2 = random.randint(1, size - 1)
+def _get_cx_points(size, rng):
+    if size < 2:
+        return 0, size
+
+    cxpoint1 = rng.integers(1, size + 1)
+    cxpoint2 = rng.integers(1, size)
     if cxpoint2 >= cxpoint1:
         cxpoint2 += 1
     else:  # Swap the two cx points
         cxpoint1, cxpoint2 = cxpoint2, cxpoint1
     return cxpoint1, cxpoint2
+
+
+# ~~~~~~ batched crossovers
+# they swap boxes between the rows pairs_a[i], pairs_b[i] of a (individuals, lines, [products,] hours) block of
+# genomes in a single vectorized pass, and return the swapped (line_start, line_stop, hour_start, hour_stop) boxes,
+# so the caller can record them on the individuals (see delta_evaluation.mark_dirty).
+# they draw all their random numbers in bulk, from the given generator.
+
+
+def cxTwoPointBatch(block, pairs_a, pairs_b, rng: np.random.Generator, line_points=None, hour_points=None):
+    """Batched counterpart of :func:`cxTwoPoint`.
+
+    :param block: genomes of the offspring, modified in place.
+    :param pairs_a: rows of the first individual of every pair.
+    :param pairs_b: rows of the second individual of every pair.
+    :param rng: generator the cut points are drawn from.
+    :param line_points: (pairs, 2) sorted cut points along the lines axis, drawn as in cxTwoPoint if None.
+    :param hour_points: (pairs, 2) sorted cut points along the hours axis, drawn as in cxTwoPoint if None.
+    :returns: the swapped boxes.
+    """
+    num_lines, num_hours = block.shape[1], block.shape[-1]
+    if line_points is None:
+        line_points = _draw_two_cx_points(pairs_a.shape[0], num_lines, rng)
+    if hour_points is None:
+        hour_points = _draw_two_cx_points(pairs_a.shape[0], num_hours, rng)
+
+    boxes = line_points[:, 0], line_points[:, 1], hour_points[:, 0], hour_points[:, 1]
+    _swap_masked(block, pairs_a, pairs_b, _boxes_mask(boxes, num_lines, num_hours))
+    return boxes
+
+
+def cxOnePointBatch(block, pairs_a, pairs_b, rng: np.random.Generator, line_points=None, hour_points=None):
+    """Batched counterpart of :func:`cxOnePoint`.
+
+    :param block: genomes of the offspring, modified in place.
+    :param pairs_a: rows of the first individual of every pair.
+    :param pairs_b: rows of the second individual of every pair.
+    :param rng: generator the cut points are drawn from.
+    :param line_points: (pairs,) cut points along the lines axis, drawn as in cxOnePoint if None.
+    :param hour_points: (pairs,) cut points along the hours axis, drawn as in cxOnePoint if None.
+    :returns: the swapped boxes.
+    """
+    num_lines, num_hours = block.shape[1], block.shape[-1]
+    if line_points is None:
+        line_points = rng.integers(1, num_lines + 1, size=pairs_a.shape[0]) if num_lines > 1 \
+            else np.zeros(shape=(pairs_a.shape[0],), dtype=int)
+    if hour_points is None:
+        hour_points = rng.integers(1, num_hours + 1, size=pairs_a.shape[0])
+
+    boxes = line_points, np.full_like(line_points, num_lines), hour_points, np.full_like(hour_points, num_hours)
+    _swap_masked(block, pairs_a, pairs_b, _boxes_mask(boxes, num_lines, num_hours))
+    return boxes
+
+
+def cxUniformLineBlockBatch(block, pairs_a, pairs_b, rng: np.random.Generator, indpb=0.5, block_hours=24):
+    """Uniform crossover over line blocks - every line of the schedule is split into blocks of block_hours hours,
+    and every block is swapped between the two individuals of a pair with probability indpb.
+
+    :param block: genomes of the offspring, modified in place.
+    :param pairs_a: rows of the first individual of every pair.
+    :param pairs_b: rows of the second individual of every pair.
+    :param rng: generator the swapped blocks are drawn from.
+    :param indpb: Independent probability for each line block to be exchanged.
+    :param block_hours: number of hours per line block, the last block of a line may be shorter.
+    :returns: the boxes bounding the swapped blocks of every pair, empty where nothing was swapped.
+    """
+    num_lines, num_hours = block.shape[1], block.shape[-1]
+    num_blocks = -(-num_hours // block_hours)
+    swapped = rng.random(size=(pairs_a.shape[0], num_lines, num_blocks)) < indpb
+    _swap_masked(block, pairs_a, pairs_b, np.repeat(swapped, block_hours, axis=-1)[..., :num_hours])
+
+    swapped_lines, swapped_blocks = swapped.any(axis=2), swapped.any(axis=1)
+    line_start, line_stop = swapped_lines.argmax(axis=1), num_lines - swapped_lines[:, ::-1].argmax(axis=1)
+    block_start, block_stop = swapped_blocks.argmax(axis=1), num_blocks - swapped_blocks[:, ::-1].argmax(axis=1)
+    nothing_swapped = ~swapped_lines.any(axis=1)
+    line_stop[nothing_swapped] = line_start[nothing_swapped]
+    return line_start, line_stop, block_start * block_hours, np.minimum(block_stop * block_hours, num_hours)
+
+
+def _draw_two_cx_points(num_pairs, size, rng):
+    """vectorized _get_cx_points(), for num_pairs pairs at once"""
+    if size < 2:
+        return np.tile([0, size], (num_pairs, 1))
+
+    cxpoint1 = rng.integers(1, size + 1, size=num_pairs)
+    cxpoint2 = rng.integers(1, size, size=num_pairs)
+    cxpoint2 += cxpoint2 >= cxpoint1
+    return np.sort(np.stack((cxpoint1, cxpoint2), axis=1), axis=1)
+
+
+def _boxes_mask(boxes, num_lines, num_hours):
+    """:return: (pairs, lines, hours) mask, True inside each pair's box"""
+    line_start, line_stop, hour_start, hour_stop = (np.asarray(points)[:, None] for points in boxes)
+    lines, hours = np.arange(num_lines), np.arange(num_hours)
+    in_lines = (lines >= line_start) & (lines < line_stop)
+    in_hours = (hours >= hour_start) & (hours < hour_stop)
+    return in_lines[:, :, None] & in_hours[:, None, :]
+
+
+def _swap_masked(block, pairs_a, pairs_b, mask):
+    # only the masked line-hours are gathered, with all their products in the one_hot encoding
+    pairs, lines, hours = np.nonzero(mask)
+    rows_a, rows_b = pairs_a[pairs], pairs_b[pairs]
+    if block.ndim == 4:  # one_hot
+        genes_a, genes_b = block[rows_a, lines, :, hours], block[rows_b, lines, :, hours]
+        block[rows_a, lines, :, hours], block[rows_b, lines, :, hours] = genes_b, genes_a
+    else:
+        genes_a, genes_b = block[rows_a, lines, hours], block[rows_b, lines, hours]
+        block[rows_a, lines, hours], block[rows_b, lines, hours] = genes_b, genes_a
@@ -0,0 +1,109 @@
+"""
+incremental (delta) re-evaluation support.
+
+every evaluated individual carries a ScheduleCounts cache with the number of scheduled hours and the number
+of production runs per (line, product), split into blocks of hours. genetic operators which change an individual
+in place record the touched box with mark_dirty(), so re-evaluation only recomputes the blocks overlapping
+those boxes and patches the (line, product) totals, instead of scanning the whole schedule again.
+"""
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+# re-evaluating many scattered boxes costs more than a full (vectorized) recount
+MAX_DIRTY_REGIONS = 32
+
+
+@dataclass
+class ScheduleCounts:
+    """
+    :param occupied_hours: (lines, products) number of scheduled hours
+    :param num_runs: (lines, products) number of production runs (sequences of 1's)
+    :param occupied_hours_blocks: (lines, products, blocks) scheduled hours per block of hours
+    :param run_starts_blocks: (lines, products, blocks) runs starting inside each block of hours
+    """
+    occupied_hours: np.ndarray
+    num_runs: np.ndarray
+    occupied_hours_blocks: np.ndarray
+    run_starts_blocks: np.ndarray
+
+
+def mark_dirty(individual, line_start, line_stop, hour_start, hour_stop):
+    """
+    records that individual[line_start:line_stop, :, hour_start:hour_stop] was modified in place.
+    individuals without a counts cache are fully evaluated anyway, so there is nothing to record.
+    """
+    if getattr(individual, "schedule_counts", None) is None:
+        return
+    individual.dirty_regions.append((line_start, line_stop, hour_start, hour_stop))
+
+
+def update_schedule_counts(individuals: List, block_size: int):
+    """
+    brings the counts cache of every individual up to date with its schedule.
+    individuals without a cache (or with too many dirty regions) are recounted together in a single batched call,
+    the rest only recount their dirty regions.
+    """
+    to_recount = []
+    for ind in individuals:
+        counts = getattr(ind, "schedule_counts", None)
+        dirty_regions = getattr(ind, "dirty_regions", [])
+        if counts is None or not dirty_regions or len(dirty_regions) > MAX_DIRTY_REGIONS:
+            # invalid fitness without any recorded region means the individual was changed by an unaware operator
+            to_recount.append(ind)
+            continue
+
+        for region in dirty_regions:
+            _recount_region(ind.view(np.ndarray), counts, region, block_size)
+        ind.dirty_regions = []
+
+    if to_recount:
+        hours_blocks, starts_blocks = count_blocks(np.stack(to_recount).view(np.ndarray), block_size)
+        for ind, ind_hours_blocks, ind_starts_blocks in zip(to_recount, hours_blocks, starts_blocks):
+            ind.schedule_counts = ScheduleCounts(occupied_hours=ind_hours_blocks.sum(axis=-1),
+                                                 num_runs=ind_starts_blocks.sum(axis=-1),
+                                                 occupied_hours_blocks=ind_hours_blocks,
+                                                 run_starts_blocks=ind_starts_blocks)
+            ind.dirty_regions = []
+
+
+def count_blocks(schedules: np.ndarray, block_size: int, previous_hour: np.ndarray = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param schedules: array of shape (..., hours)
+    :param block_size: number of hours per block, the last block may be shorter
+    :param previous_hour: occupancy of the hour preceding the schedules, shape (...), None means idle
+    :return: scheduled hours and run starts per block, both of shape (..., blocks)
+    """
+    occupied = schedules.astype(bool, copy=False)
+    run_starts = occupied.copy()
+    run_starts[..., 1:] &= ~occupied[..., :-1]
+    if previous_hour is not None:
+        run_starts[..., 0] &= ~previous_hour.astype(bool, copy=False)
+
+    block_starts = np.arange(0, occupied.shape[-1], block_size)
+    return np.add.reduceat(occupied, block_starts, axis=-1, dtype=np.int64), \
+        np.add.reduceat(run_starts, block_starts, axis=-1, dtype=np.int64)
+
+
+def _recount_region(schedule: np.ndarray, counts: ScheduleCounts, region, block_size):
+    line_start, line_stop, hour_start, hour_stop = region
+    num_hours = schedule.shape[-1]
+    num_blocks = counts.occupied_hours_blocks.shape[-1]
+
+    # a run start at hour_stop depends on hour_stop - 1, so the block containing it is affected as well
+    first_block = hour_start // block_size
+    last_block = min(hour_stop // block_size + 1, num_blocks)
+    first_hour, last_hour = first_block * block_size, min(last_block * block_size, num_hours)
+
+    lines = slice(line_start, line_stop)
+    previous_hour = schedule[lines, :, first_hour - 1] if first_hour > 0 else None
+    hours_blocks, starts_blocks = count_blocks(schedule[lines, :, first_hour:last_hour], block_size, previous_hour)
+
+    # patch the totals with the difference, then replace the blocks
+    blocks = slice(first_block, last_block)
+    counts.occupied_hours[lines] += (hours_blocks - counts.occupied_hours_blocks[lines, :, blocks]).sum(axis=-1)
+    counts.num_runs[lines] += (starts_blocks - counts.run_starts_blocks[lines, :, blocks]).sum(axis=-1)
+    counts.occupied_hours_blocks[lines, :, blocks] = hours_blocks
+    counts.run_starts_blocks[lines, :, blocks] = starts_blocks
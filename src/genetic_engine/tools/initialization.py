@@ -0,0 +1,158 @@
+import numpy as np
+
+from src.genetic_engine.genome_encoding import PRODUCT_INDEX_ENCODING, IDLE, product_index_dtype, to_one_hot
+from src.genetic_engine.site_model import SiteModel
+from src.genetic_engine.tools.mutation import mutFlipBitBlock
+
+# the lowest product priority, see SiteModel.priorities
+LOWEST_PRIORITY = 1
+
+
+def init_random_population(size, num_lines, num_products, num_hours, genome_encoding, rng: np.random.Generator,
+                           allowed_products=None) -> np.ndarray:
+    """
+    creates the genomes of a whole random population at once.
+    for every individual, the hours on which any line of a random 2D manufacturing schedule works are randomly
+    partitioned between the products (in a random order, every product takes a uniformly random number of the
+    remaining hours, the last one takes the rest), and every line manufactures the hour's product.
+    so there are no multiple products manufactured on a certain line on the same time.
+
+    :param rng: generator the random draws are made from
+    :param allowed_products: optional (lines, products) mask, lines don't manufacture products they don't accept
+    :return: (size, lines, products, hours) one_hot genomes, or (size, lines, hours) product_index genomes
+    """
+    # hours on which any line of the random 2D manufacturing schedule works
+    available = (rng.random(size=(size, num_lines, num_hours)) < 0.5).any(axis=1)
+    num_available = available.sum(axis=1)
+
+    # how many hours each product takes, in a random products order
+    products_order = np.argsort(rng.random(size=(size, num_products)), axis=1)
+    num_taken = np.zeros(shape=(size, num_products), dtype=np.int64)
+    remaining = num_available.copy()
+    for i in range(num_products - 1):
+        num_taken[:, i] = rng.integers(remaining + 1)
+        remaining -= num_taken[:, i]
+    num_taken[:, -1] = remaining
+
+    # the available hours in a random order, are handed out to the products in consecutive chunks
+    hours_order = np.argsort(np.where(available, rng.random(size=(size, num_hours)), np.inf), axis=1)
+    taken_hours = hours_order[np.arange(num_hours) < num_available[:, None]]
+    individuals = np.repeat(np.arange(size), num_available)
+
+    hour_products = np.full(shape=(size, num_hours), fill_value=IDLE)
+    hour_products[individuals, taken_hours] = np.repeat(products_order.ravel(), num_taken.ravel())
+
+    if genome_encoding == PRODUCT_INDEX_ENCODING:
+        genomes = np.broadcast_to(hour_products[:, None, :], (size, num_lines, num_hours))
+        if allowed_products is not None:
+            line_accepts = np.take_along_axis(allowed_products[None], np.maximum(genomes, 0), axis=2)
+            genomes = np.where(line_accepts, genomes, IDLE)
+        return genomes.astype(product_index_dtype(num_products))
+
+    products_schedule = hour_products[:, None, :] == np.arange(num_products)[None, :, None]
+    genomes = np.broadcast_to(products_schedule[:, None], (size, num_lines, num_products, num_hours))
+    if allowed_products is not None:
+        genomes = genomes & allowed_products[None, :, :, None]
+    return genomes.astype(int)
+
+
+def init_greedy_population(size, site_model: SiteModel, num_hours, genome_encoding,
+                           rng: np.random.Generator) -> np.ndarray:
+    """
+    creates the genomes of a population of greedily constructed schedules.
+    for every individual, the products are taken in a random order weighted by priority, and each product is
+    scheduled in contiguous runs until its forecast amount is produced: every run starts at the first free hour of
+    the accepting line which would finish it first (randomly perturbed), and takes the run's transition time and the
+    hours left for the remaining amount at the line's rate - randomly rounded up or down, so the produced amounts
+    straddle the forecast amounts. a product which doesn't fit the line's free hours continues on the next accepting
+    line, and the hours left at the end of the lines are idle. when the forecast takes more than the lines' hours,
+    the forecast amounts are scaled down to fit them, so the first products don't take all the lines.
+    so no product is scheduled on a line which doesn't accept it, and no line manufactures multiple products on the
+    same time.
+    the individuals are constructed together: the runs of the individuals' k-th products are laid at once, a run of
+    each individual at a time.
+
+    :param site_model: rates, transition times, forecast amounts and priorities of the site
+    :param rng: generator the random draws are made from
+    :return: (size, lines, products, hours) one_hot genomes, or (size, lines, hours) product_index genomes
+    """
+    num_lines, num_products = site_model.production_rates.shape
+    hour_products = np.full(shape=(size, num_lines, num_hours), fill_value=IDLE)
+    # products with nothing to produce, or no line to produce them, are never scheduled
+    products = np.flatnonzero((site_model.expected_amounts > 0) & site_model.allowed_products.any(axis=0))
+
+    # when the forecast takes more than the lines' hours, every product is cut down to its share of them
+    needed_hours = (site_model.expected_amounts[products] / site_model.production_rates[:, products].max(axis=0)).sum()
+    targets = site_model.expected_amounts * min(1.0, num_lines * num_hours / max(needed_hours, 1e-9))
+
+    # a random order weighted by priority, see Efraimidis & Spirakis weighted random sampling - the keys u ** (1 / w)
+    # are compared by their logarithms, which don't underflow. priorities below the lowest one are taken as the lowest
+    weights = np.maximum(site_model.priorities[products], LOWEST_PRIORITY)
+    keys = np.log(rng.random(size=(size, products.shape[0]))) / weights
+    orders = products[np.argsort(-keys, axis=1)]
+
+    remaining = np.repeat(targets[None], size, axis=0)
+    first_free_hour = np.zeros(shape=(size, num_lines), dtype=np.int64)
+    hours_axis = np.arange(num_hours)
+    for product in orders.T:
+        # the individuals still laying runs of their product
+        individuals = np.flatnonzero(remaining[np.arange(size), product] > 0)
+        while individuals.shape[0] > 0:
+            ind_products = product[individuals]
+            rates = site_model.production_rates[:, ind_products].T
+            transition_times = site_model.transition_times[ind_products]
+            free_hours = first_free_hour[individuals]
+            amounts = remaining[individuals, ind_products]
+
+            # lines with room for more than the run's transition
+            lines_ok = (rates > 0) & (free_hours + transition_times[:, None] < num_hours)
+            finish = free_hours + transition_times[:, None] + \
+                np.divide(amounts[:, None], rates, out=np.zeros_like(rates), where=rates > 0)
+            perturbed = np.where(lines_ok, finish * rng.uniform(1, 1.25, size=finish.shape), np.inf)
+            lines = np.argmin(perturbed, axis=1)
+            line_rates = rates[np.arange(individuals.shape[0]), lines]
+            starts = free_hours[np.arange(individuals.shape[0]), lines]
+
+            hours = transition_times + np.divide(amounts, line_rates, out=np.zeros_like(amounts),
+                                                 where=line_rates > 0)
+            whole_hours = np.floor(hours)
+            lengths = np.minimum(whole_hours + (rng.random(size=hours.shape[0]) < hours - whole_hours),
+                                 num_hours - starts).astype(np.int64)
+            # no line has room left, or the remaining amount is below an hour's production
+            laid = lines_ok.any(axis=1) & (lengths > transition_times)
+
+            individuals, lines, starts, lengths = individuals[laid], lines[laid], starts[laid], lengths[laid]
+            ind_products, line_rates = ind_products[laid], line_rates[laid]
+            in_run = (hours_axis >= starts[:, None]) & (hours_axis < (starts + lengths)[:, None])
+            hour_products[individuals, lines] = np.where(in_run, ind_products[:, None],
+                                                         hour_products[individuals, lines])
+            first_free_hour[individuals, lines] += lengths
+            remaining[individuals, ind_products] -= line_rates * (lengths - transition_times[laid])
+            individuals = individuals[remaining[individuals, ind_products] > 0]
+
+    if genome_encoding == PRODUCT_INDEX_ENCODING:
+        return hour_products.astype(product_index_dtype(num_products))
+    return to_one_hot(hour_products, num_products)
+
+
+def seed_population(genomes: np.ndarray, seeds: np.ndarray, fraction: float, variant_indpb: float,
+                    num_products: int, rng: np.random.Generator) -> int:
+    """
+    warm starts a random population, in place: its first round(fraction * size) genomes are replaced with the seeds
+    - every seed once, then mutated variants of the seeds, taking turns.
+
+    :param genomes: (size, ...) genomes block of the population
+    :param seeds: (seeds, ...) genomes block of the same encoding, e.g. converted saved solutions
+    :param variant_indpb: flip probability of every attribute of a variant, see mutFlipBitBlock
+    :param rng: generator the variants are drawn from
+    :return: number of seeded genomes
+    """
+    num_seeded = min(int(round(fraction * genomes.shape[0])), genomes.shape[0])
+    if num_seeded == 0 or seeds.shape[0] == 0:
+        return 0
+
+    genomes[:num_seeded] = seeds[np.arange(num_seeded) % seeds.shape[0]]
+    variants = np.arange(min(seeds.shape[0], num_seeded), num_seeded)
+    if variants.shape[0] > 0:
+        mutFlipBitBlock(genomes, variants, variant_indpb, rng, num_products=num_products)
+    return num_seeded
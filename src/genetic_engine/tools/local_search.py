@@ -0,0 +1,142 @@
+"""
+memetic local search.
+
+first improvement hill climbing of a schedule: the moves of a random line are tried in a random order, and the first
+improving one is applied - until no move of any line improves the schedule, or the time is up. every move rewrites a
+window of hours of a single line:
+
+shift - a production run moves by an hour, earlier or later, trading places with the hour next to it.
+swap - two adjacent runs of a line (a production run and an idle run, or two production runs) trade places.
+extend - a production run fills the idle run following or preceding it.
+
+a move is evaluated from the schedule counts of the schedule (see ConstraintsManager.evaluate_counts), patched with
+the difference the rewritten window makes to its line - instead of evaluating the whole schedule again.
+"""
+import time
+from typing import Iterator, Tuple
+
+import numpy as np
+
+from src.genetic_engine.genome_encoding import IDLE, to_one_hot, to_product_index
+from src.genetic_engine.tools.delta_evaluation import count_blocks
+
+# (first hour, new products) of the window of hours a move rewrites on a line
+Move = Tuple[int, np.ndarray]
+
+
+def hill_climb(genome: np.ndarray, fitness: float, constraints_manager, deadline: float,
+               rng: np.random.Generator) -> Tuple[float, int]:
+    """
+    improves the genome in place, by first improvement hill climbing.
+    :param genome: one_hot (lines, products, hours) or product_index (lines, hours) genome
+    :param fitness: fitness of the genome
+    :param deadline: time.time() to stop at
+    :param rng: generator the lines and moves orders are drawn from
+    :return: fitness of the improved genome and number of moves applied
+    """
+    occupied_hours, num_runs = (counts[0] for counts in constraints_manager.get_schedule_counts(genome[None]))
+    num_products = constraints_manager.num_products
+    num_moves = 0
+    improved = True
+    while improved:
+        improved = False
+        for line in rng.permutation(genome.shape[0]):
+            products = to_product_index(genome[line]) if genome.ndim == 3 else genome[line]
+            for start, window in _line_moves(products, rng):
+                if time.time() >= deadline:
+                    return fitness, num_moves
+
+                stop = min(start + window.shape[0] + 1, genome.shape[-1])
+                hours_diff, starts_diff = _window_counts_diff(genome, line, start, stop, window, num_products)
+                occupied_hours[line] += hours_diff
+                num_runs[line] += starts_diff
+                move_fitness = constraints_manager.evaluate_counts(occupied_hours[None], num_runs[None])[0]
+                if move_fitness < fitness:
+                    _apply_move(genome, line, start, window, num_products)
+                    fitness, num_moves, improved = move_fitness, num_moves + 1, True
+                    break
+                occupied_hours[line] -= hours_diff
+                num_runs[line] -= starts_diff
+            if improved:
+                break
+
+    return fitness, num_moves
+
+
+def improve_best(hall_of_fame, constraints_manager, num_individuals, time_budget,
+                 rng: np.random.Generator) -> int:
+    """
+    hill climbs copies of the best hall of fame individuals, sharing the time budget. the improved individuals join
+    the hall of fame.
+    :param hall_of_fame: EliteArchive of full hourly schedules
+    :param time_budget: seconds the local search may take
+    :param rng: generator the lines and moves orders are drawn from
+    :return: number of moves applied
+    """
+    deadline = time.time() + time_budget
+    genomes = hall_of_fame.genomes[:num_individuals].copy()
+    fitness = hall_of_fame.fitness[:num_individuals].copy()
+    num_moves = 0
+    for i in range(genomes.shape[0]):
+        # the time left is shared between the individuals left
+        individual_deadline = time.time() + (deadline - time.time()) / (genomes.shape[0] - i)
+        fitness[i], moves = hill_climb(genomes[i], fitness[i], constraints_manager, individual_deadline, rng)
+        num_moves += moves
+    hall_of_fame.update_block(genomes, fitness)
+    return num_moves
+
+
+def _line_moves(products: np.ndarray, rng: np.random.Generator) -> Iterator[Move]:
+    """:return: the moves of a line, in a random order"""
+    num_hours = products.shape[0]
+    starts = np.flatnonzero(np.diff(products, prepend=IDLE - 1))
+    stops = np.append(starts[1:], num_hours)
+
+    moves = []
+    for i, (start, stop) in enumerate(zip(starts, stops)):
+        product, length = products[start], stop - start
+        if product != IDLE:
+            if start > 0:  # shift earlier
+                moves.append((start - 1, np.append(np.full(length, product), products[start - 1])))
+            if stop < num_hours:  # shift later
+                moves.append((start, np.append(products[stop], np.full(length, product))))
+            if i > 0 and products[start - 1] == IDLE:  # extend over the preceding idle run
+                moves.append((starts[i - 1], np.full(start - starts[i - 1], product)))
+            if stop < num_hours and products[stop] == IDLE:  # extend over the following idle run
+                moves.append((stop, np.full(stops[i + 1] - stop, product)))
+        if i > 0:  # swap with the preceding run
+            moves.append((starts[i - 1], np.concatenate((products[start:stop], products[starts[i - 1]:start]))))
+
+    for index in rng.permutation(len(moves)):
+        yield moves[index]
+
+
+def _window_counts_diff(genome, line, start, stop, window, num_products) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    :param stop: end of the hours whose counts the move changes - a run start at the hour following the window
+                 depends on the window's last hour
+    :return: (products,) difference in the scheduled hours and in the run starts of the line, made by the move
+    """
+    before = _one_hot_hours(genome, line, start, stop, num_products)
+    after = before.copy()
+    after[:, :window.shape[0]] = to_one_hot(window[None], num_products)[0]
+    previous_hour = _one_hot_hours(genome, line, start - 1, start, num_products)[:, 0] if start > 0 else None
+
+    hours_before, starts_before = count_blocks(before, stop - start, previous_hour)
+    hours_after, starts_after = count_blocks(after, stop - start, previous_hour)
+    return hours_after[:, 0] - hours_before[:, 0], starts_after[:, 0] - starts_before[:, 0]
+
+
+def _one_hot_hours(genome, line, start, stop, num_products) -> np.ndarray:
+    """:return: (products, hours) one_hot schedule of the line's hours"""
+    if genome.ndim == 3:
+        return genome[line, :, start:stop].astype(bool)
+    return to_one_hot(genome[line, start:stop][None], num_products)[0].astype(bool)
+
+
+def _apply_move(genome, line, start, window, num_products):
+    stop = start + window.shape[0]
+    if genome.ndim == 3:
+        genome[line, :, start:stop] = to_one_hot(window[None], num_products)[0]
+    else:
+        genome[line, start:stop] = window
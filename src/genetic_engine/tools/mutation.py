@@ -1,11 +1,11 @@
 # Mutations taken from deap.tools.mutation and converted to match np.ndarray format
-import random
-from deap import creator
-
 import numpy as np
 
+from src.genetic_engine.genome_encoding import IDLE
+from src.genetic_engine.tools.delta_evaluation import mark_dirty
+
 
-def mutFlipBit(individual, indpb):
+def mutFlipBit(individual, indpb, rng: np.random.Generator):
     """Flip the value of the attributes of the input individual and return the
     mutant. The *individual* is expected to be a :term:`sequence` and the values of the
     attributes shall stay valid after the ``not`` operator is called on them.
@@ -14,27 +14,49 @@ def mutFlipBit(individual, indpb):
 
     :param individual: Individual to be mutated.
     :param indpb: Independent probability for each attribute to be flipped.
+    :param rng: generator the random draws are made from.
     :returns: A tuple of one individual.
 
-    This function uses the :func:`~random.random` function from the python base
-    :mod:`random` module.
-
     while mutating the solution we also make sure it is still valid.
     """
-    x, y, z = individual.shape
-    for i, j, k in np.ndindex(x, y, z):
-        if random.random() < indpb:
-            # if theres a product produced at this line at the same time, remove it from schedule
-            if individual[i, :, k].any():
-                index_of_one = np.where(individual[i, :, k] == 1)[0]
-                if index_of_one[0] != j:
-                    individual[i, index_of_one, k] = 0
-            individual[i, j, k] = type(individual[i, j, k])(not individual[i, j, k])
+    # a draw per attribute, the flipped attributes are then visited in the same order as before
+    for i, j, k in np.argwhere(rng.random(individual.shape) < indpb):
+        # if theres a product produced at this line at the same time, remove it from schedule
+        if individual[i, :, k].any():
+            index_of_one = np.where(individual[i, :, k] == 1)[0]
+            if index_of_one[0] != j:
+                individual[i, index_of_one, k] = 0
+        individual[i, j, k] = type(individual[i, j, k])(not individual[i, j, k])
+        mark_dirty(individual, i, i + 1, k, k + 1)
 
     return individual,
 
 
-def mutShuffleIndexes(individual, indpb):
+def mutFlipProduct(individual, indpb, num_products, rng: np.random.Generator):
+    """product_index encoding counterpart of :func:`mutFlipBit`.
+    flipping the bit of product j at a line-hour either removes j from that slot (if it was scheduled there)
+    or replaces the slot's product with j. a slot holds num_products bits, so it is mutated with the
+    probability that any of them would have been flipped.
+
+    :param individual: Individual of shape (lines, hours) to be mutated.
+    :param indpb: Independent probability for each (line, product, hour) attribute to be flipped.
+    :param num_products: number of products in the site.
+    :param rng: generator the random draws are made from.
+    :returns: A tuple of one individual.
+    """
+    slot_pb = 1 - (1 - indpb) ** num_products
+    lines, hours = np.nonzero(rng.random(individual.shape) < slot_pb)
+    flipped_products = rng.integers(num_products, size=lines.shape[0])
+
+    current_products = individual[lines, hours]
+    individual[lines, hours] = np.where(current_products == flipped_products, IDLE, flipped_products)
+    for i, k in zip(lines, hours):
+        mark_dirty(individual, i, i + 1, k, k + 1)
+
+    return individual,
+
+
+def mutShuffleIndexes(individual, indpb, rng: np.random.Generator):
     """Shuffle the attributes of the input individual and return the mutant.
     The *individual* is expected to be a :term:`sequence`. The *indpb* argument is the
     probability of each attribute to be moved. Usually this mutation is applied on
@@ -43,18 +65,174 @@ def mutShuffleIndexes(individual, indpb):
     :param individual: Individual to be mutated.
     :param indpb: Independent probability for each attribute to be exchanged to
                   another position.
+    :param rng: generator the random draws are made from.
     :returns: A tuple of one individual.
 
-    This function uses the :func:`~random.random` and :func:`~random.randint`
-    functions from the python base :mod:`random` module.
+    works for both genome encodings, the lines axis is the first one and the hours axis is the last one.
     """
     num_possible_shuffles = round(individual.size / 2)
-    shape = individual.shape
-    for i in range(num_possible_shuffles):
-        if random.random() < indpb:
-            swap_idx_a = (random.randint(0, shape[0] - 1), random.randint(0, shape[1] - 1), random.randint(0, shape[2] - 1))
-            swap_idx_b = (random.randint(0, shape[0] - 1), random.randint(0, shape[1] - 1), random.randint(0, shape[2] - 1))
-            if swap_idx_a != swap_idx_b:
-                individual[swap_idx_a], individual[swap_idx_b] = individual[swap_idx_b], individual[swap_idx_a]
-
-    return individual,
\ No newline at end of file
+    num_swaps = np.count_nonzero(rng.random(num_possible_shuffles) < indpb)
+    # the two swapped indices of every swap, the swaps are then applied one after the other as before
+    swap_indices = rng.integers(individual.shape, size=(num_swaps, 2, individual.ndim))
+    for swap_idx_a, swap_idx_b in swap_indices:
+        swap_idx_a, swap_idx_b = tuple(swap_idx_a), tuple(swap_idx_b)
+        if swap_idx_a != swap_idx_b:
+            individual[swap_idx_a], individual[swap_idx_b] = individual[swap_idx_b], individual[swap_idx_a]
+            mark_dirty(individual, swap_idx_a[0], swap_idx_a[0] + 1, swap_idx_a[-1], swap_idx_a[-1] + 1)
+            mark_dirty(individual, swap_idx_b[0], swap_idx_b[0] + 1, swap_idx_b[-1], swap_idx_b[-1] + 1)
+
+    return individual,
+
+
+def mutFlipBitVectorized(individual, indpb, rng: np.random.Generator, num_products=None):
+    """Array-native counterpart of :func:`mutFlipBit`, for both genome encodings.
+    a line-hour slot holds one bit per product, so it is mutated with the probability that any of its bits
+    would have been flipped, and the flipped product is drawn uniformly. if it is the slot's product the slot
+    becomes idle, otherwise it replaces the slot's product - so the individual stays valid.
+
+    :param individual: Individual to be mutated, or a list of individuals to be mutated together.
+    :param indpb: Independent probability for each (line, product, hour) attribute to be flipped.
+    :param rng: generator the random draws of the whole batch are made from, at once.
+    :param num_products: number of products in the site, required by the product_index encoding only.
+    :returns: A tuple of the mutated individuals.
+    """
+    individuals = [individual] if isinstance(individual, np.ndarray) else list(individual)
+    ind_indices, lines, hours, products = _draw_slot_flips(len(individuals), individuals[0].shape, indpb,
+                                                           num_products, rng)
+
+    for ind, selected in zip(individuals, _group_by_individual(ind_indices, len(individuals))):
+        if selected.shape[0] > 0:
+            _flip_slots(ind, (), lines[selected], hours[selected], products[selected])
+            for i, k in zip(lines[selected], hours[selected]):
+                mark_dirty(ind, i, i + 1, k, k + 1)
+
+    return tuple(individuals)
+
+
+def mutFlipBitBlock(block, rows, indpb, rng: np.random.Generator, num_products=None):
+    """:func:`mutFlipBitVectorized` of the given rows of a genomes block, in place and in a single pass.
+
+    :param block: (individuals, lines, [products,] hours) genomes.
+    :param rows: rows of the individuals to be mutated.
+    :param indpb: Independent probability for each (line, product, hour) attribute to be flipped.
+    :param rng: generator the random draws are made from.
+    :param num_products: number of products in the site, required by the product_index encoding only.
+    :returns: A tuple of the block.
+    """
+    ind_indices, lines, hours, products = _draw_slot_flips(rows.shape[0], block.shape[1:], indpb, num_products,
+                                                           rng)
+    _flip_slots(block, (rows[ind_indices],), lines, hours, products)
+    return block,
+
+
+def mutShuffleIndexesVectorized(individual, indpb, rng: np.random.Generator):
+    """Array-native counterpart of :func:`mutShuffleIndexes`, for both genome encodings.
+    the swapped index pairs are drawn in bulk and swapped together. pairs sharing an index with another pair
+    are skipped, so the result is still a permutation. with the one_hot encoding, a product moved into a
+    line-hour slot replaces the slot's other products, so the individual stays valid.
+
+    :param individual: Individual to be mutated, or a list of individuals to be mutated together.
+    :param indpb: Independent probability for each attribute to be exchanged to another position.
+    :param rng: generator the random draws of the whole batch are made from, at once.
+    :returns: A tuple of the mutated individuals.
+    """
+    individuals = [individual] if isinstance(individual, np.ndarray) else list(individual)
+    ind_indices, flat_a, flat_b = _draw_swaps(len(individuals), individuals[0].size, indpb, rng)
+
+    for ind, selected in zip(individuals, _group_by_individual(ind_indices, len(individuals))):
+        if selected.shape[0] > 0:
+            moved = _swap_cells(ind, flat_a[selected], flat_b[selected], one_hot=ind.ndim == 3)
+            for i, k in zip(moved[0], moved[-1]):
+                mark_dirty(ind, i, i + 1, k, k + 1)
+
+    return tuple(individuals)
+
+
+def mutShuffleIndexesBlock(block, rows, indpb, rng: np.random.Generator):
+    """:func:`mutShuffleIndexesVectorized` of the given rows of a genomes block, in place and in a single pass.
+
+    :param block: (individuals, lines, [products,] hours) genomes.
+    :param rows: rows of the individuals to be mutated.
+    :param indpb: Independent probability for each attribute to be exchanged to another position.
+    :param rng: generator the random draws are made from.
+    :returns: A tuple of the block.
+    """
+    genome_size = int(np.prod(block.shape[1:]))
+    ind_indices, flat_a, flat_b = _draw_swaps(rows.shape[0], genome_size, indpb, rng)
+    offsets = rows[ind_indices] * genome_size
+    _swap_cells(block, offsets + flat_a, offsets + flat_b, one_hot=block.ndim == 4)
+    return block,
+
+
+def _draw_slot_flips(num_individuals, genome_shape, indpb, num_products, rng):
+    """:return: individual index, line, hour and flipped product of every mutated slot"""
+    num_lines, num_hours = genome_shape[0], genome_shape[-1]
+    if len(genome_shape) == 3:  # one_hot
+        num_products = genome_shape[1]
+
+    # a bernoulli draw per slot is the same as a binomial number of distinct slots, picked uniformly
+    num_slots = num_individuals * num_lines * num_hours
+    slot_pb = 1 - (1 - indpb) ** num_products
+    positions = rng.choice(num_slots, size=rng.binomial(num_slots, slot_pb), replace=False)
+    flipped_products = rng.integers(num_products, size=positions.shape[0])
+    return np.unravel_index(positions, (num_individuals, num_lines, num_hours)) + (flipped_products,)
+
+
+def _draw_swaps(num_individuals, genome_size, indpb, rng):
+    """:return: individual index and the two flat genome indices of every swap"""
+    num_possible_shuffles = round(genome_size / 2)
+    num_swaps = rng.binomial(num_possible_shuffles, indpb, size=num_individuals)
+    pairs = rng.integers(genome_size, size=(num_swaps.sum(), 2))
+    return np.repeat(np.arange(num_individuals), num_swaps), pairs[:, 0], pairs[:, 1]
+
+
+def _group_by_individual(ind_indices, num_individuals):
+    """:return: for every individual, the positions in ind_indices that belong to it"""
+    order = np.argsort(ind_indices, kind="stable")
+    bounds = np.searchsorted(ind_indices[order], np.arange(num_individuals + 1))
+    return [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _flip_slots(genomes, leading_index, lines, hours, products):
+    """
+    flips the bit of the given product in every given (distinct) line-hour slot.
+    :param leading_index: index of the axes preceding the lines axis, () for a single individual
+    """
+    if genomes.ndim - len(leading_index) == 2:  # product_index
+        slots = leading_index + (lines, hours)
+        current_products = genomes[slots]
+        genomes[slots] = np.where(current_products == products, IDLE, products)
+    else:
+        cells = leading_index + (lines, products, hours)
+        was_set = genomes[cells] != 0
+        genomes[leading_index + (lines, slice(None), hours)] = 0
+        genomes[cells] = ~was_set
+
+
+def _swap_cells(genomes, flat_a, flat_b, one_hot):
+    """
+    swaps the cells at the given flat indices of genomes - an individual or a block of individuals.
+    :return: index of the swapped cells
+    """
+    keep = flat_a != flat_b
+    flat_a, flat_b = flat_a[keep], flat_b[keep]
+    cells, counts = np.unique(np.concatenate((flat_a, flat_b)), return_counts=True)
+    repeated = cells[counts > 1]
+    keep = ~(np.isin(flat_a, repeated) | np.isin(flat_b, repeated))
+    idx_a = np.unravel_index(flat_a[keep], genomes.shape)
+    idx_b = np.unravel_index(flat_b[keep], genomes.shape)
+
+    genomes[idx_a], genomes[idx_b] = genomes[idx_b], genomes[idx_a]
+
+    moved = tuple(np.concatenate((a, b)) for a, b in zip(idx_a, idx_b))
+    if one_hot:  # keep only the product moved into each (leading axes..., line, hour) slot
+        set_cells = genomes[moved] != 0
+        moved_set = tuple(axis[set_cells] for axis in moved)
+        slots = moved_set[:-2] + moved_set[-1:]
+        slot_keys = np.ravel_multi_index(slots, genomes.shape[:-2] + genomes.shape[-1:])
+        _, last = np.unique(slot_keys[::-1], return_index=True)
+        kept = tuple(axis[::-1][last] for axis in moved_set)
+        genomes[kept[:-2] + (slice(None), kept[-1])] = 0
+        genomes[kept] = 1
+
+    return moved
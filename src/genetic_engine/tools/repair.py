@@ -0,0 +1,78 @@
+"""
+repair of line / product compatibility.
+
+individuals scheduling products on lines which don't accept them are penalized with INVALID_SCHEDULING_PENALTY,
+and the GA may spend many generations removing those cells. the repair stage fixes them right after variation:
+
+off - nothing is repaired.
+zero_out - forbidden cells become idle.
+reassign - forbidden cells are reassigned to a random product the line accepts.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from src.genetic_engine.genome_encoding import IDLE
+
+REPAIR_OFF = "off"
+REPAIR_ZERO_OUT = "zero_out"
+REPAIR_REASSIGN = "reassign"
+REPAIR_MODES = (REPAIR_OFF, REPAIR_ZERO_OUT, REPAIR_REASSIGN)
+
+
+def repair_block(block, allowed_products, mode, rng: np.random.Generator) -> Tuple[np.ndarray, Tuple]:
+    """
+    repairs a whole block of genomes in place.
+
+    :param block: (individuals, lines, products, hours) one_hot or (individuals, lines, hours) product_index genomes
+    :param allowed_products: (lines, products) True where the line accepts the product
+    :param mode: one of REPAIR_MODES
+    :param rng: generator the reassigned products are drawn from
+    :return: number of repaired line-hours per individual,
+             and the (line_start, line_stop, hour_start, hour_stop) boxes bounding them
+    """
+    num_individuals, num_lines, num_hours = block.shape[0], block.shape[1], block.shape[-1]
+    if mode == REPAIR_OFF:
+        nothing = np.zeros(shape=(num_individuals,), dtype=np.int64)
+        return nothing, (nothing,) * 4
+
+    if block.ndim == 4:  # one_hot
+        forbidden_cells = (block != 0) & ~allowed_products[None, :, :, None]
+        forbidden = forbidden_cells.any(axis=2)
+        block[forbidden_cells] = 0
+    else:
+        line_accepts = np.take_along_axis(allowed_products[None], np.maximum(block, 0).astype(np.intp), axis=2)
+        forbidden = (block != IDLE) & ~line_accepts
+        block[forbidden] = IDLE
+
+    individuals, lines, hours = np.nonzero(forbidden)
+    if mode == REPAIR_REASSIGN and individuals.shape[0] > 0:
+        _reassign(block, allowed_products, individuals, lines, hours, rng)
+
+    num_repaired = np.bincount(individuals, minlength=num_individuals)
+    line_start = np.full(shape=(num_individuals,), fill_value=num_lines)
+    hour_start = np.full(shape=(num_individuals,), fill_value=num_hours)
+    line_stop, hour_stop = np.zeros_like(line_start), np.zeros_like(hour_start)
+    np.minimum.at(line_start, individuals, lines)
+    np.minimum.at(hour_start, individuals, hours)
+    np.maximum.at(line_stop, individuals, lines + 1)
+    np.maximum.at(hour_stop, individuals, hours + 1)
+
+    return num_repaired, (line_start, line_stop, hour_start, hour_stop)
+
+
+def _reassign(block, allowed_products, individuals, lines, hours, rng):
+    """schedules a random product accepted by the line on every given (idle) line-hour"""
+    num_allowed = allowed_products.sum(axis=1)[lines]
+    # allowed products first, in every line
+    products_order = np.argsort(~allowed_products, axis=1, kind="stable")
+    products = products_order[lines, (rng.random(size=lines.shape[0]) * num_allowed).astype(np.intp)]
+
+    can_reassign = num_allowed > 0
+    individuals, lines, hours, products = (a[can_reassign] for a in (individuals, lines, hours, products))
+    if block.ndim == 4:
+        # a line-hour may still hold an allowed product, if the individual scheduled more than one there
+        idle = ~block[individuals, lines, :, hours].any(axis=1)
+        block[individuals[idle], lines[idle], products[idle], hours[idle]] = 1
+    else:
+        block[individuals, lines, hours] = products
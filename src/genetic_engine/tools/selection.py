@@ -0,0 +1,84 @@
+# Selections taken from deap.tools.selection, drawing from the given generator, and selections working on a fitness
+# vector, returning the indices of the chosen individuals
+from operator import attrgetter
+
+import numpy as np
+
+
+def selTournament(individuals, k, tournsize, rng: np.random.Generator, fit_attr="fitness"):
+    """Select the best individual among *tournsize* randomly chosen
+    individuals, *k* times. The list returned contains
+    references to the input *individuals*.
+
+    :param individuals: A list of individuals to select from.
+    :param k: The number of individuals to select.
+    :param tournsize: The number of individuals participating in each tournament.
+    :param rng: generator the aspirants are drawn from.
+    :param fit_attr: The attribute of individuals to use as selection criterion
+    :returns: A list of selected individuals.
+    """
+    chosen = []
+    for aspirants in rng.integers(len(individuals), size=(k, tournsize)):
+        chosen.append(max((individuals[i] for i in aspirants), key=attrgetter(fit_attr)))
+    return chosen
+
+
+def selRoulette(individuals, k, rng: np.random.Generator, fit_attr="fitness"):
+    """Select *k* individuals from the input *individuals* using *k*
+    spins of a roulette. The selection is made by looking only at the first
+    objective of each individual. The list returned contains references to
+    the input *individuals*.
+
+    :param individuals: A list of individuals to select from.
+    :param k: The number of individuals to select.
+    :param rng: generator the spins are drawn from.
+    :param fit_attr: The attribute of individuals to use as selection criterion
+    :returns: A list of selected individuals.
+    """
+    s_inds = sorted(individuals, key=attrgetter(fit_attr), reverse=True)
+    sum_fits = sum(getattr(ind, fit_attr).values[0] for ind in individuals)
+    chosen = []
+    for u in rng.random(size=k) * sum_fits:
+        sum_ = 0
+        for ind in s_inds:
+            sum_ += getattr(ind, fit_attr).values[0]
+            if sum_ > u:
+                chosen.append(ind)
+                break
+
+    return chosen
+
+
+def selTournamentVectorized(fitness, k, tournsize, rng: np.random.Generator):
+    """Array-native counterpart of DEAP's selTournament.
+    Select the best individual among *tournsize* randomly chosen
+    individuals, *k* times.
+
+    :param fitness: fitness vector of the individuals, lower is better.
+    :param k: The number of individuals to select.
+    :param tournsize: The number of individuals participating in each tournament.
+    :param rng: generator all the random numbers are drawn from, in bulk.
+    :returns: An index array of the selected individuals.
+    """
+    aspirants = rng.integers(fitness.shape[0], size=(k, tournsize))
+    winners = np.argmin(fitness[aspirants], axis=1)
+    return aspirants[np.arange(k), winners]
+
+
+def selRouletteVectorized(fitness, k, rng: np.random.Generator):
+    """Array-native roulette wheel selection, for minimization.
+    DEAP's selRoulette picks individuals with a probability proportional to their fitness, which favours the worst
+    individuals of a minimization problem. here the probability is proportional to the distance from the worst
+    fitness, and all the individuals are equally likely if they all share the same fitness.
+
+    :param fitness: fitness vector of the individuals, lower is better.
+    :param k: The number of individuals to select.
+    :param rng: generator all the random numbers are drawn from, in bulk.
+    :returns: An index array of the selected individuals.
+    """
+    weights = fitness.max() - fitness
+    total = weights.sum()
+    if total <= 0:
+        return rng.integers(fitness.shape[0], size=k)
+
+    return rng.choice(fitness.shape[0], size=k, p=weights / total)
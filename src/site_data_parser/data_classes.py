@@ -1,8 +1,6 @@
-import datetime
-
 import numpy as np
 
-from typing import Dict, List, Tuple
+from typing import Dict, List
 from dataclasses import dataclass
 from dataclasses_json import dataclass_json
 from dacite import from_dict
@@ -46,6 +44,7 @@ class Product(Base):
     forecast: int  # num packaged units, in thousands
     unit_package_id: int
     retailer_package_id: int
+    units_per_retailer_package_unit: int = 1  # num unit packages in a single retailer package
 
     def get_amount_to_produce(self) -> float:
         """:return: amount of product to be produced on a week's course in Kg"""
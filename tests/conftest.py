@@ -0,0 +1,37 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.database.models import SiteData as DBSiteData
+from src.genetic_engine.ea_engine import EAEngine
+
+SITE_DATA_PATH = os.path.join(os.path.dirname(__file__), "files", "site_data.json")
+
+
+@pytest.fixture
+def site_data() -> DBSiteData:
+    """the site of tests/files/site_data.json, not stored in the db"""
+    with open(SITE_DATA_PATH) as f:
+        json_data = json.load(f)
+
+    num_products = len(json_data["products"])
+    num_production_lines = len(json_data["production_lines"])
+    total_working_hours = json_data["total_working_hours"]
+    return DBSiteData(title="test site", json_data=json_data, num_products=num_products,
+                      num_production_lines=num_production_lines, total_working_hours=total_working_hours,
+                      individual_length=num_products * num_production_lines * total_working_hours)
+
+
+@pytest.fixture
+def engine(site_data) -> EAEngine:
+    return EAEngine(site_data)
+
+
+@pytest.fixture
+def genomes(site_data) -> np.ndarray:
+    """(individuals, lines, products, hours) random one_hot genomes, from empty to mostly busy"""
+    rng = np.random.default_rng(0)
+    shape = (site_data.num_production_lines, site_data.num_products, site_data.total_working_hours)
+    return np.stack([(rng.random(shape) < density).astype(int) for density in np.linspace(0, 0.5, 16)])
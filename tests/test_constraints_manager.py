@@ -0,0 +1,16 @@
+import numpy as np
+
+
+def test_evaluate_population_matches_calculate_fitness(engine, genomes):
+    expected = [engine._calculate_fitness(genome)[0] for genome in genomes]
+
+    fitness = engine.constraints_manager.evaluate_population(genomes)
+
+    np.testing.assert_allclose(fitness, expected)
+
+
+def test_evaluate_population_of_a_single_genome(engine, genomes):
+    fitness = engine.constraints_manager.evaluate_population(genomes[-1:])
+
+    assert fitness.shape == (1,)
+    np.testing.assert_allclose(fitness[0], engine._calculate_fitness(genomes[-1])[0])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from src.genetic_engine.tools.delta_evaluation import update_schedule_counts, mark_dirty, count_blocks, \
+    MAX_DIRTY_REGIONS
+
+BLOCK_SIZE = 8
+
+
+class Genome(np.ndarray):
+    """an individual without a fitness, delta evaluation only needs its genome and its counts cache"""
+
+
+def as_individuals(genomes):
+    individuals = [np.array(genome).view(Genome) for genome in genomes]
+    update_schedule_counts(individuals, BLOCK_SIZE)
+    return individuals
+
+
+def assert_counts_recounted(individuals, constraints_manager):
+    genomes = np.stack(individuals).view(np.ndarray)
+    occupied_hours, num_runs = constraints_manager._get_schedule_counts_batch(genomes)
+    hours_blocks, starts_blocks = count_blocks(genomes, BLOCK_SIZE)
+    for i, ind in enumerate(individuals):
+        np.testing.assert_array_equal(ind.schedule_counts.occupied_hours, occupied_hours[i])
+        np.testing.assert_array_equal(ind.schedule_counts.num_runs, num_runs[i])
+        np.testing.assert_array_equal(ind.schedule_counts.occupied_hours_blocks, hours_blocks[i])
+        np.testing.assert_array_equal(ind.schedule_counts.run_starts_blocks, starts_blocks[i])
+
+    fitness = constraints_manager.evaluate_counts(np.stack([ind.schedule_counts.occupied_hours for ind in individuals]),
+                                                  np.stack([ind.schedule_counts.num_runs for ind in individuals]))
+    np.testing.assert_allclose(fitness, constraints_manager.evaluate_population(genomes))
+
+
+@pytest.mark.parametrize("hour_start, hour_stop", [(0, 1), (5, 21), (BLOCK_SIZE - 1, BLOCK_SIZE + 1), (80, 90),
+                                                   (0, 90)])
+def test_recounted_region_matches_full_recount(engine, genomes, hour_start, hour_stop):
+    individuals = as_individuals(genomes)
+    rng = np.random.default_rng(1)
+    for ind in individuals:
+        ind[1:3, :, hour_start:hour_stop] = rng.random(ind[1:3, :, hour_start:hour_stop].shape) < 0.5
+        mark_dirty(ind, 1, 3, hour_start, hour_stop)
+
+    update_schedule_counts(individuals, BLOCK_SIZE)
+
+    assert_counts_recounted(individuals, engine.constraints_manager)
+
+
+def test_recounted_regions_match_full_recount(engine, genomes):
+    individuals = as_individuals(genomes)
+    rng = np.random.default_rng(2)
+    num_lines, num_hours = genomes.shape[1], genomes.shape[-1]
+    for ind in individuals:
+        # overlapping regions, and more of them than are recounted one by one
+        for _ in range(rng.integers(1, MAX_DIRTY_REGIONS + 4)):
+            line = rng.integers(num_lines)
+            hour_start = rng.integers(num_hours)
+            hour_stop = rng.integers(hour_start + 1, num_hours + 1)
+            ind[line, :, hour_start:hour_stop] = 1 - ind[line, :, hour_start:hour_stop]
+            mark_dirty(ind, line, line + 1, hour_start, hour_stop)
+
+    update_schedule_counts(individuals, BLOCK_SIZE)
+
+    assert_counts_recounted(individuals, engine.constraints_manager)
@@ -0,0 +1,65 @@
+import numpy as np
+from deap import creator, tools
+
+from src.genetic_engine.elite_archive import EliteArchive
+
+MAXSIZE = 5
+
+
+def as_individuals(genomes, fitness):
+    individuals = []
+    for genome, fit in zip(genomes, fitness):
+        ind = np.array(genome).view(creator.Individual)
+        ind.fitness = creator.FitnessMin()
+        ind.fitness.values = (fit,)
+        individuals.append(ind)
+    return individuals
+
+
+def random_batches(rng, genomes, num_batches=20, batch_size=8):
+    """batches of the genomes, with repeated genomes and equally fit ones. a genome's fitness is always the same"""
+    fitness = rng.integers(0, 6, size=genomes.shape[0]).astype(float)
+    for _ in range(num_batches):
+        rows = rng.integers(genomes.shape[0], size=batch_size)
+        yield genomes[rows], fitness[rows]
+
+
+def assert_same_items(archive, hall_of_fame):
+    assert len(archive) == len(hall_of_fame)
+    for ind, hofer in zip(archive.items, hall_of_fame.items):
+        assert ind.fitness.values == hofer.fitness.values
+        np.testing.assert_array_equal(ind, hofer)
+
+
+def test_update_matches_hall_of_fame(engine, genomes):
+    rng = np.random.default_rng(0)
+    archive, hall_of_fame = EliteArchive(MAXSIZE), tools.HallOfFame(MAXSIZE, similar=np.array_equal)
+
+    for batch_genomes, batch_fitness in random_batches(rng, genomes):
+        archive.update(as_individuals(batch_genomes, batch_fitness))
+        hall_of_fame.update(as_individuals(batch_genomes, batch_fitness))
+
+        assert_same_items(archive, hall_of_fame)
+
+
+def test_update_block_matches_hall_of_fame(engine, genomes):
+    rng = np.random.default_rng(1)
+    archive, hall_of_fame = EliteArchive(MAXSIZE), tools.HallOfFame(MAXSIZE, similar=np.array_equal)
+
+    for batch_genomes, batch_fitness in random_batches(rng, genomes):
+        archive.update_block(batch_genomes, batch_fitness)
+        hall_of_fame.update(as_individuals(batch_genomes, batch_fitness))
+
+        assert_same_items(archive, hall_of_fame)
+        np.testing.assert_array_equal(archive.genomes, np.stack(hall_of_fame.items))
+        np.testing.assert_array_equal(archive.fitness, [ind.fitness.values[0] for ind in hall_of_fame.items])
+
+
+def test_inserted_individuals_are_copied(engine, genomes):
+    archive = EliteArchive(MAXSIZE)
+    individuals = as_individuals(genomes[:2], [1.0, 2.0])
+
+    archive.update(individuals)
+    individuals[0][:] = 1 - individuals[0]
+
+    np.testing.assert_array_equal(archive.items[0], genomes[0])
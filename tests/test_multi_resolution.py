@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+
+from src.genetic_engine.genome_encoding import to_product_index
+from src.genetic_engine.multi_resolution import TimeBuckets
+
+
+@pytest.mark.parametrize("product_index", [False, True])
+@pytest.mark.parametrize("bucket_hours", [2, 6, 7, 89])
+def test_evaluate_matches_hourly_genomes(engine, genomes, product_index, bucket_hours):
+    genomes = to_product_index(genomes) if product_index else genomes
+    buckets = TimeBuckets(genomes.shape[-1], bucket_hours)
+    bucket_genomes = buckets.coarsen(genomes)
+
+    fitness = buckets.evaluate(bucket_genomes, engine.constraints_manager)
+
+    hourly_genomes = buckets.expand(bucket_genomes)
+    if product_index:
+        expected = engine.constraints_manager.evaluate_product_index_population(hourly_genomes)
+    else:
+        expected = engine.constraints_manager.evaluate_population(hourly_genomes)
+    np.testing.assert_allclose(fitness, expected)
+
+
+def test_last_bucket_takes_the_remaining_hours():
+    buckets = TimeBuckets(90, 7)
+
+    assert buckets.num_buckets == 13
+    assert buckets.lengths.sum() == 90
+    assert buckets.lengths[-1] == 6
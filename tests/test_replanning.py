@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.genetic_engine.genome_encoding import to_product_index
+from src.genetic_engine.replanning import FrozenSchedule
+
+FROZEN_SCHEDULES = [
+    # first_free_hour, frozen_lines, end_free_hour
+    (1, [], None),
+    (30, [], None),
+    (30, [0, 2], None),
+    (0, [1], None),
+    (12, [], 60),
+    (12, [2], 60),
+]
+
+
+def evaluate_full(constraints_manager, genomes):
+    if genomes.ndim == 3:
+        return constraints_manager.evaluate_product_index_population(genomes)
+    return constraints_manager.evaluate_population(genomes)
+
+
+@pytest.mark.parametrize("product_index", [False, True])
+@pytest.mark.parametrize("first_free_hour, frozen_lines, end_free_hour", FROZEN_SCHEDULES)
+def test_evaluate_matches_full_schedule(engine, genomes, product_index, first_free_hour, frozen_lines,
+                                        end_free_hour):
+    genomes = to_product_index(genomes) if product_index else genomes
+    frozen_schedule = FrozenSchedule(genomes[-1], first_free_hour, frozen_lines, end_free_hour)
+    sub_genomes = frozen_schedule.restrict(genomes)
+
+    fitness = frozen_schedule.evaluate(sub_genomes, engine.constraints_manager)
+
+    np.testing.assert_allclose(fitness, evaluate_full(engine.constraints_manager,
+                                                      frozen_schedule.expand(sub_genomes)))
+
+
+@pytest.mark.parametrize("product_index", [False, True])
+def test_evaluate_after_replacing_frozen_lines(engine, genomes, product_index):
+    genomes = to_product_index(genomes) if product_index else genomes
+    frozen_schedule = FrozenSchedule(genomes[-1], 10, frozen_lines=[0, 2])
+    sub_genomes = frozen_schedule.restrict(genomes)
+    frozen_schedule.evaluate(sub_genomes, engine.constraints_manager)
+
+    frozen_schedule.replace_frozen_lines([2], genomes[3, [2]])
+    fitness = frozen_schedule.evaluate(sub_genomes, engine.constraints_manager)
+
+    np.testing.assert_allclose(fitness, evaluate_full(engine.constraints_manager,
+                                                      frozen_schedule.expand(sub_genomes)))